@@ -22,6 +22,10 @@ HLAS_SRC = os.path.abspath(os.path.join(THIS_DIR, "..", "hlas", "src"))
 if HLAS_SRC not in sys.path:
     sys.path.insert(0, HLAS_SRC)
 
+# Shared benefits-row parser (also used at query time by BenefitsTool)
+from hlas.benefits_parser import slice_benefits, tiers_for_product
+from hlas.benefits_matrix import build_matrix, write_matrix, MATRIX_PATH
+
 # Direct Azure OpenAI clients (no CrewAI wrappers)
 from openai import AzureOpenAI
 from dotenv import load_dotenv
@@ -323,6 +327,95 @@ def save_chunks_to_debug_folder(product_name, all_objects):
     return chunk_analysis
 
 
+TIER_COLLECTION_NAME = "Insurance_Benefit_Tiers"
+# Tier value of the object holding the product's complete benefits text (whole lines, unchunked)
+FULL_BENEFITS_TIER = "all"
+
+
+def build_tier_slices(product_name):
+    """
+    Builds one benefits slice per plan tier from the product's benefits file, plus one
+    object with the complete file (tier "all") that multi-tier requests slice at query time.
+    Each slice keeps tier-agnostic rows and rewrites tabular rows to list only that tier.
+    """
+    file_path = os.path.join(SOURCE_DB_PATH, "benefits", f"{product_name}_benefits.txt")
+    tiers = tiers_for_product(product_name)
+    if not os.path.exists(file_path):
+        logger.info(f"No tier slices for {product_name} (file not found: {file_path})")
+        return []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    slices = [{
+        "content": text,
+        "product_name": product_name,
+        "tier": FULL_BENEFITS_TIER,
+        "source_file": os.path.basename(file_path),
+    }]
+    for tier in tiers:
+        content = slice_benefits(text, product_name, [tier])
+        slices.append({
+            "content": content,
+            "product_name": product_name,
+            "tier": tier,
+            "source_file": os.path.basename(file_path),
+        })
+        logger.info(f"Tier slice {product_name}/{tier}: {len(content)} chars (full benefits: {len(text)} chars)")
+
+    # Keep a copy next to the other debug artifacts for review
+    product_debug_path = os.path.join(DEBUG_OUTPUT_PATH, product_name)
+    os.makedirs(product_debug_path, exist_ok=True)
+    with open(os.path.join(product_debug_path, f"{product_name}_tier_slices.json"), 'w', encoding='utf-8') as f:
+        json.dump(slices, f, indent=2, ensure_ascii=False)
+    return slices
+
+
+def ingest_tier_slices(product_name, weaviate_client):
+    """
+    Replaces the product's per-tier benefit slices in the tier collection.
+    Slices are fetched by (product_name, tier) filter only, so no vectors are stored.
+    """
+    slices = build_tier_slices(product_name)
+    if not slices:
+        return
+    try:
+        tier_collection = weaviate_client.collections.get(TIER_COLLECTION_NAME)
+        tier_collection.data.delete_many(
+            where=Filter.by_property("product_name").equal(product_name)
+        )
+        with tier_collection.batch.dynamic() as batch:
+            for item in slices:
+                batch.add_object(properties=item)
+        if tier_collection.batch.failed_objects:
+            logger.error(f"Failed to ingest {len(tier_collection.batch.failed_objects)} tier slices for {product_name}.")
+        else:
+            logger.info(f"Ingested {len(slices)} tier slices for {product_name} into {TIER_COLLECTION_NAME}")
+    except Exception as e:
+        logger.error(f"Failed to ingest tier slices for {product_name}: {e}")
+
+
+def build_benefits_matrix():
+    """
+    Parses every product's benefits file into the structured product x tier x benefit
+    matrix (hlas/src/hlas/config/benefits_matrix.json) used for deterministic limit lookups.
+    """
+    benefits_dir = os.path.join(SOURCE_DB_PATH, "benefits")
+    benefit_texts = {}
+    for filename in sorted(os.listdir(benefits_dir)) if os.path.isdir(benefits_dir) else []:
+        if not filename.endswith("_benefits.txt"):
+            continue
+        product_name = filename.split("_")[0]
+        with open(os.path.join(benefits_dir, filename), 'r', encoding='utf-8') as f:
+            benefit_texts[product_name] = {"text": f.read(), "source_file": filename}
+
+    matrix = build_matrix(benefit_texts)
+    write_matrix(matrix)
+    for key, prod in matrix["products"].items():
+        logger.info(f"Benefits matrix {prod['product_name']}: {len(prod['rows'])} rows x {len(prod['tiers'])} tiers")
+    logger.info(f"Benefits matrix written to {MATRIX_PATH}")
+    return matrix
+
+
 def embed_product(product_name, weaviate_client):
     """
     Processes documents for a single product and embeds them into the 'Insurance_Knowledge_Base' collection using raw Weaviate.
@@ -567,6 +660,9 @@ def embed_product(product_name, weaviate_client):
     except Exception as e:
         logger.error(f"Failed to ingest documents for {product_name}: {e}")
         
+    # Per-tier benefit slices for tier-scoped comparisons/summaries/recommendations
+    ingest_tier_slices(product_name, weaviate_client)
+
     # Log final summary
     logger.info(f"Embedding process completed for {product_name}:")
     logger.info(f"  - Total chunks processed: {chunk_analysis['total_chunks']}")
@@ -580,8 +676,17 @@ def main():
     """
     parser = argparse.ArgumentParser(description="Embedding agent for processing product documents.")
     parser.add_argument("--product", type=str, help="The name of the product to process. If not provided, all products will be processed.")
+    parser.add_argument("--matrix-only", action="store_true", help="Only rebuild the structured benefits matrix (no Weaviate).")
     args = parser.parse_args()
 
+    # Structured benefits matrix is local and cheap; always refresh it
+    try:
+        build_benefits_matrix()
+    except Exception as e:
+        logger.error(f"Failed to build benefits matrix: {e}")
+    if args.matrix_only:
+        return
+
     # Create debug output directory
     os.makedirs(DEBUG_OUTPUT_PATH, exist_ok=True)
     logger.info(f"Debug output will be saved to: {DEBUG_OUTPUT_PATH}")
@@ -628,6 +733,21 @@ def main():
         else:
             logger.info(f"Using existing Weaviate collection: {collection_name}")
 
+        # Tier slice collection (filter-only lookups, no vector index needed)
+        if not client.collections.exists(TIER_COLLECTION_NAME):
+            logger.info(f"Collection '{TIER_COLLECTION_NAME}' does not exist. Creating it now.")
+            client.collections.create(
+                name=TIER_COLLECTION_NAME,
+                vectorizer_config=Configure.Vectorizer.none(),
+                properties=[
+                    Property(name="content", data_type=DataType.TEXT),
+                    Property(name="product_name", data_type=DataType.TEXT),
+                    Property(name="tier", data_type=DataType.TEXT),
+                    Property(name="source_file", data_type=DataType.TEXT),
+                ],
+            )
+            logger.info(f"Successfully created collection: {TIER_COLLECTION_NAME}")
+
         if args.product:
             embed_product(args.product, client)
         else:
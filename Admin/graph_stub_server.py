@@ -0,0 +1,118 @@
+"""
+Local stand-in for the WhatsApp Cloud API messages endpoint, for send throughput benchmarks.
+
+Serves POST /{version}/{phone_number_id}/messages with a simulated latency and
+Meta-style throttling:
+  - more than `--mps` messages per second for one phone number ID returns the
+    Cloud API throughput error (HTTP 400, code 130429 by default)
+  - with `--pair-interval-s`, a second message to the same recipient within the
+    interval returns the pair rate limit error (code 131056)
+  - `--error-rate` returns random HTTP 500s
+Bodies starting with an integer are treated as per-recipient sequence numbers and
+out-of-order arrivals are counted. GET /stats returns the counters, POST /reset
+clears them.
+
+Point the app or Admin/send_benchmark.py at it with
+META_GRAPH_BASE_URL=http://127.0.0.1:8099 (HTTP/1.1 only; uvicorn has no h2c).
+
+Examples:
+  python Admin/graph_stub_server.py --port 8099 --mps 80 --latency-ms 150
+  python Admin/graph_stub_server.py --mps 20 --pair-interval-s 1 --error-rate 0.01
+"""
+
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import defaultdict, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def build_app(args) -> FastAPI:
+    app = FastAPI(title="Graph API stub")
+    window = defaultdict(deque)      # phone_number_id -> send timestamps in the last second
+    last_to_recipient = {}           # recipient -> last accepted time
+    last_seq = {}                    # recipient -> last sequence number seen
+    stats = defaultdict(int)
+
+    def _error(status: int, code: int, message: str) -> JSONResponse:
+        return JSONResponse(status_code=status, content={
+            "error": {"message": message, "type": "OAuthException", "code": code, "fbtrace_id": uuid.uuid4().hex[:12]}
+        })
+
+    @app.post("/{version}/{phone_number_id}/messages")
+    async def messages(version: str, phone_number_id: str, request: Request):
+        payload = await request.json()
+        to = str(payload.get("to") or "")
+        body = str((payload.get("text") or {}).get("body") or "")
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, random.gauss(args.latency_ms, args.jitter_ms)) / 1000.0)
+
+        now = time.monotonic()
+        if args.error_rate and random.random() < args.error_rate:
+            stats["server_errors"] += 1
+            return _error(500, 1, "An unknown error has occurred.")
+        if args.mps > 0:
+            sent = window[phone_number_id]
+            while sent and now - sent[0] > 1.0:
+                sent.popleft()
+            if len(sent) >= args.mps:
+                stats["throttled"] += 1
+                return _error(args.throttle_status, args.throttle_code, "Rate limit hit")
+            sent.append(now)
+        if args.pair_interval_s > 0:
+            last = last_to_recipient.get(to)
+            if last is not None and now - last < args.pair_interval_s:
+                stats["pair_limited"] += 1
+                return _error(400, 131056, "(Business Account, Consumer Account) pair rate limit hit")
+            last_to_recipient[to] = now
+
+        head = body.split(" ", 1)[0]
+        if head.isdigit():
+            seq = int(head)
+            if to in last_seq and seq < last_seq[to]:
+                stats["order_violations"] += 1
+            last_seq[to] = seq
+        stats["accepted"] += 1
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": to, "wa_id": to}],
+            "messages": [{"id": f"wamid.stub.{uuid.uuid4().hex}"}],
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/reset")
+    async def reset():
+        stats.clear()
+        window.clear()
+        last_to_recipient.clear()
+        last_seq.clear()
+        return {"ok": True}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph API messages endpoint stub with Meta-style throttling.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--mps", type=int, default=80, help="Messages per second per phone number ID (0 = unlimited).")
+    parser.add_argument("--throttle-status", type=int, default=400)
+    parser.add_argument("--throttle-code", type=int, default=130429)
+    parser.add_argument("--pair-interval-s", type=float, default=0.0, help="Minimum gap between messages to one recipient (0 = off).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    args = parser.parse_args()
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
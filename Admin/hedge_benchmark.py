@@ -0,0 +1,210 @@
+"""
+Hedged-request benchmark: tail latency of a gateway task with hedging off vs on.
+
+Replays route_decision prompts (built from HlasFlow's route context for a set of
+messages) straight through the LLM gateway, so the classifier result cache and
+the model cascade are not involved. Each variant starts with a fresh latency
+window; the first `--warmup` calls fill it and are excluded from the stats
+(hedging only starts after the task's `min_samples`).
+
+Reports p50/p95/p99/max latency, hedges fired/won and the share of extra tokens
+spent on hedges (labels ending in ".hedge") per variant.
+
+Examples:
+  python Admin/hedge_benchmark.py --calls 300 --concurrency 4
+  python Admin/hedge_benchmark.py --calls 500 --output Admin/logs/hedge_benchmark.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+log_directory = "Admin/logs"
+os.makedirs(log_directory, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.join(log_directory, "hedge_benchmark.log")),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HLAS_SRC = os.path.abspath(os.path.join(THIS_DIR, "..", "hlas", "src"))
+if HLAS_SRC not in sys.path:
+    sys.path.insert(0, HLAS_SRC)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from hlas.llm import initialize_models  # noqa: E402
+
+initialize_models()
+
+from hlas import llm_gateway  # noqa: E402
+from hlas.flow import HlasFlow  # noqa: E402
+from hlas.metrics import LLM_HEDGES_TOTAL  # noqa: E402
+from hlas.prompt_runner import build_prompts, structured_output_format  # noqa: E402
+from hlas.tasks import route_decision_task  # noqa: E402
+
+TASK_KEY = "route_decision"
+LABEL = "orchestrator.route_decision"
+
+DEFAULT_MESSAGES = [
+    "hi",
+    "recommend a travel plan for my 10 day trip to Japan",
+    "I need maid insurance for my helper from the Philippines",
+    "compare gold and platinum travel plans",
+    "summary of the PA premier plan",
+    "is trip cancellation covered?",
+    "what is the overseas medical limit on the silver plan",
+    "what can you do?",
+]
+
+
+class TokenCounter:
+    """Sums completion + prompt tokens per label; wraps DeploymentGateway._record_usage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tokens = Counter()
+        original = llm_gateway.DeploymentGateway._record_usage
+        counter = self
+
+        def counted(gateway, result, label, agent):
+            with counter._lock:
+                counter.tokens[label] += result.prompt_tokens + result.completion_tokens
+            return original(gateway, result, label, agent)
+
+        llm_gateway.DeploymentGateway._record_usage = counted
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.tokens)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def build_requests(messages):
+    requests = []
+    for message in messages:
+        flow = HlasFlow()
+        flow.state.message = message
+        system_prompt, user_prompt = build_prompts("orchestrator", TASK_KEY, json.dumps(flow._route_context()), logger)
+        requests.append([{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}])
+    return requests
+
+
+def _hedge_counts():
+    counts = {}
+    for outcome in ("fired", "primary_won", "hedge_won", "budget_exhausted"):
+        try:
+            counts[outcome] = LLM_HEDGES_TOTAL.labels(label=LABEL, outcome=outcome)._value.get()
+        except Exception:
+            counts[outcome] = 0
+    return counts
+
+
+def run_variant(name, hedging, requests, calls, warmup, concurrency, tokens):
+    os.environ["LLM_HEDGING_ENABLED"] = "true" if hedging else "false"
+    llm_gateway.close_gateway()  # fresh gateway, latency window and hedge budget
+    gateway = llm_gateway.gateway_for(route_decision_task.agent.llm)
+    response_format = structured_output_format(TASK_KEY)
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            gateway.complete(requests[i % len(requests)], label=LABEL, task_key=TASK_KEY,
+                             response_format=response_format, agent="orchestrator")
+            ok = True
+        except Exception as e:
+            logger.warning(f"[{name}] call {i} failed: {e}")
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    for i in range(warmup):
+        one(i)
+
+    hedges_before, tokens_before = _hedge_counts(), tokens.snapshot()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        samples = list(pool.map(one, range(calls)))
+    hedges_after, delta = _hedge_counts(), tokens.snapshot() - tokens_before
+
+    latencies = [ms for ms, ok in samples if ok]
+    hedge_tokens = sum(n for label, n in delta.items() if label.endswith(".hedge"))
+    total_tokens = sum(delta.values())
+    return {
+        "calls": calls,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0,
+        },
+        "hedges": {k: hedges_after[k] - hedges_before[k] for k in hedges_after},
+        "tokens": total_tokens,
+        "hedge_token_share": (hedge_tokens / total_tokens) if total_tokens else 0.0,
+    }
+
+
+def print_table(results):
+    header = ["variant", "calls", "errors", "p50 ms", "p95 ms", "p99 ms", "hedges", "won", "extra tok"]
+    print("\n" + " | ".join(f"{h:>9}" for h in header))
+    print("-" * (12 * len(header)))
+    for name, r in results.items():
+        lat = r["latency_ms"]
+        cells = [name, str(r["calls"]), str(r["errors"]), f"{lat['p50']:.0f}", f"{lat['p95']:.0f}", f"{lat['p99']:.0f}",
+                 f"{r['hedges']['fired']:.0f}", f"{r['hedges']['hedge_won']:.0f}", f"{r['hedge_token_share']:.1%}"]
+        print(" | ".join(f"{c:>9}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="route_decision tail latency with and without hedged requests.")
+    parser.add_argument("--calls", type=int, default=200, help="Measured calls per variant.")
+    parser.add_argument("--warmup", type=int, default=25, help="Unmeasured calls that fill the latency window.")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--messages", type=str, help="JSON file with a list of user messages.")
+    parser.add_argument("--output", type=str, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        with open(args.messages, "r", encoding="utf-8") as f:
+            messages = json.load(f)
+
+    tokens = TokenCounter()
+    requests = build_requests(messages)
+    results = {}
+    try:
+        for name, hedging in (("no_hedge", False), ("hedged", True)):
+            results[name] = run_variant(name, hedging, requests, max(1, args.calls), max(0, args.warmup),
+                                        args.concurrency, tokens)
+    finally:
+        llm_gateway.close_gateway()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"task": TASK_KEY, "calls": args.calls, "concurrency": args.concurrency, "results": results}, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Turn-understanding benchmark: legacy classifier chain vs the unified
+`understand_turn` task (hlas.turn_understanding).
+
+Modes:
+  - chain: runs only the classifier calls for each turn fixture. Legacy is
+    route_decision -> identify_product -> extract_slots (recommendation) or
+    identify_tiers (comparison/summary); unified is one understand_turn call.
+    Needs only the Azure chat deployment.
+  - flow: replays whole conversations through HlasFlow twice (UNIFIED_NLU_ENABLED
+    off/on) with an in-memory session, counting every LLM call per turn. Needs
+    the same backends as the app (Weaviate for info/benefits lookups).
+
+LLM calls are counted at the gateway, so gateway retries are not double-counted
+and synthesis calls appear in flow mode. Reports calls per turn, per-label call
+counts and p50/p95 turn latency per variant.
+
+Examples:
+  python Admin/nlu_benchmark.py --mode chain --repeat 3
+  python Admin/nlu_benchmark.py --mode flow --output Admin/logs/nlu_benchmark.json
+  python Admin/nlu_benchmark.py --scenarios my_turns.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from collections import Counter
+
+log_directory = "Admin/logs"
+os.makedirs(log_directory, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.join(log_directory, "nlu_benchmark.log")),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HLAS_SRC = os.path.abspath(os.path.join(THIS_DIR, "..", "hlas", "src"))
+if HLAS_SRC not in sys.path:
+    sys.path.insert(0, HLAS_SRC)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from hlas.llm import initialize_models  # noqa: E402
+
+initialize_models()
+
+from hlas import llm_gateway, turn_understanding  # noqa: E402
+from hlas.flow import HlasFlow  # noqa: E402
+from hlas.prompt_runner import run_direct_task  # noqa: E402
+from hlas.tasks import route_decision_task, identify_product_task, identify_tiers_task  # noqa: E402
+
+# Single-turn fixtures for chain mode: message plus the session the turn starts from
+DEFAULT_TURNS = [
+    {"message": "travel", "session": {}},
+    {"message": "recommend a travel plan for my 10 day trip to Japan", "session": {}},
+    {"message": "I need maid insurance for my helper from the Philippines", "session": {}},
+    {"message": "compare gold and platinum travel plans", "session": {}},
+    {"message": "summary of the PA premier plan", "session": {}},
+    {"message": "is trip cancellation covered?", "session": {"product": "Travel"}},
+    {"message": "what is the overseas medical limit on the silver plan", "session": {}},
+    {"message": "7 days", "session": {
+        "product": "Travel", "recommendation_status": "in_progress",
+        "last_question": "How many days will your trip last?",
+        "slots": {"destination": {"value": "Japan", "valid": True}},
+        "history": [{"user": "recommend a travel plan", "assistant": "How many days will your trip last?"}]}},
+    {"message": "no", "session": {
+        "product": "Travel", "recommendation_status": "in_progress",
+        "last_question": "Do you have any pre-existing medical conditions? (Yes/No)",
+        "slots": {"destination": {"value": "Japan", "valid": True}, "travel_duration": {"value": "7", "valid": True}},
+        "history": [{"user": "7 days", "assistant": "Do you have any pre-existing medical conditions? (Yes/No)"}]}},
+    {"message": "12 months, she is from Indonesia", "session": {
+        "product": "Maid", "recommendation_status": "in_progress",
+        "last_question": "How long do you need coverage: 12 or 24 months?",
+        "history": [{"user": "maid recommendation", "assistant": "How long do you need coverage: 12 or 24 months?"}]}},
+    {"message": "what about exclusive?", "session": {
+        "product": "Maid", "comparison_status": "in_progress",
+        "history": [{"user": "compare maid plans", "assistant": "Which two (or more) tiers would you like to compare?"}]}},
+    {"message": "what can you do?", "session": {}},
+]
+
+# Conversations for flow mode
+DEFAULT_CONVERSATIONS = [
+    ["I want a travel insurance recommendation", "Japan", "10 days", "no", "comprehensive"],
+    ["recommend maid insurance", "24 months", "Philippines", "yes", "required"],
+    ["compare travel plans", "gold and platinum"],
+    ["give me a summary of maid insurance", "premier"],
+    ["is trip cancellation covered on travel insurance?", "what about the limit on gold?"],
+]
+
+
+class CallCounter:
+    """Counts gateway calls per label; wraps DeploymentGateway.complete for the benchmark process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.labels = Counter()
+        self._original = llm_gateway.DeploymentGateway.complete
+        counter = self
+
+        def counted(gateway, messages, label="llm", *args, **kwargs):
+            with counter._lock:
+                counter.labels[label] += 1
+            return counter._original(gateway, messages, label, *args, **kwargs)
+
+        llm_gateway.DeploymentGateway.complete = counted
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.labels)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def _flow_for(message, session):
+    flow = HlasFlow()
+    flow.state.message = message
+    flow.state.session = json.loads(json.dumps(session))
+    flow.state.product = flow.state.session.get("product")
+    return flow
+
+
+def run_legacy_chain(turn):
+    """The classifier calls the current flow makes before any reply is produced."""
+    from hlas.flows.rec_flow import RecFlowHelper
+
+    flow = _flow_for(turn["message"], turn.get("session") or {})
+    state, session = flow.state, flow.state.session
+    active = turn_understanding._active_flow(session)
+    directive = None
+    if not active:
+        d = run_direct_task(
+            agent_obj=route_decision_task.agent, agent_key="orchestrator", task_key="route_decision",
+            context_text=json.dumps(flow._route_context()), logger=logger, label="orchestrator.route_decision",
+        ) or {}
+        directive = d.get("directive")
+    if active or directive in ("handle_recommendation", "handle_information", "plan_only_comparison", "handle_summary"):
+        prod = run_direct_task(
+            agent_obj=identify_product_task.agent, agent_key="product_identifier", task_key="identify_product",
+            context_text=f"Message: {state.message}\nSession product: {session.get('product')}",
+            logger=logger, label="product_identifier.identify_product",
+        ) or {}
+        product = prod.get("product") or session.get("product")
+        if product and (active == "recommendation" or directive == "handle_recommendation"):
+            RecFlowHelper._extract_slots(state, product, logger)
+        elif product and (active in ("comparison", "summary") or directive in ("plan_only_comparison", "handle_summary")):
+            run_direct_task(
+                agent_obj=identify_tiers_task.agent, agent_key="tier_identifier", task_key="identify_tiers",
+                context_text=f"Product: {product}\nUser Message: {state.message}\nRecent conversation (most recent first):\n",
+                logger=logger, label="tier_identifier.identify_tiers",
+            )
+    return directive
+
+
+def run_unified_chain(turn):
+    flow = _flow_for(turn["message"], turn.get("session") or {})
+    nlu = turn_understanding.understand_turn(flow.state, flow._route_context(), logger) or {}
+    return nlu.get("directive")
+
+
+def bench_chain(turns, repeat, counter):
+    variants = {"legacy": run_legacy_chain, "unified": run_unified_chain}
+    results = {}
+    for name, fn in variants.items():
+        latencies, calls, labels = [], [], Counter()
+        for _ in range(repeat):
+            for turn in turns:
+                before = counter.snapshot()
+                start = time.perf_counter()
+                try:
+                    fn(turn)
+                except Exception as e:
+                    logger.warning(f"[{name}] turn failed for '{turn['message'][:60]}': {e}")
+                latencies.append((time.perf_counter() - start) * 1000)
+                delta = counter.snapshot() - before
+                calls.append(sum(delta.values()))
+                labels.update(delta)
+        results[name] = _summarize(latencies, calls, labels)
+    return results
+
+
+def _replay(conversation, counter):
+    session = {}
+    latencies, calls, labels = [], [], Counter()
+    for message in conversation:
+        flow = HlasFlow()
+        before = counter.snapshot()
+        start = time.perf_counter()
+        try:
+            asyncio.run(flow.kickoff_async(inputs={"message": message, "session": session}))
+            session = flow.state.session
+            history = session.setdefault("history", [])
+            history.append({"user": message, "assistant": str(flow.state.reply)[:100]})
+        except Exception as e:
+            logger.warning(f"Flow turn failed for '{message[:60]}': {e}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        delta = counter.snapshot() - before
+        calls.append(sum(delta.values()))
+        labels.update(delta)
+    return latencies, calls, labels
+
+
+def bench_flow(conversations, repeat, counter):
+    results = {}
+    for name, enabled in (("legacy", "false"), ("unified", "true")):
+        os.environ["UNIFIED_NLU_ENABLED"] = enabled
+        latencies, calls, labels = [], [], Counter()
+        for _ in range(repeat):
+            for conversation in conversations:
+                lat, c, lab = _replay(conversation, counter)
+                latencies += lat
+                calls += c
+                labels.update(lab)
+        results[name] = _summarize(latencies, calls, labels)
+    return results
+
+
+def _summarize(latencies, calls, labels):
+    return {
+        "turns": len(calls),
+        "llm_calls_per_turn": (sum(calls) / len(calls)) if calls else 0.0,
+        "llm_calls_max": max(calls) if calls else 0,
+        "latency_ms": {
+            "mean": (sum(latencies) / len(latencies)) if latencies else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": max(latencies) if latencies else 0.0,
+        },
+        "calls_by_label": dict(labels.most_common()),
+    }
+
+
+def print_table(results):
+    header = ["variant", "turns", "calls/turn", "max calls", "p50 ms", "p95 ms"]
+    print("\n" + " | ".join(f"{h:>10}" for h in header))
+    print("-" * (13 * len(header)))
+    for name, r in results.items():
+        cells = [name, str(r["turns"]), f"{r['llm_calls_per_turn']:.2f}", str(r["llm_calls_max"]),
+                 f"{r['latency_ms']['p50']:.0f}", f"{r['latency_ms']['p95']:.0f}"]
+        print(" | ".join(f"{c:>10}" for c in cells))
+    for name, r in results.items():
+        print(f"\n{name} calls by label:")
+        for label, n in r["calls_by_label"].items():
+            print(f"  {n:>5}  {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy classifier chain vs unified turn understanding.")
+    parser.add_argument("--mode", choices=["chain", "flow"], default="chain")
+    parser.add_argument("--scenarios", type=str,
+                        help="JSON file: a list of {message, session} fixtures (chain) or a list of message lists (flow).")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", type=str, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    scenarios = None
+    if args.scenarios:
+        with open(args.scenarios, "r", encoding="utf-8") as f:
+            scenarios = json.load(f)
+
+    counter = CallCounter()
+    try:
+        if args.mode == "chain":
+            results = bench_chain(scenarios or DEFAULT_TURNS, max(1, args.repeat), counter)
+        else:
+            results = bench_flow(scenarios or DEFAULT_CONVERSATIONS, max(1, args.repeat), counter)
+    finally:
+        llm_gateway.close_gateway()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "repeat": args.repeat, "results": results}, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
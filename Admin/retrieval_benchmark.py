@@ -0,0 +1,452 @@
+"""
+Offline retrieval benchmark for the InfoFlow knowledge base.
+
+Uses the Q/A pairs in Admin/source_db/FAQ/*_FAQs.txt as labelled queries: each
+FAQ question is run through retrieval and the matching FAQ chunk is the
+relevant document. Reports recall@k, MRR and per-query search latency for every
+combination of alpha, limit and target-vector setting.
+
+Backends:
+  - weaviate: the live collection, queried through hlas.retrieval.hybrid_search
+    (the same call InfoFlow makes).
+  - local: an in-memory index that mirrors Weaviate's hybrid search (BM25 +
+    named-vector cosine, relative score fusion). Built from Admin/debug_chunks
+    (the embedding agent's output, including generated questions) or by
+    re-chunking Admin/source_db with custom chunk sizes (content vector only).
+    Embeddings are cached in Admin/bench_cache so grid runs do not re-embed.
+
+Examples:
+  python Admin/retrieval_benchmark.py --backend weaviate
+  python Admin/retrieval_benchmark.py --backend local --alphas 0.5,0.7 --limits 5,10 --targets average,content
+  python Admin/retrieval_benchmark.py --backend local --local-chunks source --chunk-size 600 --chunk-overlap 100
+"""
+
+import os
+import sys
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+import argparse
+import itertools
+from collections import Counter
+
+# Setup logging (before importing embedding_agent, which also calls basicConfig)
+log_directory = "Admin/logs"
+os.makedirs(log_directory, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.join(log_directory, "retrieval_benchmark.log")),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+if THIS_DIR not in sys.path:
+    sys.path.insert(0, THIS_DIR)
+
+# Reuse the ingestion chunkers and embedding client so the local index matches production data
+from embedding_agent import (  # noqa: E402
+    PROJECT_ROOT, SOURCE_DB_PATH, DEBUG_OUTPUT_PATH, AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
+    azure_embed, chunk_benefits, chunk_faqs, chunk_policy_md,
+)
+from hlas.retrieval import KB_COLLECTION_NAME, TARGET_VECTOR_MODES, hybrid_search  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "Admin", "bench_cache")
+FAQ_DIR = os.path.join(SOURCE_DB_PATH, "FAQ")
+
+# Weaviate BM25 defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _norm_text(text):
+    return re.sub(r"\s+", " ", (text or "")).strip().lower()
+
+
+def load_labelled_queries(products=None):
+    """Parse FAQ files into [{product, question, answer}]."""
+    queries = []
+    if not os.path.isdir(FAQ_DIR):
+        logger.error(f"FAQ directory not found: {FAQ_DIR}")
+        return queries
+    for filename in sorted(os.listdir(FAQ_DIR)):
+        if not filename.endswith("_FAQs.txt"):
+            continue
+        product = filename.split("_")[0]
+        if products and product not in products:
+            continue
+        for pair in chunk_faqs(os.path.join(FAQ_DIR, filename)):
+            m = re.match(r"Q:\s*(.+?)\s*\n\s*A:\s*(.*)", pair, flags=re.S)
+            if not m:
+                continue
+            queries.append({"product": product, "question": m.group(1).strip(), "answer": m.group(2).strip()})
+    logger.info(f"Loaded {len(queries)} labelled queries from {FAQ_DIR}")
+    return queries
+
+
+def is_relevant(query, doc):
+    """The FAQ chunk that holds the query's own Q/A pair is the relevant document."""
+    if doc.get("doc_type") != "faq":
+        return False
+    return _norm_text(doc.get("content")).startswith(_norm_text("Q: " + query["question"]))
+
+
+# ---------------------------------------------------------------------------
+# Embedding cache
+# ---------------------------------------------------------------------------
+
+class EmbeddingCache:
+    def __init__(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.path = os.path.join(CACHE_DIR, f"embeddings_{AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME}.json")
+        self.data = {}
+        self.dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+            logger.info(f"Loaded {len(self.data)} cached embeddings from {self.path}")
+
+    def embed(self, text):
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if key not in self.data:
+            self.data[key] = azure_embed(text)
+            self.dirty = True
+        return self.data[key]
+
+    def save(self):
+        if self.dirty:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            logger.info(f"Saved {len(self.data)} embeddings to {self.path}")
+            self.dirty = False
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class WeaviateBackend:
+    name = "weaviate"
+
+    def __init__(self):
+        from hlas.vector_store import get_weaviate_client
+        self.client = get_weaviate_client()
+        self.collection = self.client.collections.get(KB_COLLECTION_NAME)
+
+    def search(self, question, emb, product, limit, alpha, target):
+        objects = hybrid_search(self.collection, question, emb, product, limit=limit, alpha=alpha, target=target)
+        return [obj.properties for obj in objects]
+
+    def close(self):
+        if self.client and self.client.is_connected():
+            self.client.close()
+
+
+def _tokenize(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+class LocalBackend:
+    """In-memory approximation of Weaviate hybrid search (relativeScoreFusion)."""
+    name = "local"
+
+    def __init__(self, docs, cache):
+        self.docs = docs
+        logger.info(f"Embedding {len(docs)} local chunks (cached where possible)")
+        dim = None
+        content_vecs, question_vecs, has_questions = [], [], []
+        for doc in docs:
+            cv = cache.embed(doc["content"])
+            dim = dim or len(cv)
+            content_vecs.append(cv)
+            qtext = " ".join(doc.get("questions") or [])
+            if qtext.strip():
+                question_vecs.append(cache.embed(qtext))
+                has_questions.append(True)
+            else:
+                question_vecs.append([0.0] * dim)
+                has_questions.append(False)
+        cache.save()
+        self.vectors = {
+            "content_vector": self._normalize(np.asarray(content_vecs, dtype=np.float32)),
+            "questions_vector": self._normalize(np.asarray(question_vecs, dtype=np.float32)),
+        }
+        self.has_questions = np.asarray(has_questions, dtype=bool)
+        self.products = np.asarray([d["product_name"] for d in docs])
+
+        # BM25 over all text properties (Weaviate default)
+        self.doc_tokens = [Counter(_tokenize(" ".join([d["content"], " ".join(d.get("questions") or []),
+                                                       d["product_name"], d["doc_type"], d["source_file"]])))
+                           for d in docs]
+        self.doc_len = np.asarray([sum(t.values()) for t in self.doc_tokens], dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if len(docs) else 0.0
+        df = Counter()
+        for toks in self.doc_tokens:
+            df.update(toks.keys())
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+
+    @staticmethod
+    def _normalize(mat):
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        return mat / np.maximum(norms, 1e-12)
+
+    def _bm25(self, question, mask):
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for term in set(_tokenize(question)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.asarray([toks.get(term, 0) for toks in self.doc_tokens], dtype=np.float32)
+            denom = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / max(self.avg_len, 1e-6))
+            scores += idf * tf * (BM25_K1 + 1) / np.maximum(denom, 1e-6)
+        scores[~mask] = 0.0
+        return scores
+
+    def _vector(self, emb, target, mask):
+        q = np.asarray(emb, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        names = TARGET_VECTOR_MODES[target]
+        # Weaviate averages distances; objects without a questions vector only use the content vector
+        dist_sum = np.zeros(len(self.docs), dtype=np.float32)
+        counts = np.zeros(len(self.docs), dtype=np.float32)
+        for name in names:
+            valid = self.has_questions if name == "questions_vector" else np.ones(len(self.docs), dtype=bool)
+            dist = 1.0 - self.vectors[name] @ q
+            dist_sum += np.where(valid, dist, 0.0)
+            counts += valid
+        scores = np.where(counts > 0, 1.0 - dist_sum / np.maximum(counts, 1), -np.inf)
+        scores[~mask] = -np.inf
+        return scores
+
+    @staticmethod
+    def _min_max(scores, candidates):
+        vals = scores[candidates]
+        lo, hi = float(vals.min()), float(vals.max())
+        out = np.zeros_like(scores)
+        out[candidates] = 1.0 if hi == lo else (vals - lo) / (hi - lo)
+        return out
+
+    def search(self, question, emb, product, limit, alpha, target):
+        mask = self.products == product
+        if not mask.any():
+            return []
+        vec = self._vector(emb, target, mask)
+        kw = self._bm25(question, mask)
+        vec_top = [i for i in np.argsort(-vec)[:limit] if np.isfinite(vec[i])]
+        kw_top = [i for i in np.argsort(-kw)[:limit] if kw[i] > 0]
+        fused = np.zeros(len(self.docs), dtype=np.float32)
+        if vec_top:
+            fused += alpha * self._min_max(vec, np.asarray(vec_top))
+        if kw_top:
+            fused += (1 - alpha) * self._min_max(kw, np.asarray(kw_top))
+        candidates = sorted(set(vec_top) | set(kw_top), key=lambda i: -fused[i])
+        return [self.docs[i] for i in candidates[:limit]]
+
+    def close(self):
+        pass
+
+
+def load_local_docs(source, products, chunk_size, chunk_overlap):
+    """Local corpus: embedding-agent debug output (with questions) or freshly chunked source files."""
+    docs = []
+    if source == "debug":
+        for product in products:
+            product_dir = os.path.join(DEBUG_OUTPUT_PATH, product)
+            if not os.path.isdir(product_dir):
+                logger.warning(f"No debug chunks for {product} in {product_dir}; run embedding_agent.py first")
+                continue
+            for filename in sorted(os.listdir(product_dir)):
+                if not re.match(rf"{re.escape(product)}_[a-z]+_\d+\.json$", filename):
+                    continue
+                with open(os.path.join(product_dir, filename), "r", encoding="utf-8") as f:
+                    item = json.load(f)
+                if not (item.get("content") or "").strip():
+                    continue
+                meta = item.get("metadata") or {}
+                docs.append({
+                    "content": item["content"],
+                    "questions": item.get("questions") or [],
+                    "product_name": meta.get("product_name") or product,
+                    "doc_type": meta.get("doc_type", ""),
+                    "source_file": meta.get("source_file", ""),
+                })
+    else:
+        for product in products:
+            files = [
+                ("benefits", os.path.join(SOURCE_DB_PATH, "benefits", f"{product}_benefits.txt"),
+                 lambda p: chunk_benefits(p, chunk_size=chunk_size, chunk_overlap=chunk_overlap)),
+                ("faq", os.path.join(SOURCE_DB_PATH, "FAQ", f"{product}_FAQs.txt"), chunk_faqs),
+                ("policy", os.path.join(SOURCE_DB_PATH, "policy", f"{product}_policy.md"),
+                 lambda p: chunk_policy_md(p, chunk_size=chunk_size, chunk_overlap=chunk_overlap)),
+            ]
+            for doc_type, path, chunker in files:
+                if not os.path.exists(path):
+                    continue
+                for chunk in chunker(path):
+                    if chunk.strip():
+                        docs.append({
+                            "content": chunk,
+                            "questions": [],
+                            "product_name": product,
+                            "doc_type": doc_type,
+                            "source_file": os.path.basename(path),
+                        })
+    logger.info(f"Local index corpus: {len(docs)} chunks ({source})")
+    return docs
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def run_grid(backend, queries, query_embs, alphas, limits, targets, ks):
+    results = []
+    for alpha, limit, target in itertools.product(alphas, limits, targets):
+        hits = {k: 0 for k in ks if k <= limit}
+        rr_total = 0.0
+        latencies = []
+        errors = 0
+        for q, emb in zip(queries, query_embs):
+            start = time.perf_counter()
+            try:
+                docs = backend.search(q["question"], emb, q["product"], limit, alpha, target)
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Search failed for '{q['question'][:60]}': {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            rank = next((i + 1 for i, d in enumerate(docs) if is_relevant(q, d)), None)
+            if rank:
+                rr_total += 1.0 / rank
+                for k in hits:
+                    if rank <= k:
+                        hits[k] += 1
+        n = max(1, len(queries))
+        row = {
+            "backend": backend.name,
+            "alpha": alpha,
+            "limit": limit,
+            "target": target,
+            "queries": len(queries),
+            "errors": errors,
+            "mrr": rr_total / n,
+            "recall": {f"@{k}": hits[k] / n for k in hits},
+            "latency_ms": {
+                "mean": (sum(latencies) / len(latencies)) if latencies else 0.0,
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "max": max(latencies) if latencies else 0.0,
+            },
+        }
+        results.append(row)
+        logger.info(
+            "alpha=%.2f limit=%d target=%s | MRR=%.3f | %s | p50=%.1fms p95=%.1fms",
+            alpha, limit, target, row["mrr"],
+            " ".join(f"R{k}={v:.3f}" for k, v in row["recall"].items()),
+            row["latency_ms"]["p50"], row["latency_ms"]["p95"],
+        )
+    return results
+
+
+def print_table(results):
+    ks = sorted({k for r in results for k in r["recall"]}, key=lambda s: int(s[1:]))
+    header = ["alpha", "limit", "target", "MRR"] + [f"R{k}" for k in ks] + ["p50 ms", "p95 ms"]
+    print("\n" + " | ".join(f"{h:>9}" for h in header))
+    print("-" * (12 * len(header)))
+    for r in sorted(results, key=lambda r: -r["mrr"]):
+        cells = [f"{r['alpha']:.2f}", str(r["limit"]), r["target"], f"{r['mrr']:.3f}"]
+        cells += [f"{r['recall'][k]:.3f}" if k in r["recall"] else "-" for k in ks]
+        cells += [f"{r['latency_ms']['p50']:.1f}", f"{r['latency_ms']['p95']:.1f}"]
+        print(" | ".join(f"{c:>9}" for c in cells))
+
+
+def _csv_floats(value):
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def _csv_ints(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval benchmark over FAQ Q/A pairs.")
+    parser.add_argument("--backend", choices=["weaviate", "local"], default="weaviate")
+    parser.add_argument("--product", action="append", help="Limit to product(s); repeatable. Default: all FAQ products.")
+    parser.add_argument("--alphas", type=_csv_floats, default=[0.5, 0.7, 0.9])
+    parser.add_argument("--limits", type=_csv_ints, default=[5, 10, 15])
+    parser.add_argument("--targets", type=lambda v: [t.strip() for t in v.split(",") if t.strip()],
+                        default=["average", "content", "questions"])
+    parser.add_argument("--ks", type=_csv_ints, default=[1, 3, 5, 10])
+    parser.add_argument("--max-queries", type=int, default=0, help="Cap the number of labelled queries (0 = all).")
+    parser.add_argument("--local-chunks", choices=["debug", "source"], default="debug",
+                        help="Local corpus: embedding-agent debug chunks, or re-chunk source_db.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Benefits/policy chunk size for --local-chunks source.")
+    parser.add_argument("--chunk-overlap", type=int, default=100, help="Benefits/policy overlap for --local-chunks source.")
+    parser.add_argument("--output", type=str, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    unknown = [t for t in args.targets if t not in TARGET_VECTOR_MODES]
+    if unknown:
+        parser.error(f"Unknown target(s): {unknown}; choose from {list(TARGET_VECTOR_MODES)}")
+
+    queries = load_labelled_queries(args.product)
+    if args.max_queries:
+        queries = queries[:args.max_queries]
+    if not queries:
+        logger.error("No labelled queries found.")
+        return
+    products = sorted({q["product"] for q in queries})
+
+    cache = EmbeddingCache()
+    embed_start = time.perf_counter()
+    query_embs = [cache.embed(q["question"]) for q in queries]
+    cache.save()
+    logger.info(f"Query embeddings ready for {len(queries)} queries in {time.perf_counter() - embed_start:.1f}s "
+                f"(excluded from search latency)")
+
+    targets = args.targets
+    if args.backend == "local":
+        backend = LocalBackend(load_local_docs(args.local_chunks, products, args.chunk_size, args.chunk_overlap), cache)
+        if args.local_chunks == "source" and any(t != "content" for t in targets):
+            logger.warning("Re-chunked corpus has no generated questions; only the 'content' target is meaningful")
+    else:
+        backend = WeaviateBackend()
+
+    try:
+        results = run_grid(backend, queries, query_embs, args.alphas, args.limits, targets, args.ks)
+    finally:
+        backend.close()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "backend": args.backend,
+                "local_chunks": args.local_chunks if args.backend == "local" else None,
+                "chunk_size": args.chunk_size if args.backend == "local" and args.local_chunks == "source" else None,
+                "chunk_overlap": args.chunk_overlap if args.backend == "local" and args.local_chunks == "source" else None,
+                "products": products,
+                "results": results,
+            }, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
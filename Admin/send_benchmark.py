@@ -0,0 +1,226 @@
+"""
+Outbound send benchmark: GraphAPISender + OrderedSendQueue vs the previous plain-httpx sender.
+
+Sends `--messages` replies spread over `--recipients` users to a Graph API stub
+(started here from Admin/graph_stub_server.py unless `--base-url` is given) and
+reports, per variant: throughput, delivered/failed, send latency p50/p95/p99,
+throttling responses received and per-recipient ordering violations.
+
+Variants:
+  baseline: one AsyncClient with default limits over HTTP/1.1, three attempts with
+            0.5s doubling backoff regardless of error, recipients concurrent and
+            each recipient's replies sent one after another
+  sender:   the app's path (GraphAPISender pacing per phone number ID, adaptive
+            throttling backoff, OrderedSendQueue retries)
+
+Examples:
+  python Admin/send_benchmark.py --messages 2000 --recipients 400 --stub-mps 80
+  python Admin/send_benchmark.py --base-url http://127.0.0.1:8099 --variants sender --rate 60
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+
+import httpx
+
+log_directory = "Admin/logs"
+os.makedirs(log_directory, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.join(log_directory, "send_benchmark.log")),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HLAS_SRC = os.path.abspath(os.path.join(THIS_DIR, "..", "hlas", "src"))
+if HLAS_SRC not in sys.path:
+    sys.path.insert(0, HLAS_SRC)
+
+from hlas.utils.graph_sender import GraphAPISender  # noqa: E402
+from hlas.utils.send_queue import OrderedSendQueue  # noqa: E402
+
+PHONE_NUMBER_ID = "100000000000001"
+API_VERSION = "v18.0"
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(math.ceil(p / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def workload(args):
+    """(recipient, body) in send order; bodies start with the per-recipient sequence number."""
+    seq = {}
+    items = []
+    for i in range(args.messages):
+        to = f"65{90000000 + (i % args.recipients)}"
+        seq[to] = seq.get(to, 0) + 1
+        items.append((to, f"{seq[to]} benchmark reply {i}"))
+    return items
+
+
+async def run_baseline(args, items, latencies):
+    client = httpx.AsyncClient(timeout=httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=10.0))
+    url = f"{args.base_url}/{API_VERSION}/{PHONE_NUMBER_ID}/messages"
+    headers = {"Authorization": "Bearer stub", "Content-Type": "application/json"}
+    delivered = failed = 0
+
+    async def send(to, body):
+        nonlocal delivered, failed
+        backoff = 0.5
+        for attempt in range(3):
+            start = time.perf_counter()
+            try:
+                r = await client.post(url, headers=headers, json={"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": body}})
+                latencies.append(time.perf_counter() - start)
+                r.raise_for_status()
+                delivered += 1
+                return
+            except httpx.HTTPError:
+                if attempt == 2:
+                    failed += 1
+                    return
+                await asyncio.sleep(backoff)
+                backoff *= 2
+
+    by_recipient = {}
+    for to, body in items:
+        by_recipient.setdefault(to, []).append(body)
+
+    async def per_recipient(to, bodies):
+        for body in bodies:
+            await send(to, body)
+
+    try:
+        await asyncio.gather(*(per_recipient(to, bodies) for to, bodies in by_recipient.items()))
+    finally:
+        await client.aclose()
+    return delivered, failed
+
+
+async def run_sender(args, items, latencies):
+    graph = GraphAPISender("stub", base_url=args.base_url, api_version=API_VERSION, rate_per_s=args.rate)
+
+    async def send(to, body):
+        start = time.perf_counter()
+        try:
+            await graph.send_text(PHONE_NUMBER_ID, to, body)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    queue = OrderedSendQueue("bench", send, max_attempts=args.max_attempts, max_concurrency=args.concurrency)
+    try:
+        results = await asyncio.gather(*[queue.enqueue(to, body) for to, body in items])
+    finally:
+        await graph.aclose()
+    delivered = sum(1 for ok in results if ok)
+    return delivered, len(results) - delivered
+
+
+async def run_variant(name, args, items):
+    async with httpx.AsyncClient() as control:
+        await control.post(f"{args.base_url}/reset")
+        latencies = []
+        start = time.perf_counter()
+        runner = run_baseline if name == "baseline" else run_sender
+        delivered, failed = await runner(args, items, latencies)
+        elapsed = time.perf_counter() - start
+        stats = (await control.get(f"{args.base_url}/stats")).json()
+    return {
+        "variant": name,
+        "messages": len(items),
+        "delivered": delivered,
+        "failed": failed,
+        "elapsed_s": elapsed,
+        "throughput_per_s": delivered / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "requests": stats.get("requests", 0),
+        "throttled": stats.get("throttled", 0) + stats.get("pair_limited", 0),
+        "order_violations": stats.get("order_violations", 0),
+    }
+
+
+def start_stub(args):
+    cmd = [sys.executable, os.path.join(THIS_DIR, "graph_stub_server.py"), "--port", str(args.stub_port),
+           "--mps", str(args.stub_mps), "--latency-ms", str(args.stub_latency_ms),
+           "--error-rate", str(args.stub_error_rate)]
+    proc = subprocess.Popen(cmd)
+    base_url = f"http://127.0.0.1:{args.stub_port}"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/stats", timeout=1.0)
+            return proc, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Graph API stub did not start within 15s")
+
+
+def print_table(results):
+    header = ["variant", "delivered", "failed", "elapsed s", "msg/s", "p50 ms", "p95 ms", "p99 ms", "requests", "throttled", "order viol"]
+    print("\n" + " | ".join(f"{h:>10}" for h in header))
+    print("-" * (13 * len(header)))
+    for r in results:
+        cells = [r["variant"], str(r["delivered"]), str(r["failed"]), f"{r['elapsed_s']:.1f}", f"{r['throughput_per_s']:.1f}",
+                 f"{r['p50_ms']:.0f}", f"{r['p95_ms']:.0f}", f"{r['p99_ms']:.0f}", str(r["requests"]),
+                 str(r["throttled"]), str(r["order_violations"])]
+        print(" | ".join(f"{c:>10}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph API send throughput: previous sender vs GraphAPISender.")
+    parser.add_argument("--base-url", type=str, help="Running stub (or API) base URL; a stub is started when omitted.")
+    parser.add_argument("--variants", type=str, default="baseline,sender")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=80.0, help="GraphAPISender pacing rate (messages/s).")
+    parser.add_argument("--concurrency", type=int, default=64, help="OrderedSendQueue concurrent sends.")
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--stub-mps", type=int, default=80)
+    parser.add_argument("--stub-latency-ms", type=float, default=150.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=str, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    proc = None
+    if not args.base_url:
+        proc, args.base_url = start_stub(args)
+    try:
+        items = workload(args)
+        results = []
+        for name in [v.strip() for v in args.variants.split(",") if v.strip()]:
+            logger.info(f"Running variant '{name}' ({len(items)} messages, {args.recipients} recipients)")
+            results.append(asyncio.run(run_variant(name, args, items)))
+            time.sleep(1.5)  # let the stub's per-second window empty between variants
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Inbound stream benchmark: WhatsApp queue throughput from 1 to N consumer processes.
+
+Publishes `--messages` entries for `--users` users to a throw-away set of
+partition streams (prefix bench:inbound:<run>), then starts K consumer processes
+running hlas.inbound_stream.StreamConsumer with a synthetic handler and measures
+the time until every entry is acknowledged. The handler models one flow turn as
+`--cpu-ms` of event-loop-blocking work (prompt building, parsing) plus
+`--io-ms` of awaited I/O (LLM, Mongo); per-user ordering violations are counted.
+
+Only Redis is needed (REDIS_URL). All benchmark keys are deleted afterwards.
+
+Examples:
+  python Admin/stream_benchmark.py --max-consumers 8
+  python Admin/stream_benchmark.py --messages 2000 --users 200 --cpu-ms 30 --io-ms 400 --output Admin/logs/stream_benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import multiprocessing as mp
+
+log_directory = "Admin/logs"
+os.makedirs(log_directory, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(os.path.join(log_directory, "stream_benchmark.log")),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+HLAS_SRC = os.path.abspath(os.path.join(THIS_DIR, "..", "hlas", "src"))
+if HLAS_SRC not in sys.path:
+    sys.path.insert(0, HLAS_SRC)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from hlas.redis_utils import get_redis  # noqa: E402
+from hlas.inbound_stream import InboundStream, StreamConsumer, decode_entry  # noqa: E402
+
+LEASE_TTL_MS = 3000
+
+
+def _consumer_process(prefix, partitions, cpu_ms, io_ms):
+    """Child process: consume until terminated."""
+    r = get_redis()
+
+    async def handler(entry_id, fields):
+        user, _, metadata = decode_entry(fields)
+        end = time.perf_counter() + cpu_ms / 1000.0
+        while time.perf_counter() < end:
+            pass
+        await asyncio.sleep(io_ms / 1000.0)
+        previous = r.getset(f"{prefix}:bench:last:{user}", metadata.get("seq", 0))
+        if previous is not None and int(previous) > int(metadata.get("seq", 0)):
+            r.incr(f"{prefix}:bench:violations")
+        r.incr(f"{prefix}:bench:done")
+
+    async def main():
+        consumer = StreamConsumer(handler, prefix=prefix, group="bench", partitions=partitions,
+                                  lease_ttl_ms=LEASE_TTL_MS, reclaim_idle_ms=10000, block_ms=200)
+        await consumer.start()
+        r.incr(f"{prefix}:bench:ready")
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(main())
+
+
+def _cleanup(prefix):
+    r = get_redis()
+    keys = list(r.scan_iter(match=f"{prefix}:*", count=1000))
+    for i in range(0, len(keys), 500):
+        r.delete(*keys[i:i + 500])
+
+
+def run_once(consumers, args, run_id):
+    prefix = f"bench:inbound:{run_id}:{consumers}"
+    r = get_redis()
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_consumer_process, args=(prefix, args.partitions, args.cpu_ms, args.io_ms),
+                         name=f"consumer-{i}", daemon=True) for i in range(consumers)]
+    try:
+        for p in procs:
+            p.start()
+        deadline = time.time() + 60
+        while int(r.get(f"{prefix}:bench:ready") or 0) < consumers:
+            if time.time() > deadline:
+                raise RuntimeError("consumers did not start within 60s")
+            time.sleep(0.1)
+        # Let every consumer heartbeat and settle on its fair share of partitions
+        time.sleep(2 * LEASE_TTL_MS / 1000.0)
+
+        stream = InboundStream(prefix=prefix, partitions=args.partitions)
+        start = time.perf_counter()
+        seq = {}
+        for i in range(args.messages):
+            user = f"65{8000000 + (i % args.users)}"
+            seq[user] = seq.get(user, 0) + 1
+            stream.publish(user, f"bench message {i}", {"seq": seq[user], "message_id": f"{run_id}-{i}"})
+        while int(r.get(f"{prefix}:bench:done") or 0) < args.messages:
+            if time.perf_counter() - start > args.timeout:
+                logger.error(f"[{consumers} consumers] timed out with {r.get(f'{prefix}:bench:done')} / {args.messages} done")
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        done = int(r.get(f"{prefix}:bench:done") or 0)
+        return {
+            "consumers": consumers,
+            "messages": done,
+            "elapsed_s": elapsed,
+            "throughput_per_s": done / elapsed if elapsed > 0 else 0.0,
+            "order_violations": int(r.get(f"{prefix}:bench:violations") or 0),
+        }
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join(timeout=10)
+        _cleanup(prefix)
+
+
+def print_table(results):
+    header = ["consumers", "messages", "elapsed s", "msg/s", "speedup", "order viol"]
+    print("\n" + " | ".join(f"{h:>10}" for h in header))
+    print("-" * (13 * len(header)))
+    base = results[0]["throughput_per_s"] if results and results[0]["throughput_per_s"] else None
+    for r in results:
+        speedup = (r["throughput_per_s"] / base) if base else 0.0
+        cells = [str(r["consumers"]), str(r["messages"]), f"{r['elapsed_s']:.1f}", f"{r['throughput_per_s']:.1f}",
+                 f"{speedup:.2f}x", str(r["order_violations"])]
+        print(" | ".join(f"{c:>10}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inbound Redis Streams throughput with 1..N consumer processes.")
+    parser.add_argument("--max-consumers", type=int, default=4)
+    parser.add_argument("--consumers", type=str, help="Comma-separated consumer counts (overrides --max-consumers).")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--cpu-ms", type=float, default=20.0, help="Blocking work per message.")
+    parser.add_argument("--io-ms", type=float, default=200.0, help="Awaited I/O per message.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-run timeout in seconds.")
+    parser.add_argument("--output", type=str, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.consumers.split(",")] if args.consumers else list(range(1, max(1, args.max_consumers) + 1))
+    run_id = uuid.uuid4().hex[:8]
+    results = []
+    for k in counts:
+        logger.info(f"Running with {k} consumer process(es)")
+        results.append(run_once(k, args, run_id))
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,4 +53,5 @@ recommendation_responder = build_agent_from_config("recommendation_responder", u
 follow_up_agent = build_agent_from_config("follow_up_agent", use_response_llm=True)
 tier_identifier = build_agent_from_config("tier_identifier")
 followup_clarification_agent = build_agent_from_config("followup_clarification_agent", use_response_llm=True)
+turn_interpreter = build_agent_from_config("turn_interpreter")
 
@@ -0,0 +1,292 @@
+"""
+Structured product x tier x benefit matrix built from the benefits corpus.
+
+Admin/embedding_agent.py parses every table-derived benefits sentence with
+`benefits_parser.parse_row` and writes the result to
+config/benefits_matrix.json. At query time the matrix is loaded once and
+indexed by benefit-name tokens; `answer_from_matrix` resolves direct limit
+lookups ("overseas medical limit on Gold?") and tier-vs-tier questions
+without retrieval or an LLM call. Anything it is not confident about returns
+None so InfoFlow can continue with hybrid search + synthesis.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .benefits_parser import canonical_tier, parse_row, tiers_for_product
+
+logger = logging.getLogger(__name__)
+
+MATRIX_PATH = Path(__file__).resolve().parent / "config" / "benefits_matrix.json"
+MATRIX_VERSION = 1
+
+# Defaults used when a product template does not define a `matrix` block
+DEFAULT_MIN_COVERAGE = 0.6
+DEFAULT_MAX_ROWS = 8
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SECTION_RE = re.compile(r"^((?:Under|For)\b[^,]*),\s*")
+_LABEL_END_RE = re.compile(r"\s+(?:is|are)$")
+_LABEL_JOINED_RE = re.compile(r"\b(?:provides|providing|pays|of)$")
+# Questions the matrix may answer: explicit amount/limit lookups or tier-vs-tier
+_LOOKUP_INTENT_RE = re.compile(
+    r"\b(?:limit|limits|how much|amount|maximum|max|capped|cap|sum insured|payout|pay out|up to|covered up to)\b", re.I
+)
+_COMPARE_INTENT_RE = re.compile(r"\b(?:vs|versus|compare|comparison|difference|differ|between)\b", re.I)
+# Only answer with values that are already in the digit form the templates require
+_DISPLAYABLE_VALUE_RE = re.compile(r"\d|unlimited|not available|no coverage|no benefit|not covered|^covered$", re.I)
+
+# Words that carry no benefit identity in a question or row label
+_STOPWORDS = {
+    "a", "an", "the", "of", "for", "on", "in", "at", "to", "and", "or", "with", "by", "under", "per",
+    "what", "whats", "which", "is", "are", "was", "be", "it", "this", "that", "there", "any", "my", "me", "i",
+    "do", "does", "can", "will", "would", "how", "much", "tell", "about", "please", "show", "give", "get",
+    "limit", "limits", "max", "maximum", "amount", "cap", "capped", "up", "total", "value", "sum", "insured",
+    "benefit", "benefits", "coverage", "coverages", "cover", "covered", "covers", "plan", "plans", "tier", "tiers",
+    "policy", "insurance", "provide", "provides", "providing", "payable", "pay", "pays", "payout",
+    "vs", "versus", "compare", "comparison", "difference", "differ", "between", "s", "t", "have", "has",
+}
+
+
+def _normalize_token(tok: str) -> str:
+    if len(tok) > 3 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case content tokens (stopwords removed, naive singularization)."""
+    out = []
+    for tok in _WORD_RE.findall((text or "").lower().replace("'", "")):
+        if tok in _STOPWORDS:
+            continue
+        out.append(_normalize_token(tok))
+    return out
+
+
+def _bigrams(tokens: List[str]) -> Set[str]:
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+# ---------------------------------------------------------------------------
+# Build (ingestion side)
+# ---------------------------------------------------------------------------
+
+def build_product_rows(text: str, product: str) -> List[Dict[str, Any]]:
+    """Parse a product's benefits text into matrix rows."""
+    rows: List[Dict[str, Any]] = []
+    for line in (text or "").splitlines():
+        parsed = parse_row(line, product)
+        if not parsed:
+            continue
+        prefix = str(parsed["prefix"])
+        m = _SECTION_RE.match(prefix)
+        section = m.group(1) if m else ""
+        label = _LABEL_END_RE.sub("", prefix[m.end():] if m else prefix).strip(" ,-")
+        if label.lower().startswith("the "):
+            label = label[4:]
+        label = label[:1].upper() + label[1:]
+        rows.append({
+            "id": len(rows),
+            "section": section,
+            "label": label,
+            "prefix": prefix,
+            "values": parsed["values"],
+            "tail": parsed["tail"],
+        })
+    return rows
+
+
+def build_matrix(benefit_texts: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    """Build the serializable matrix.
+
+    Args:
+        benefit_texts: {product_name: {"text": ..., "source_file": ...}}
+    """
+    products: Dict[str, Any] = {}
+    for product_name, item in benefit_texts.items():
+        tiers = tiers_for_product(product_name)
+        if not tiers:
+            continue
+        products[product_name.lower()] = {
+            "product_name": product_name,
+            "tiers": tiers,
+            "source_file": item.get("source_file", ""),
+            "rows": build_product_rows(item.get("text", ""), product_name),
+        }
+    return {"version": MATRIX_VERSION, "products": products}
+
+
+def write_matrix(matrix: Dict[str, Any], path: Path = MATRIX_PATH) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(matrix, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+# ---------------------------------------------------------------------------
+# Query side
+# ---------------------------------------------------------------------------
+
+class BenefitsMatrix:
+    """In-memory matrix with an inverted index over benefit-name tokens."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.products: Dict[str, Dict[str, Any]] = {}
+        for key, prod in (data.get("products") or {}).items():
+            rows = prod.get("rows") or []
+            index: Dict[str, Set[int]] = {}
+            for row in rows:
+                toks = tokenize(f"{row.get('section', '')} {row.get('label', '')}")
+                row["_tokens"] = set(toks)
+                row["_bigrams"] = _bigrams(toks)
+                for tok in row["_tokens"]:
+                    index.setdefault(tok, set()).add(row["id"])
+            n = max(1, len(rows))
+            idf = {tok: math.log(1 + n / len(ids)) for tok, ids in index.items()}
+            self.products[key] = {**prod, "rows": rows, "index": index, "idf": idf}
+
+    def lookup(self, product: str, question: str, settings: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return {"rows": [...], "tiers": [...]} for a confident match, else None."""
+        settings = settings or {}
+        prod = self.products.get((product or "").lower())
+        if not prod or not prod["rows"]:
+            return None
+        min_coverage = float(settings.get("min_coverage", DEFAULT_MIN_COVERAGE))
+        max_rows = int(settings.get("max_rows", DEFAULT_MAX_ROWS))
+
+        valid_tiers = prod["tiers"]
+        mentioned = []
+        for tok in _WORD_RE.findall((question or "").lower()):
+            tier = canonical_tier(tok)
+            if tier in valid_tiers and tier not in mentioned:
+                mentioned.append(tier)
+        if not (_LOOKUP_INTENT_RE.search(question or "") or
+                (len(mentioned) >= 2 and _COMPARE_INTENT_RE.search(question or ""))):
+            return None
+
+        tier_tokens = {t.lower() for t in valid_tiers}
+        q_tokens = [t for t in tokenize(question) if t not in tier_tokens]
+        if not q_tokens:
+            return None
+        q_set = set(q_tokens)
+        q_bigrams = _bigrams(q_tokens)
+        product_tokens = set(tokenize(prod.get("product_name", product)))
+
+        candidate_ids: Set[int] = set()
+        for tok in q_set:
+            candidate_ids |= prod["index"].get(tok, set())
+        if not candidate_ids:
+            return None
+
+        scored = []
+        for rid in candidate_ids:
+            row = prod["rows"][rid]
+            matched = q_set & row["_tokens"]
+            matched_bigrams = q_bigrams & row["_bigrams"]
+            # The product's own name only counts against coverage when the row doesn't use it
+            denom = len(q_set - (product_tokens - row["_tokens"]))
+            coverage = len(matched) / max(1, denom)
+            score = sum(prod["idf"].get(t, 0.0) for t in matched)
+            score += 0.5 * len(matched_bigrams)
+            # Prefer the most specific label (fewest words the question didn't ask about)
+            score -= 0.1 * len(row["_tokens"] - q_set)
+            scored.append((score, coverage, (frozenset(matched), frozenset(matched_bigrams)), row))
+        scored.sort(key=lambda x: (-x[0], x[3]["id"]))
+
+        _, best_cov, best_matched, _ = scored[0]
+        if best_cov < min_coverage:
+            return None
+        # Rows matching exactly the same question words/phrases are variants (age groups, COVID, add-ons)
+        rows = [r for _, _, m, r in scored if m == best_matched]
+        if len(rows) > max_rows:
+            return None
+        rows.sort(key=lambda r: r["id"])
+
+        tiers = mentioned or list(valid_tiers)
+        for row in rows:
+            for tier in tiers:
+                value = row["values"].get(tier)
+                if value is None or not _DISPLAYABLE_VALUE_RE.search(value):
+                    return None
+        return {"rows": rows, "tiers": tiers, "source_file": prod.get("source_file", "")}
+
+
+def render_answer(match: Dict[str, Any]) -> str:
+    """Render matched rows as WhatsApp-friendly text (one line per tier when comparing)."""
+    tiers: List[str] = match["tiers"]
+    lines: List[str] = []
+    section = None
+    for row in match["rows"]:
+        if row.get("section") and row["section"] != section:
+            section = row["section"]
+            if lines:
+                lines.append("")
+            lines.append(f"*{section}*")
+        label = row.get("label") or row.get("prefix", "")
+        tail = f" ({row['tail'].lstrip(', ')})" if row.get("tail") else ""
+        sep = " " if _LABEL_JOINED_RE.search(label) else ": "
+        if len(tiers) == 1:
+            lines.append(f"• {label}{sep}{row['values'][tiers[0]]} on the {tiers[0]} plan{tail}")
+        else:
+            lines.append(f"• {label}{tail}")
+            for tier in tiers:
+                lines.append(f"   - {tier}: {row['values'][tier]}")
+    return "\n".join(lines)
+
+
+_MATRIX: Optional[BenefitsMatrix] = None
+_MATRIX_LOADED = False
+_MATRIX_LOCK = threading.Lock()
+
+
+def get_benefits_matrix() -> Optional[BenefitsMatrix]:
+    """Load config/benefits_matrix.json once; None when missing or invalid."""
+    global _MATRIX, _MATRIX_LOADED
+    if _MATRIX_LOADED:
+        return _MATRIX
+    with _MATRIX_LOCK:
+        if not _MATRIX_LOADED:
+            try:
+                with open(MATRIX_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != MATRIX_VERSION:
+                    logger.warning("BenefitsMatrix: unsupported version %s in %s", data.get("version"), MATRIX_PATH)
+                else:
+                    _MATRIX = BenefitsMatrix(data)
+                    logger.info("BenefitsMatrix: loaded %s", {k: len(v["rows"]) for k, v in _MATRIX.products.items()})
+            except FileNotFoundError:
+                logger.info("BenefitsMatrix: %s not found; deterministic answers disabled", MATRIX_PATH)
+            except Exception as e:
+                logger.warning("BenefitsMatrix: failed to load %s - %s", MATRIX_PATH, e)
+            _MATRIX_LOADED = True
+    return _MATRIX
+
+
+def answer_from_matrix(product: str, question: str, settings: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Answer a limit lookup / tier comparison from the matrix.
+
+    Returns {"reply": str, "source_file": str, "rows": int} or None to fall back to retrieval.
+    """
+    settings = settings or {}
+    if settings.get("enabled") is False:
+        return None
+    matrix = get_benefits_matrix()
+    if matrix is None:
+        return None
+    match = matrix.lookup(product, question, settings)
+    if not match:
+        return None
+    return {
+        "reply": render_answer(match),
+        "source_file": match.get("source_file", ""),
+        "rows": len(match["rows"]),
+    }
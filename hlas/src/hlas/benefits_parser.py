@@ -0,0 +1,195 @@
+"""
+Parser for the table-derived benefits corpus (Admin/source_db/benefits).
+
+The crawler flattens each benefits table row into one sentence that lists the
+value for every plan tier, e.g.
+
+    "Under the Travel Inconvenience coverage, the Trip Cancellation benefit is
+     $5,000 for the Basic plan, $7,000 for the Silver plan, ..."
+
+`parse_row` splits such a sentence into a shared prefix and a per-tier value
+map. It also understands inclusion rows ("... provided for Enhanced, Premier,
+and Exclusive plans but not for Basic plan"). `slice_benefits` uses it to
+rewrite a benefits document so that only the requested tiers remain, which
+keeps comparison/summary/recommendation prompts small.
+
+Rows `parse_row` does not understand (section headers, add-ons, "for all
+plans - Basic, ..." rows, rows that state a scope and then per-tier amounts
+such as Maid's Wages and Levy Reimbursement) are kept verbatim when they
+mention no tier, a requested tier or "all plans", and dropped otherwise. On
+the current corpus that is 28 of Maid's 53 lines, 3 of Travel's 63 and 4 of
+Personal Accident's 15, nearly all of them headers or tier-agnostic rows.
+
+Slicing must run on whole benefits lines (the source file, or the full text
+stored at ingest), never on overlapping retrieval chunks: a row cut at a
+chunk boundary parses into wrong values.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Canonical tier order per product (lower-case product keys, as used in templates)
+PRODUCT_TIERS: Dict[str, List[str]] = {
+    "travel": ["Basic", "Silver", "Gold", "Platinum"],
+    "maid": ["Basic", "Enhanced", "Premier", "Exclusive"],
+    "personalaccident": ["Bronze", "Silver", "Premier", "Platinum"],
+    "car": [],
+}
+
+# Spelling variants found in the source corpus
+_TIER_ALIASES = {"platinium": "Platinum"}
+
+_TIER_WORD = r"(?:Basic|Silver|Gold|Platinum|Platinium|Enhanced|Premier|Exclusive|Bronze)"
+_TIER_ITEM = rf"(?:the\s+)?{_TIER_WORD}(?:\s+plans?\b)?"
+_TIER_LIST = rf"{_TIER_ITEM}(?:\s*,\s*(?:and\s+)?{_TIER_ITEM}|\s+and\s+{_TIER_ITEM})*"
+_TIER_GROUP_RE = re.compile(
+    rf"\bfor\s+(?P<tiers>{_TIER_LIST})"
+    r"|\bfor\s+all\s+plans\b"
+)
+# "<benefit> ... provided for <tiers> but not (explicitly stated) for <tiers>."
+_INCLUSION_RE = re.compile(
+    rf"^(?P<prefix>.+?)\s+for\s+(?P<included>{_TIER_LIST})\s+but\s+not\s+(?P<unstated>explicitly\s+stated\s+)?"
+    rf"for\s+(?P<excluded>{_TIER_LIST})\s*\.?$"
+)
+_INCLUSION_VERB_RE = re.compile(
+    r"(?:\s*,?\s*(?:and\s+)?(?:is\s+)?(?:with\s+coverage\s+provided|coverage\s+provided|provided|included|covered|available))+$"
+)
+_TIER_NAME_RE = re.compile(_TIER_WORD)
+# Words after which the per-tier value starts
+_VALUE_BOUNDARY_RE = re.compile(r"\b(?:is|are|provides|providing|pays|of)\b")
+_LEADING_CONNECTOR_RE = re.compile(r"^[\s,;]*(?:(?:and|but|while|or)\b[\s,]*)*")
+_VALUE_HINT_RE = re.compile(r"\d|\$|dollar|unlimited|not available|no coverage|no benefit|covered|included|waived|percent", re.I)
+
+
+def canonical_tier(name: str) -> str:
+    """Normalize a tier name ("platinium" -> "Platinum", "gold" -> "Gold")."""
+    raw = (name or "").strip()
+    alias = _TIER_ALIASES.get(raw.lower())
+    if alias:
+        return alias
+    return raw[:1].upper() + raw[1:].lower()
+
+
+def tiers_for_product(product: Optional[str]) -> List[str]:
+    return list(PRODUCT_TIERS.get((product or "").lower(), []))
+
+
+def _clean_value(segment: str) -> str:
+    """Extract the value text from the span that precedes a tier group."""
+    matches = list(_VALUE_BOUNDARY_RE.finditer(segment))
+    value = segment[matches[-1].end():] if matches else segment
+    value = _LEADING_CONNECTOR_RE.sub("", value)
+    return value.strip(" ,;")
+
+
+def parse_row(row: str, product: Optional[str]) -> Optional[Dict[str, object]]:
+    """Parse a single benefits sentence into prefix + per-tier values.
+
+    Returns None when the row mentions no tiers or does not follow the
+    "<prefix> <value> for <tiers>, <value> for <tiers> ..." shape.
+    """
+    valid = tiers_for_product(product)
+    if not valid:
+        return None
+    text = row.strip()
+    if not text or "respectively" in text:
+        return None
+    inclusion = _INCLUSION_RE.match(text)
+    if inclusion:
+        return _parse_inclusion_row(inclusion, valid)
+    groups = list(_TIER_GROUP_RE.finditer(text))
+    if not groups:
+        return None
+
+    values: Dict[str, str] = {}
+    prefix = ""
+    cursor = 0
+    for idx, m in enumerate(groups):
+        segment = text[cursor:m.start()]
+        if idx == 0:
+            boundary = list(_VALUE_BOUNDARY_RE.finditer(segment))
+            if not boundary:
+                return None
+            prefix = segment[:boundary[-1].end()].strip()
+        value = _clean_value(segment)
+        if not value or not _VALUE_HINT_RE.search(value):
+            return None
+        if m.group("tiers"):
+            tiers = [canonical_tier(t) for t in _TIER_NAME_RE.findall(m.group("tiers"))]
+        else:
+            tiers = list(valid)  # "for all plans"
+        for tier in tiers:
+            if tier not in valid:
+                return None
+            values[tier] = value
+        cursor = m.end()
+
+    tail = text[cursor:].strip()
+    if tail.strip(" .;,"):
+        # Trailing qualifiers apply to every tier; anything mentioning a tier is not understood
+        if _TIER_NAME_RE.search(tail):
+            return None
+    else:
+        tail = ""
+    return {"prefix": prefix, "values": values, "tail": tail.strip(" .")}
+
+
+def _parse_inclusion_row(m: "re.Match[str]", valid: List[str]) -> Optional[Dict[str, object]]:
+    prefix = _INCLUSION_VERB_RE.sub("", m.group("prefix")).strip(" ,")
+    if not prefix:
+        return None
+    missing = "not stated" if m.group("unstated") else "not covered"
+    values: Dict[str, str] = {}
+    for group, value in (("included", "covered"), ("excluded", missing)):
+        for tier in (canonical_tier(t) for t in _TIER_NAME_RE.findall(m.group(group))):
+            if tier not in valid:
+                return None
+            values[tier] = value
+    return {"prefix": f"{prefix} -", "values": values, "tail": ""}
+
+
+def render_row(parsed: Dict[str, object], tiers: Iterable[str]) -> str:
+    """Rebuild a benefits sentence that only lists `tiers`."""
+    values: Dict[str, str] = parsed["values"]  # type: ignore[assignment]
+    parts = [f"{values[t]} for the {t} plan" for t in tiers if t in values]
+    if not parts:
+        return ""
+    body = parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + ", and " + parts[-1]
+    sentence = f"{parsed['prefix']} {body}"
+    if parsed.get("tail"):
+        tail = str(parsed["tail"])
+        sentence += tail if tail.startswith(",") else f", {tail}"
+    return sentence.rstrip(" ,") + "."
+
+
+def slice_benefits(text: str, product: Optional[str], tiers: Iterable[str]) -> str:
+    """Return `text` reduced to the rows relevant for `tiers`.
+
+    - Parsed rows are rewritten to list only the requested tiers.
+    - Rows that mention no tier (headers, product-wide benefits) are kept.
+    - Unparseable rows are kept verbatim when they mention a requested tier.
+    Falls back to the full text when no valid tier is requested.
+    """
+    valid = tiers_for_product(product)
+    wanted = [t for t in (canonical_tier(x) for x in tiers or []) if t in valid]
+    if not wanted:
+        return text
+    wanted = [t for t in valid if t in wanted]  # canonical order
+
+    out: List[str] = []
+    for line in (text or "").splitlines():
+        row = line.strip()
+        if not row:
+            continue
+        parsed = parse_row(row, product)
+        if parsed is not None:
+            rendered = render_row(parsed, wanted)
+            if rendered:
+                out.append(rendered)
+            continue
+        mentioned = {canonical_tier(t) for t in _TIER_NAME_RE.findall(row)}
+        if not mentioned or mentioned.intersection(wanted) or re.search(r"\ball plans\b", row, re.I):
+            out.append(row)
+    return "\n".join(out)
@@ -54,6 +54,8 @@ class ConfigLoader:
         self._initialized = True
         self._agents_spec: Dict[str, Any] = {}
         self._tasks_spec: Dict[str, Any] = {}
+        self._llm_gateway_spec: Dict[str, Any] = {}
+        self._ir_response_spec: Dict[str, Any] = {}
         self._config_dir = Path(__file__).parent / "config"
         self._load_configs()
     
@@ -86,6 +88,34 @@ class ConfigLoader:
         except Exception as e:
             logger.error("ConfigLoader: Failed to load tasks.yaml - %s", str(e))
             self._tasks_spec = {}
+
+        # Load LLM gateway limits (optional file; gateway falls back to built-in defaults)
+        try:
+            gateway_path = self._config_dir / "llm_gateway.yaml"
+            with open(gateway_path, "r", encoding="utf-8") as f:
+                self._llm_gateway_spec = yaml.safe_load(f) or {}
+            _log_once(
+                key="config_llm_gateway_loaded",
+                level=logging.INFO,
+                message=f"ConfigLoader: Loaded llm_gateway.yaml - {len(self._llm_gateway_spec.get('deployments') or {})} deployment overrides",
+            )
+        except Exception as e:
+            logger.warning("ConfigLoader: Failed to load llm_gateway.yaml - %s", str(e))
+            self._llm_gateway_spec = {}
+
+        # Load per-product InfoFlow settings (response templates, benefits matrix, rerank)
+        try:
+            ir_response_path = self._config_dir / "ir_response.yaml"
+            with open(ir_response_path, "r", encoding="utf-8") as f:
+                self._ir_response_spec = yaml.safe_load(f) or {}
+            _log_once(
+                key="config_ir_response_loaded",
+                level=logging.INFO,
+                message=f"ConfigLoader: Loaded ir_response.yaml - {len(self._ir_response_spec)} products defined",
+            )
+        except Exception as e:
+            logger.warning("ConfigLoader: Failed to load ir_response.yaml - %s", str(e))
+            self._ir_response_spec = {}
     
     @property
     def agents_spec(self) -> Dict[str, Any]:
@@ -96,6 +126,16 @@ class ConfigLoader:
     def tasks_spec(self) -> Dict[str, Any]:
         """Get the cached tasks specification."""
         return self._tasks_spec
+
+    @property
+    def llm_gateway_spec(self) -> Dict[str, Any]:
+        """Get the cached LLM gateway specification."""
+        return self._llm_gateway_spec
+
+    @property
+    def ir_response_spec(self) -> Dict[str, Any]:
+        """Get the cached per-product InfoFlow settings (ir_response.yaml)."""
+        return self._ir_response_spec
     
     def reload(self) -> None:
         """
@@ -126,6 +166,16 @@ def get_tasks_spec() -> Dict[str, Any]:
     return _config_loader.tasks_spec
 
 
+def get_llm_gateway_spec() -> Dict[str, Any]:
+    """Get the cached LLM gateway specification."""
+    return _config_loader.llm_gateway_spec
+
+
+def get_ir_response_spec() -> Dict[str, Any]:
+    """Get the cached per-product InfoFlow settings (ir_response.yaml)."""
+    return _config_loader.ir_response_spec
+
+
 def reload_configs() -> None:
     """
     Reload configurations from disk.
@@ -0,0 +1,157 @@
+"""
+Token-budgeted context packing for retrieval-augmented synthesis.
+
+Hybrid search returns a fixed number of chunks regardless of how relevant the
+tail is, and the ingestion chunkers use overlapping windows (benefits: 100
+chars, policy: 200 chars). The packer trims the result list at the first large
+relevance-score gap, strips text already present in a previously packed chunk
+from the same source, and stops once the per-product token budget is filled.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when a product template does not define a `context` block
+DEFAULT_MAX_TOKENS = 3000
+DEFAULT_SCORE_GAP = 0.35
+DEFAULT_MIN_CHUNKS = 3
+DEFAULT_MIN_OVERLAP_CHARS = 40
+DEFAULT_MAX_OVERLAP_CHARS = 400
+
+# Optional tokenizer (installed transitively with langchain_openai); fall back to a char heuristic
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover - tokenizer unavailable
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Return the token count for `text` (approximate when tiktoken is unavailable)."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        try:
+            return len(_ENCODING.encode(text))
+        except Exception:
+            pass
+    return max(1, len(text) // 4)
+
+
+def _overlap_len(left: str, right: str, min_chars: int, max_chars: int) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    limit = min(len(left), len(right), max_chars)
+    for k in range(limit, min_chars - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def strip_overlap(text: str, kept: Sequence[str], min_chars: int = DEFAULT_MIN_OVERLAP_CHARS,
+                  max_chars: int = DEFAULT_MAX_OVERLAP_CHARS) -> str:
+    """Remove spans of `text` that duplicate the edges of already-kept chunks.
+
+    Handles both orientations of a sliding-window overlap (the kept chunk may
+    precede or follow `text` in the source document). Returns "" when `text`
+    is entirely contained in a kept chunk.
+    """
+    out = text
+    for prev in kept:
+        if not out:
+            break
+        if out in prev:
+            return ""
+        # prev ... | overlap | ... out
+        k = _overlap_len(prev, out, min_chars, max_chars)
+        if k:
+            out = out[k:]
+            continue
+        # out ... | overlap | ... prev
+        k = _overlap_len(out, prev, min_chars, max_chars)
+        if k:
+            out = out[:-k]
+    return out.strip()
+
+
+def cut_at_score_gap(scores: Sequence[Optional[float]], gap: float, min_keep: int) -> int:
+    """Return how many leading results to keep.
+
+    Results are cut at the first drop between consecutive scores larger than
+    `gap` times the top score. Missing scores disable the cut.
+    """
+    n = len(scores)
+    if n <= min_keep or any(s is None for s in scores):
+        return n
+    top = scores[0] or 0.0
+    if top <= 0:
+        return n
+    for i in range(max(1, min_keep), n):
+        if (scores[i - 1] - scores[i]) > gap * top:
+            return i
+    return n
+
+
+def pack_context(chunks: List[Dict[str, Any]], budget: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pack ranked chunks into a single context string under a token budget.
+
+    Args:
+        chunks: Ranked list of dicts with keys `content`, `doc_type`, `source_file`
+            and optional `score` (higher is more relevant).
+        budget: Optional per-product settings: `max_tokens`, `score_gap`,
+            `min_chunks`, `min_overlap_chars`.
+
+    Returns:
+        Dict with `context` (str), `used` (list of packed chunk dicts),
+        `raw_tokens` (tokens of the naive concatenation) and `packed_tokens`.
+    """
+    budget = budget or {}
+    max_tokens = int(budget.get("max_tokens", DEFAULT_MAX_TOKENS))
+    score_gap = float(budget.get("score_gap", DEFAULT_SCORE_GAP))
+    min_chunks = int(budget.get("min_chunks", DEFAULT_MIN_CHUNKS))
+    min_overlap = int(budget.get("min_overlap_chars", DEFAULT_MIN_OVERLAP_CHARS))
+
+    def _fmt(doc_type: str, content: str) -> str:
+        return f"Source (Type: {doc_type}): {content}"
+
+    raw_tokens = count_tokens("\n---\n".join(_fmt(c.get("doc_type", ""), c.get("content", "")) for c in chunks))
+
+    keep_n = cut_at_score_gap([c.get("score") for c in chunks], score_gap, min_chunks)
+
+    kept_by_source: Dict[str, List[str]] = {}
+    used: List[Dict[str, Any]] = []
+    parts: List[str] = []
+    total = 0
+    for c in chunks[:keep_n]:
+        content = (c.get("content") or "").strip()
+        source = c.get("source_file") or ""
+        if not content:
+            continue
+        content = strip_overlap(content, kept_by_source.get(source, []), min_chars=min_overlap)
+        if not content:
+            continue
+        part = _fmt(c.get("doc_type", ""), content)
+        cost = count_tokens(part)
+        # Always admit the top chunk so synthesis has something to work with
+        if used and total + cost > max_tokens:
+            break
+        kept_by_source.setdefault(source, []).append(c.get("content") or "")
+        used.append({**c, "content": content})
+        parts.append(part)
+        total += cost
+
+    context = "\n---\n".join(parts)
+    packed_tokens = count_tokens(context)
+    logger.debug(
+        "ContextPacker: in=%d score_cut=%d packed=%d raw_tokens=%d packed_tokens=%d",
+        len(chunks), keep_n, len(used), raw_tokens, packed_tokens,
+    )
+    return {
+        "context": context,
+        "used": used,
+        "raw_tokens": raw_tokens,
+        "packed_tokens": packed_tokens,
+    }
@@ -7,7 +7,8 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 import yaml
-from .prompt_runner import run_direct_task
+from .prompt_runner import run_direct_task, parse_json_output, structured_output_format
+from .llm_gateway import gateway_for
 from .config_loader import get_agents_spec, get_tasks_spec
 from zoneinfo import ZoneInfo  # Python 3.9+
 from .tasks import (
@@ -17,13 +18,13 @@ from .tasks import (
 )
 from .tools.benefits_tool import benefits_tool
 from .agents import recommendation_responder
-from json import loads as json_loads
 from json import dumps as json_dumps
-import re
 from .flows.info_flow import InfoFlowHelper
 from .flows.compare_flow import CompareFlowHelper
 from .flows.summary_flow import SummaryFlowHelper
 from .utils.greeting import get_time_based_greeting
+from . import turn_understanding
+from .turn_trace import stage_timer
 
 # Try to import RecFlow with error handling
 try:
@@ -35,6 +36,12 @@ except ImportError as e:
     RecFlowHelper = None
     logger.warning("Flow.__init__: RecFlow import failed: %s", e)
 
+# Directives with their own branch in HlasFlow.decide (decide stage timing label)
+_DECIDE_BRANCHES = {
+    "greet", "handle_capabilities", "handle_information", "handle_follow_up", "handle_summary",
+    "plan_only_comparison", "handle_recommendation", "handle_other",
+}
+
 
 class HlasState(BaseModel):
     session: Dict[str, Any] = {}
@@ -48,6 +55,8 @@ class HlasState(BaseModel):
     slot_value: Optional[str] = None
     reply: str = ""
     sources: str = ""
+    # Unified turn-understanding result for the current message (see turn_understanding.py)
+    nlu: Optional[Dict[str, Any]] = None
 
 
 class HlasFlow(Flow[HlasState]):
@@ -62,7 +71,8 @@ class HlasFlow(Flow[HlasState]):
         logger.info("HlasFlow.__init__: Using cached config - agents=%d, tasks=%d", 
                    len(self._agents_spec), len(self._tasks_spec))
 
-    def _llm_json_from_agent(self, agent_obj: Any, system_prompt: str, user_prompt: str, label: str) -> Dict[str, Any]:
+    def _llm_json_from_agent(self, agent_obj: Any, system_prompt: str, user_prompt: str, label: str,
+                             task_key: Optional[str] = None) -> Dict[str, Any]:
         logger.debug("HlasFlow._llm_json_from_agent: Starting %s - sys_len=%d, user_len=%d", 
                     label, len(system_prompt), len(user_prompt))
         try:
@@ -70,29 +80,11 @@ class HlasFlow(Flow[HlasState]):
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ]
-            raw = agent_obj.llm.call(messages=messages)
+            raw = gateway_for(agent_obj.llm).call(messages, label=label, task_key=task_key,
+                                                  response_format=structured_output_format(task_key))
             txt = str(raw).strip()
             logger.debug("HlasFlow._llm_json_from_agent: LLM response for %s - length=%d", label, len(txt))
-            
-            # Try strict JSON first
-            try:
-                result = json_loads(txt)
-                logger.debug("HlasFlow._llm_json_from_agent: JSON parsing successful for %s", label)
-                return result
-            except Exception as e:
-                logger.debug("HlasFlow._llm_json_from_agent: Strict JSON failed for %s - %s, trying extraction", label, str(e))
-                # Best-effort JSON extraction (no external fallback)
-                m = re.search(r"\{[\s\S]*\}", txt)
-                if m:
-                    try:
-                        result = json_loads(m.group(0))
-                        logger.debug("HlasFlow._llm_json_from_agent: JSON extraction successful for %s", label)
-                        return result
-                    except Exception as e2:
-                        logger.warning("HlasFlow._llm_json_from_agent: JSON extraction failed for %s - %s", label, str(e2))
-                        return {}
-                logger.warning("HlasFlow._llm_json_from_agent: No JSON pattern found for %s", label)
-                return {}
+            return parse_json_output(txt, logger, label)
         except Exception as e:
             logger.error("HlasFlow._llm_json_from_agent: LLM call failed for %s - %s", label, str(e))
             return {}
@@ -127,6 +119,50 @@ class HlasFlow(Flow[HlasState]):
                 return s
         return None
 
+    def _route_context(self) -> Dict[str, Any]:
+        """Compact JSON context for the orchestrator (explicit flags)."""
+        current_user_message = self.state.message
+        product_in_session = self.state.session.get("product") or None
+
+        # Conversation stats and last assistant question flag
+        history = self.state.session.get("history", []) or []
+        history_len = len(history)
+        last_assistant_msg = ""
+        if history:
+            try:
+                last_assistant_msg = history[-1].get("assistant", "") or ""
+            except Exception:
+                last_assistant_msg = ""
+        has_prior_assistant_question = bool((last_assistant_msg or "").strip().endswith("?"))
+        has_session_pending_flag = bool(self.state.session.get("last_question") or self.state.session.get("_last_info_prod_q"))
+
+        # Prepare a short recent conversation window (most recent first) as structured pairs
+        recent_pairs = []
+        if history:
+            recent_turns = history[-1:]
+            recent_turns.reverse()
+            for turn in recent_turns:
+                pair = {}
+                u = turn.get("user", "")
+                a = turn.get("assistant", "")
+                if u:
+                    pair["user"] = u
+                if a:
+                    pair["assistant"] = a
+                if pair:
+                    recent_pairs.append(pair)
+
+        # Explicit flow flags in a single JSON object
+        return {
+            "current_user_message": current_user_message,
+            "session_product": product_in_session,
+            "first_turn": (history_len == 0),
+            "history_len": history_len,
+            "has_prior_assistant_question": has_prior_assistant_question,
+            "has_session_pending_flag": has_session_pending_flag,
+            "recent_conversation": recent_pairs,
+        }
+
     @start()
     def ingest(self) -> Dict[str, Any]:
         # Inputs provided to kickoff() populate state automatically in CrewAI Flows
@@ -141,6 +177,16 @@ class HlasFlow(Flow[HlasState]):
 
     @router(ingest)
     def decide(self, payload: Dict[str, Any]) -> str:
+        # Timed per branch taken: directive, continue_* for in-progress flows, fallback otherwise
+        with stage_timer("decide") as stage:
+            self._decide_branch = "fallback"
+            try:
+                return self._decide(payload)
+            finally:
+                stage.detail = self._decide_branch
+                stage.product = self.state.session.get("product") or self.state.product
+
+    def _decide(self, payload: Dict[str, Any]) -> str:
         # Debug session state at entry
         recommendation_status = self.state.session.get("recommendation_status")
         comparison_status = self.state.session.get("comparison_status")
@@ -149,10 +195,16 @@ class HlasFlow(Flow[HlasState]):
         
         logger.info("HlasFlow.decide: Entry state - message='%s', rec_status='%s', cmp_status='%s', sum_status='%s', product='%s'", 
                    self.state.message[:100], recommendation_status, comparison_status, summary_status, session_product)
+
+        # Optional single-call turn understanding; helpers reuse it instead of their own classifier calls
+        self.state.nlu = None
+        if turn_understanding.is_enabled():
+            self.state.nlu = turn_understanding.understand_turn(self.state, self._route_context(), self._logger)
         
         # Check recommendation status for simplified flow control
         if recommendation_status == "in_progress":
             logger.info("HlasFlow.decide: Recommendation in progress, bypassing orchestrator to RecFlow")
+            self._decide_branch = "continue_recommendation"
             if RECFLOW_AVAILABLE and RecFlowHelper:
                 return RecFlowHelper.handle(self.state, {"directive": "continue_recommendation"}, self._logger)
             else:
@@ -161,10 +213,12 @@ class HlasFlow(Flow[HlasState]):
 
         elif comparison_status == "in_progress":
             logger.info("HlasFlow.decide: Comparison in progress, bypassing orchestrator to CompareFlow")
+            self._decide_branch = "continue_comparison"
             return CompareFlowHelper.handle(self.state, {}, self._logger)
 
         elif summary_status == "in_progress":
             logger.info("HlasFlow.decide: Summary in progress, bypassing orchestrator to SummaryFlow")
+            self._decide_branch = "continue_summary"
             return SummaryFlowHelper.handle(self.state, {}, self._logger)
 
         # Cleanup for completed flows
@@ -183,61 +237,22 @@ class HlasFlow(Flow[HlasState]):
         # Fall through to orchestrator if no multi-turn flow is active
         logger.debug("HlasFlow.decide: No active multi-turn flow, proceeding to orchestrator")
 
-        # Create structured context for the orchestrator (compact JSON, explicit flags)
-        current_user_message = self.state.message
-        product_in_session = self.state.session.get("product") or None
-
-        # Conversation stats and last assistant question flag
-        history = self.state.session.get("history", []) or []
-        history_len = len(history)
-        last_assistant_msg = ""
-        if history:
-            try:
-                last_assistant_msg = history[-1].get("assistant", "") or ""
-            except Exception:
-                last_assistant_msg = ""
-        has_prior_assistant_question = bool((last_assistant_msg or "").strip().endswith("?"))
-        has_session_pending_flag = bool(self.state.session.get("last_question") or self.state.session.get("_last_info_prod_q"))
-
-        # Prepare a short recent conversation window (most recent first) as structured pairs
-        recent_pairs = []
-        if history:
-            recent_turns = history[-1:]
-            recent_turns.reverse()
-            for turn in recent_turns:
-                pair = {}
-                u = turn.get("user", "")
-                a = turn.get("assistant", "")
-                if u:
-                    pair["user"] = u
-                if a:
-                    pair["assistant"] = a
-                if pair:
-                    recent_pairs.append(pair)
-
-        # Explicit flow flags in a single JSON object
-        context_rd_obj = {
-            "current_user_message": current_user_message,
-            "session_product": product_in_session,
-            "first_turn": (history_len == 0),
-            "history_len": history_len,
-            "has_prior_assistant_question": has_prior_assistant_question,
-            "has_session_pending_flag": has_session_pending_flag,
-            "recent_conversation": recent_pairs,
-        }
-        context_rd = json_dumps(context_rd_obj)
+        context_rd = json_dumps(self._route_context())
 
         
         logger.info("HlasFlow.decide: Calling orchestrator - context_len=%d", len(context_rd))
         
-        d = run_direct_task(
-            agent_obj=route_decision_task.agent,
-            agent_key="orchestrator",
-            task_key="route_decision",
-            context_text=context_rd,
-            logger=self._logger,
-            label="orchestrator.route_decision",
-        ) or {"directive": "handle_capabilities"}
+        if self.state.nlu and self.state.nlu.get("directive"):
+            d = {"directive": self.state.nlu["directive"]}
+        else:
+            d = run_direct_task(
+                agent_obj=route_decision_task.agent,
+                agent_key="orchestrator",
+                task_key="route_decision",
+                context_text=context_rd,
+                logger=self._logger,
+                label="orchestrator.route_decision",
+            ) or {"directive": "handle_capabilities"}
 
         # Log the orchestrator's raw output for debugging/traceability
         directive = d.get("directive", "handle_capabilities")
@@ -253,6 +268,9 @@ class HlasFlow(Flow[HlasState]):
             directive = "handle_information"
         # --- End guard ---
 
+        if directive in _DECIDE_BRANCHES:
+            self._decide_branch = directive
+
         # --- Observability for follow-up ---
         if directive == "handle_follow_up":
             logger.info("HlasFlow.decide: follow_up selected by orchestrator (non-first turn). Proceeding as follow-up.")
@@ -5,7 +5,10 @@ import yaml
 
 from ..tasks import identify_product_task, identify_tiers_task
 from ..prompt_runner import run_direct_task
+from ..turn_understanding import nlu_product, nlu_tiers
 from ..llm import azure_llm, azure_response_llm
+from ..llm_gateway import gateway_for
+from ..turn_trace import stage_timer
 from ..tools.benefits_tool import benefits_tool
 
 
@@ -144,14 +147,16 @@ class CompareFlowHelper:
                 comparison_slot["product"] = existing
                 return
             # Call product identifier once
-            prod = run_direct_task(
-                agent_obj=identify_product_task.agent,
-                agent_key="product_identifier",
-                task_key="identify_product",
-                context_text=f"User Message: {message}\nSession product: {session.get('product')}",
-                logger=logger,
-                label="product_identifier.identify_product.for_comparison",
-            ) or {}
+            prod = nlu_product(state)
+            if prod is None:
+                prod = run_direct_task(
+                    agent_obj=identify_product_task.agent,
+                    agent_key="product_identifier",
+                    task_key="identify_product",
+                    context_text=f"User Message: {message}\nSession product: {session.get('product')}",
+                    logger=logger,
+                    label="product_identifier.identify_product.for_comparison",
+                ) or {}
             try:
                 logger.info(
                     "CompareFlow.product_identified: product=%s confidence=%s",
@@ -191,14 +196,16 @@ class CompareFlowHelper:
                 f"User Message: {message}\n"
                 f"Recent conversation (most recent first):\n" + "\n".join(ctx_lines)
             )
-            tiers_res = run_direct_task(
-                agent_obj=identify_tiers_task.agent,
-                agent_key="tier_identifier",
-                task_key="identify_tiers",
-                context_text=tiers_ctx,
-                logger=logger,
-                label="tier_identifier.identify_tiers",
-            ) or {}
+            tiers_res = nlu_tiers(state)
+            if tiers_res is None:
+                tiers_res = run_direct_task(
+                    agent_obj=identify_tiers_task.agent,
+                    agent_key="tier_identifier",
+                    task_key="identify_tiers",
+                    context_text=tiers_ctx,
+                    logger=logger,
+                    label="tier_identifier.identify_tiers",
+                ) or {}
             new_tiers = tiers_res.get("tiers") or []
             # If identifier infers product, handle product switches
             inferred_product = tiers_res.get("product")
@@ -272,9 +279,9 @@ class CompareFlowHelper:
         except Exception:
             pass
 
-        # Retrieve all benefits for product
+        # Retrieve benefits for the requested tiers only (Car has no tiers and returns everything)
         try:
-            benefits_text = benefits_tool.run(product=product)
+            benefits_text = benefits_tool.run(product=product, tiers=list(tiers_list))
         except Exception:
             benefits_text = ""
         try:
@@ -304,10 +311,11 @@ class CompareFlowHelper:
         logger.info("LLM Direct [comparison.synthesis]:\n[SYSTEM]\n%s\n\n[USER]\n%s", sys_t, usr_t)
         try:
             # Use response LLM for user-facing comparison synthesis
-            txt = azure_response_llm.call(messages=[
-                {"role": "system", "content": sys_t},
-                {"role": "user", "content": usr_t},
-            ])
+            with stage_timer("llm_synthesis", detail="compare", product=product):
+                txt = gateway_for(azure_response_llm).call([
+                    {"role": "system", "content": sys_t},
+                    {"role": "user", "content": usr_t},
+                ], label="comparison.synthesis", task_key="compare_synthesis")
             answer = str(txt).strip()
         except Exception:
             answer = ""
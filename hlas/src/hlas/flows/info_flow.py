@@ -1,14 +1,20 @@
 from typing import Dict, Any
 import logging
+import time
 
 from ..tasks import identify_product_task
 from ..vector_store import get_weaviate_client
 from ..llm import azure_llm, azure_embeddings, azure_response_llm
+from ..llm_gateway import gateway_for
 from ..prompt_runner import run_direct_task
-from pathlib import Path
-import yaml
-# Import TargetVectors and Filter for the query
-from weaviate.classes.query import TargetVectors, Filter
+from ..turn_understanding import nlu_product
+from ..context_packer import pack_context
+from ..benefits_matrix import answer_from_matrix
+from .. import reranker
+from ..retrieval import KB_COLLECTION_NAME, DEFAULT_HYBRID_LIMIT, hybrid_search, bm25_search
+from ..turn_trace import stage_timer
+from ..metrics import RAG_CONTEXT_TOKENS, RAG_CONTEXT_TOKENS_SAVED, INFO_SYNTHESIS_SECONDS, BENEFITS_MATRIX_LOOKUPS
+from ..config_loader import get_ir_response_spec
 
 
 class InfoFlowHelper:
@@ -52,14 +58,16 @@ class InfoFlowHelper:
         if not use_fast_path:
             # Ensure product
             if not state.product:
-                prod = run_direct_task(
-                    agent_obj=identify_product_task.agent,
-                    agent_key="product_identifier",
-                    task_key="identify_product",
-                    context_text=f"Message: {state.message}\nSession product: {state.session.get('product')}",
-                    logger=logger,
-                    label="product_identifier.identify_product",
-                ) or {}
+                prod = nlu_product(state)
+                if prod is None:
+                    prod = run_direct_task(
+                        agent_obj=identify_product_task.agent,
+                        agent_key="product_identifier",
+                        task_key="identify_product",
+                        context_text=f"Message: {state.message}\nSession product: {state.session.get('product')}",
+                        logger=logger,
+                        label="product_identifier.identify_product",
+                    ) or {}
                 
                 logger.info("InfoFlow.identify_product: product=%s, confidence=%s, has_question=%s",
                            prod.get("product"),
@@ -130,17 +138,43 @@ class InfoFlowHelper:
         logger.info("InfoFlow.retrieval: Starting search - query='%s', product='%s', query_len=%d", 
                    question[:100], product, len(question))
 
+        # Deterministic path: direct limit lookups / tier-vs-tier questions answered from the benefits matrix
+        if product:
+            matrix_start = time.perf_counter()
+            matrix_answer = None
+            try:
+                matrix_answer = answer_from_matrix(product, question, InfoFlowHelper._template_block(product, "matrix"))
+            except Exception as e:
+                logger.warning("InfoFlow.matrix: Lookup failed - %s", str(e))
+            try:
+                BENEFITS_MATRIX_LOOKUPS.labels(product=product.lower(), outcome="hit" if matrix_answer else "miss").inc()
+            except Exception:
+                pass
+            if matrix_answer:
+                logger.info("InfoFlow.matrix: Answered from benefits matrix - rows=%d, elapsed=%.1fms",
+                           matrix_answer["rows"], (time.perf_counter() - matrix_start) * 1000)
+                state.reply = matrix_answer["reply"]
+                state.sources = matrix_answer.get("source_file", "")
+                return "__done__"
+            logger.debug("InfoFlow.matrix: No confident match, continuing with retrieval")
+
         client = get_weaviate_client()
-        collection = client.collections.get("Insurance_Knowledge_Base")
+        collection = client.collections.get(KB_COLLECTION_NAME)
         
         # Embed query once and reuse for both named vectors
         emb = None
         try:
-            emb = azure_embeddings.embed_query(question)
+            with stage_timer("embedding", product=product):
+                emb = azure_embeddings.embed_query(question)
             logger.info("InfoFlow.embedding: Successfully generated embeddings")
         except Exception as e:
             logger.warning("InfoFlow.embedding: Failed to generate embeddings - %s, falling back to BM25", str(e))
 
+        # Optional MMR re-rank: request chunk vectors with the hybrid results
+        rerank_cfg = InfoFlowHelper._template_block(product, "rerank") if product else {}
+        use_rerank = reranker.is_enabled(rerank_cfg)
+        hybrid_limit = int(rerank_cfg.get("fetch_limit", reranker.DEFAULT_FETCH_LIMIT)) if use_rerank else DEFAULT_HYBRID_LIMIT
+
         # Perform hybrid search
         objects = []
         search_method = "unknown"
@@ -148,19 +182,12 @@ class InfoFlowHelper:
         if emb:
             try:
                 logger.info("InfoFlow.search: Executing hybrid search with multi-vector")
-                result = collection.query.hybrid(
-                    query=question,
-                    vector={
-                        "content_vector": emb,
-                        "questions_vector": emb,
-                    },
-                    target_vector=TargetVectors.average(["content_vector", "questions_vector"]),
-                    filters=Filter.by_property("product_name").equal(product),
-                    limit=10,
-                    alpha=0.7,
-                    return_properties=["content", "product_name", "doc_type", "source_file"],
-                )
-                objects = getattr(result, "objects", []) or []
+                with stage_timer("weaviate_query", detail="hybrid", product=product):
+                    objects = hybrid_search(
+                        collection, question, emb, product,
+                        limit=hybrid_limit,
+                        include_vector=[reranker.VECTOR_NAME] if use_rerank else None,
+                    )
                 search_method = "hybrid"
                 logger.info("InfoFlow.search: Hybrid search completed - results=%d", len(objects))
             except Exception as e:
@@ -170,13 +197,8 @@ class InfoFlowHelper:
         if not objects:
             try:
                 logger.info("InfoFlow.search: Falling back to BM25 search")
-                result = collection.query.bm25(
-                    query=question,
-                    filters=Filter.by_property("product_name").equal(product),
-                    limit=5,
-                    return_properties=["content", "product_name", "doc_type", "source_file"],
-                )
-                objects = getattr(result, "objects", []) or []
+                with stage_timer("weaviate_query", detail="bm25", product=product):
+                    objects = bm25_search(collection, question, product)
                 search_method = "bm25"
                 logger.info("InfoFlow.search: BM25 search completed - results=%d", len(objects))
             except Exception as e:
@@ -208,21 +230,43 @@ class InfoFlowHelper:
             logger.info("InfoFlow.synthesis: Total content=%d chars, doc_types=%s, sources=%d", 
                        total_content_length, dict(doc_types), len(sources))
             
-            context_str = "\n---\n".join([
-                f"Source (Type: {obj.properties.get('doc_type','')}): {obj.properties.get('content','')}" for obj in objects
-            ])
+            # Product-specific IR response templates (ir_response.yaml, loaded once by config_loader)
+            ir_templates = get_ir_response_spec()
+            tpl = ir_templates.get(product.lower(), {}) if product else {}
 
-            # Load product-specific IR response templates
-            ir_templates = {}
+            # Pack ranked chunks: cut at the relevance score gap, strip window overlaps, fill the token budget
+            ranked_chunks = []
+            for obj in objects:
+                metadata = getattr(obj, "metadata", None)
+                ranked_chunks.append({
+                    "content": obj.properties.get("content", "") or "",
+                    "doc_type": obj.properties.get("doc_type", "") or "",
+                    "source_file": obj.properties.get("source_file", "") or "",
+                    "score": getattr(metadata, "score", None) if metadata is not None else None,
+                    "vector": reranker.extract_vector(obj) if use_rerank else None,
+                })
+            context_cfg = dict(tpl.get("context") or {})
+            if use_rerank and search_method == "hybrid":
+                before = len(ranked_chunks)
+                ranked_chunks = reranker.rerank_chunks(ranked_chunks, emb, rerank_cfg)
+                # MMR order is no longer score-sorted; top_n replaces the score-gap cut
+                context_cfg["score_gap"] = float("inf")
+                logger.info("InfoFlow.rerank: MMR kept %d of %d chunks (lambda=%s)",
+                           len(ranked_chunks), before, rerank_cfg.get("lambda", reranker.DEFAULT_LAMBDA))
+            else:
+                ranked_chunks = reranker.rerank_chunks(ranked_chunks, None)
+            packed = pack_context(ranked_chunks, context_cfg)
+            context_str = packed["context"]
+            tokens_saved = max(0, packed["raw_tokens"] - packed["packed_tokens"])
             try:
-                base_dir = Path(__file__).resolve().parent.parent
-                with open(base_dir / "config" / "ir_response.yaml", "r", encoding="utf-8") as rf:
-                    ir_templates = yaml.safe_load(rf) or {}
-                logger.debug("InfoFlow.templates: Loaded templates for products: %s", list(ir_templates.keys()))
-            except Exception as e:
-                logger.warning("InfoFlow.templates: Failed to load templates - %s", str(e))
+                RAG_CONTEXT_TOKENS.labels(product=product.lower(), stage="raw").observe(packed["raw_tokens"])
+                RAG_CONTEXT_TOKENS.labels(product=product.lower(), stage="packed").observe(packed["packed_tokens"])
+                RAG_CONTEXT_TOKENS_SAVED.labels(product=product.lower()).inc(tokens_saved)
+            except Exception:
+                pass
+            logger.info("InfoFlow.context_pack: chunks %d -> %d, tokens %d -> %d (saved=%d)",
+                       len(ranked_chunks), len(packed["used"]), packed["raw_tokens"], packed["packed_tokens"], tokens_saved)
 
-            tpl = ir_templates.get(product.lower(), {}) if product else {}
             sys_t = tpl.get("system") or (
                 "You are an insurance information responder. Answer using only the provided context."
             )
@@ -234,14 +278,19 @@ class InfoFlowHelper:
             logger.info("InfoFlow.llm: Calling LLM with system_template_len=%d, user_template_len=%d", 
                        len(sys_t), len(usr_t))
             
+            synth_start = time.perf_counter()
             try:
                 # Use response LLM for user-facing information responses
-                txt = azure_response_llm.call(messages=[
-                    {"role": "system", "content": sys_t},
-                    {"role": "user", "content": usr_t},
-                ])
+                with stage_timer("llm_synthesis", detail="info", product=product):
+                    txt = gateway_for(azure_response_llm).call([
+                        {"role": "system", "content": sys_t},
+                        {"role": "user", "content": usr_t},
+                    ], label="info.synthesis", task_key="info_synthesis")
                 answer_text = str(txt).strip()
-                logger.info("InfoFlow.llm: Generated response length=%d", len(answer_text))
+                synth_elapsed = time.perf_counter() - synth_start
+                INFO_SYNTHESIS_SECONDS.labels(product=product.lower()).observe(synth_elapsed)
+                logger.info("InfoFlow.llm: Generated response length=%d in %.2fs (context_tokens=%d, saved=%d)",
+                           len(answer_text), synth_elapsed, packed["packed_tokens"], tokens_saved)
             except Exception as e:
                 logger.error("InfoFlow.llm: LLM call failed - %s", str(e))
                 answer_text = ""
@@ -260,8 +309,8 @@ class InfoFlowHelper:
                 )
                 total_attached_chars += len(content)
             
-            # Keep response sources concise: list only source file names
-            source_files = [obj.properties.get("source_file", "") for obj in objects]
+            # Keep response sources concise: list only source file names of chunks actually sent
+            source_files = [c.get("source_file", "") for c in packed["used"]]
             state.sources = "\n".join([s for s in source_files if s])
             
             logger.info(
@@ -278,3 +327,8 @@ class InfoFlowHelper:
         )
         state.sources = ""
         return "__done__"
+
+    @staticmethod
+    def _template_block(product: str, key: str) -> Dict[str, Any]:
+        """Per-product settings block (e.g. `matrix`, `rerank`) from ir_response.yaml; empty when absent."""
+        return (get_ir_response_spec().get(product.lower(), {}) or {}).get(key) or {}
@@ -5,10 +5,17 @@ import yaml
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 from ..prompt_runner import run_direct_task
+from ..llm_gateway import gateway_for
+from ..turn_trace import stage_timer
 from ..tools.benefits_tool import benefits_tool
+from ..benefits_parser import tiers_for_product
 from ..agents import recommendation_responder
+from ..turn_understanding import nlu_product, nlu_slots
+from ..slot_validators import validate_slot_locally
 
 
 class RecFlowHelper:
@@ -180,16 +187,18 @@ class RecFlowHelper:
         logger.info("RecFlow.extract_slots: Starting extraction - product=%s, required_slots=%d, last_question='%s'", 
                    product, len(required_slots), last_bot_question[:100])
         
-        # Use the slot extractor task
-        from ..tasks import extract_slots_task
-        extraction_result = run_direct_task(
-            agent_obj=extract_slots_task.agent,
-            agent_key="slot_extractor",
-            task_key="extract_slots",
-            context_text=context,
-            logger=logger,
-            label="slot_extractor.extract_slots",
-        ) or {}
+        # Use the slot extractor task unless the unified turn result already covers this product
+        extraction_result = nlu_slots(state, product)
+        if extraction_result is None:
+            from ..tasks import extract_slots_task
+            extraction_result = run_direct_task(
+                agent_obj=extract_slots_task.agent,
+                agent_key="slot_extractor",
+                task_key="extract_slots",
+                context_text=context,
+                logger=logger,
+                label="slot_extractor.extract_slots",
+            ) or {}
         
         logger.info("RecFlow.extract_slots: API output - keys=%s, user_needs_explanation=%s", 
                    list(extraction_result.keys()), extraction_result.get("user_needs_explanation"))
@@ -212,6 +221,13 @@ class RecFlowHelper:
     def _validate_slot(cls, slot_name: str, slot_value: str, product: str, state: Any, logger: logging.Logger) -> Dict[str, Any]:
         """Validate a single slot value."""
         logger.info("RecFlow.validate_slot: Starting validation - slot=%s, value='%s'", slot_name, slot_value)
+
+        # Mechanically checkable values (yes/no, options, numeric ranges, country names) skip the LLM
+        local_result = validate_slot_locally(product, slot_name, slot_value, cls._slot_specs(product))
+        if local_result is not None:
+            logger.info("RecFlow.validate_slot: Decided locally - slot=%s, valid=%s, normalized='%s'",
+                        slot_name, local_result.get("valid"), local_result.get("normalized_value", ""))
+            return local_result
         
         # Get current date for validation context
         date_str = ""
@@ -264,6 +280,35 @@ class RecFlowHelper:
                    slot_name, validation_result.get("valid"), bool(validation_result.get("normalized_value")))
         return validation_result
 
+    @classmethod
+    def _validate_slots(cls, slot_names: list[str], slots: Dict[str, Any], product: str, state: Any,
+                        logger: logging.Logger) -> Dict[str, Dict[str, Any]]:
+        """Validate several slots in parallel; returns {slot_name: validation result}.
+
+        Workers are capped by the validate_slot deployment's gateway concurrency, so a
+        multi-slot answer costs roughly one validation round trip instead of one per slot.
+        """
+        def _one(slot_name: str) -> Dict[str, Any]:
+            slot_val = cls._get_slot_value(slots, slot_name)
+            try:
+                return cls._validate_slot(slot_name, slot_val, product, state, logger) or {}
+            except Exception as e:
+                logger.error("RecFlow.validate_slots: Validation raised - slot=%s, error=%s", slot_name, str(e))
+                return {}
+
+        if len(slot_names) <= 1:
+            return {name: _one(name) for name in slot_names}
+
+        from ..tasks import validate_slot_task as _vts
+        try:
+            workers = min(len(slot_names), gateway_for(_vts.agent.llm).max_concurrency)
+        except Exception:
+            workers = len(slot_names)
+        logger.info("RecFlow.validate_slots: Validating %d slots concurrently (workers=%d) - %s", len(slot_names), workers, slot_names)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slot-validate") as pool:
+            futures = {name: pool.submit(contextvars.copy_context().run, _one, name) for name in slot_names}
+            return {name: fut.result() for name, fut in futures.items()}
+
     @classmethod
     def _ask_next_question(cls, product: str, missing_slot: str, current_slots: Dict[str, Any], 
                           user_wants_details: bool, state: Any, logger: logging.Logger) -> str:
@@ -307,6 +352,15 @@ class RecFlowHelper:
         logger.info("RecFlow.ask_question: Generated question for slot=%s, length=%d", missing_slot, len(question))
         return question
 
+    @staticmethod
+    def _tiers_around(product: Optional[str], tier: Optional[str]) -> list[str]:
+        """Return the recommended tier with its adjacent tiers, in tier order."""
+        ordered = tiers_for_product(product)
+        if not tier or tier not in ordered:
+            return []
+        idx = ordered.index(tier)
+        return ordered[max(0, idx - 1): idx + 2]
+
     @classmethod
     def _generate_recommendation(cls, product: str, slots: Dict[str, Any], state: Any, logger: logging.Logger) -> str:
         """Generate final recommendation response."""
@@ -341,10 +395,10 @@ class RecFlowHelper:
         
         logger.info("RecFlow.generate_recommendation: Determined tier=%s for product=%s", tier, product)
         
-        # Get benefits
+        # Get benefits for the recommended tier plus its neighbours (templates mention the next tier up/down)
         benefits_text = ""
         try:
-            benefits_text = benefits_tool.run(product=product)
+            benefits_text = benefits_tool.run(product=product, tiers=cls._tiers_around(product, tier))
             logger.info("RecFlow.generate_recommendation: Benefits tool output - length=%d, has_content=%s", 
                        len(benefits_text), bool(benefits_text.strip()))
             logger.info("RecFlow.generate_recommendation: Retrieved benefits - length=%d", len(benefits_text))
@@ -376,14 +430,15 @@ class RecFlowHelper:
             logger.info("RecFlow.generate_recommendation: Calling LLM with templates - system_len=%d, user_len=%d", 
                        len(sys_t), len(usr_t))
             try:
-                final = run_direct_task(
-                    agent_obj=recommendation_responder,
-                    agent_key="recommendation_responder", 
-                    task_key="synthesize_response",
-                    context_text=f"[System]\n{sys_t}\n\n[User]\n{usr_t}",
-                    logger=logger,
-                    label="recommendation.response_synthesis",
-                ) or {}
+                with stage_timer("llm_synthesis", detail="recommendation", product=product):
+                    final = run_direct_task(
+                        agent_obj=recommendation_responder,
+                        agent_key="recommendation_responder", 
+                        task_key="synthesize_response",
+                        context_text=f"[System]\n{sys_t}\n\n[User]\n{usr_t}",
+                        logger=logger,
+                        label="recommendation.response_synthesis",
+                    ) or {}
                 response = final.get("response") if isinstance(final, dict) else str(final)
                 logger.info("RecFlow.generate_recommendation: LLM response generated - length=%d", len(response))
             except Exception as e:
@@ -409,15 +464,17 @@ class RecFlowHelper:
         
         logger.info("RecFlow.handle: Product identification - current_product=%s", current_product)
         
-        # Identify product synchronously (no speculative concurrency)
-        prod_result = run_direct_task(
-            agent_obj=identify_product_task.agent,
-            agent_key="product_identifier",
-            task_key="identify_product",
-            context_text=f"Message: {state.message}\nSession product: {current_product}",
-            logger=logger,
-            label="product_identifier.identify_product.rec_flow",
-        ) or {}
+        # Identify product synchronously (no speculative concurrency); reuse the unified turn result when present
+        prod_result = nlu_product(state)
+        if prod_result is None:
+            prod_result = run_direct_task(
+                agent_obj=identify_product_task.agent,
+                agent_key="product_identifier",
+                task_key="identify_product",
+                context_text=f"Message: {state.message}\nSession product: {current_product}",
+                logger=logger,
+                label="product_identifier.identify_product.rec_flow",
+            ) or {}
         identified_product = prod_result.get("product")
         logger.info(
             "RecFlow.handle: Product identification API output - product=%s, confidence=%s, has_question=%s, keys=%s",
@@ -521,14 +578,15 @@ class RecFlowHelper:
             if sys_t and usr_t:
                 logger.info("RecFlow.handle: Generating car recommendation with templates")
                 try:
-                    final = run_direct_task(
-                        agent_obj=recommendation_responder,
-                        agent_key="recommendation_responder",
-                        task_key="synthesize_response",
-                        context_text=f"[System]\n{sys_t}\n\n[User]\n{usr_t}",
-                        logger=logger,
-                        label="recommendation.response_synthesis.car",
-                    ) or {}
+                    with stage_timer("llm_synthesis", detail="recommendation", product=product):
+                        final = run_direct_task(
+                            agent_obj=recommendation_responder,
+                            agent_key="recommendation_responder",
+                            task_key="synthesize_response",
+                            context_text=f"[System]\n{sys_t}\n\n[User]\n{usr_t}",
+                            logger=logger,
+                            label="recommendation.response_synthesis.car",
+                        ) or {}
                     
                     logger.info("RecFlow.handle: Car recommendation API output - type=%s, has_response=%s, keys=%s", 
                                type(final).__name__, bool(final.get("response") if isinstance(final, dict) else bool(final)), 
@@ -600,19 +658,21 @@ class RecFlowHelper:
         # Build validation targets (skip already validated)
         validate_targets = [s for s in slots_to_validate if not cls._is_slot_valid(updated_slots, s)]
         if validate_targets:
-            # Run validations sequentially and stop at first invalid to preserve behavior
+            # Validate all targets concurrently, then merge in required-slot order so the
+            # outcome (and the slot asked about on failure) does not depend on completion order
+            validate_targets.sort(key=lambda s: required_slots.index(s) if s in required_slots else len(required_slots))
+            validation_results = cls._validate_slots(validate_targets, updated_slots, product, state, logger)
             for slot_name in validate_targets:
-                slot_val = cls._get_slot_value(updated_slots, slot_name)
-                logger.info("RecFlow.handle: Starting slot validation (sequential) - %s=%s", slot_name, slot_val)
-                validation_result = cls._validate_slot(slot_name, slot_val, product, state, logger) or {}
+                validation_result = validation_results.get(slot_name) or {}
                 if validation_result.get("valid") and validation_result.get("normalized_value"):
                     # Valid: update with normalized value and mark as validated
                     cls._set_slot_value(updated_slots, slot_name, validation_result["normalized_value"], True)
                     logger.info("RecFlow.handle: Slot validated successfully - %s=%s", slot_name, validation_result["normalized_value"])
-                else:
-                    # Invalid: remove from slots and ask for clarification
-                    updated_slots.pop(slot_name, None)
-                    logger.info("RecFlow.handle: Slot validation failed - %s (removed from slots)", slot_name)
+                    continue
+                # Invalid: remove from slots; only the first invalid slot is asked about
+                updated_slots.pop(slot_name, None)
+                logger.info("RecFlow.handle: Slot validation failed - %s (removed from slots)", slot_name)
+                if validation_failed_slot is None:
                     validation_failed_slot = slot_name
                     
                     # Build a user-facing message that always includes the reason when available
@@ -645,7 +705,6 @@ class RecFlowHelper:
                         validation_failed_question = f"'{user_input}' is not valid. Please provide a valid {slot_name.replace('_', ' ')}."
                     
                     logger.info("RecFlow.handle: Generated validation failure question: '%s'", validation_failed_question)
-                    break  # Stop after first invalid to match existing behavior
         
         # Update session with processed slots
         state.session["slots"] = updated_slots
@@ -5,8 +5,11 @@ import yaml
 
 from ..tasks import identify_product_task, identify_tiers_task
 from ..prompt_runner import run_direct_task
+from ..turn_understanding import nlu_product, nlu_tiers
 from ..tools.benefits_tool import benefits_tool
 from ..llm import azure_llm, azure_response_llm
+from ..llm_gateway import gateway_for
+from ..turn_trace import stage_timer
 
 
 class SummaryFlowHelper:
@@ -120,14 +123,16 @@ class SummaryFlowHelper:
             if existing:
                 summary_slot["product"] = existing
                 return
-            prod = run_direct_task(
-                agent_obj=identify_product_task.agent,
-                agent_key="product_identifier",
-                task_key="identify_product",
-                context_text=f"User Message: {message}\nSession product: {session.get('product')}",
-                logger=logger,
-                label="product_identifier.identify_product.for_summary",
-            ) or {}
+            prod = nlu_product(state)
+            if prod is None:
+                prod = run_direct_task(
+                    agent_obj=identify_product_task.agent,
+                    agent_key="product_identifier",
+                    task_key="identify_product",
+                    context_text=f"User Message: {message}\nSession product: {session.get('product')}",
+                    logger=logger,
+                    label="product_identifier.identify_product.for_summary",
+                ) or {}
             try:
                 logger.info(
                     "SummaryFlow.product_identified: product=%s confidence=%s",
@@ -167,14 +172,16 @@ class SummaryFlowHelper:
                 f"User Message: {message}\n"
                 f"Recent conversation (most recent first):\n" + "\n".join(ctx_lines)
             )
-            tiers_res = run_direct_task(
-                agent_obj=identify_tiers_task.agent,
-                agent_key="tier_identifier",
-                task_key="identify_tiers",
-                context_text=tiers_ctx,
-                logger=logger,
-                label="tier_identifier.identify_tiers.for_summary",
-            ) or {}
+            tiers_res = nlu_tiers(state)
+            if tiers_res is None:
+                tiers_res = run_direct_task(
+                    agent_obj=identify_tiers_task.agent,
+                    agent_key="tier_identifier",
+                    task_key="identify_tiers",
+                    context_text=tiers_ctx,
+                    logger=logger,
+                    label="tier_identifier.identify_tiers.for_summary",
+                ) or {}
             new_tiers = tiers_res.get("tiers") or []
             inferred_product = tiers_res.get("product")
             if inferred_product:
@@ -243,9 +250,9 @@ class SummaryFlowHelper:
         except Exception:
             pass
 
-        # Retrieve benefits (product-only; template will focus by tiers)
+        # Retrieve benefits sliced to the requested tiers (Car has no tiers and returns everything)
         try:
-            benefits_text = benefits_tool.run(product=product)
+            benefits_text = benefits_tool.run(product=product, tiers=list(tiers_list))
         except Exception:
             benefits_text = ""
         try:
@@ -274,10 +281,11 @@ class SummaryFlowHelper:
         logger.info("LLM Direct [summary.synthesis]:\n[SYSTEM]\n%s\n\n[USER]\n%s", sys_t, usr_t)
         try:
             # Use response LLM for user-facing summary synthesis
-            txt = azure_response_llm.call(messages=[
-                {"role": "system", "content": sys_t},
-                {"role": "user", "content": usr_t},
-            ])
+            with stage_timer("llm_synthesis", detail="summary", product=product):
+                txt = gateway_for(azure_response_llm).call([
+                    {"role": "system", "content": sys_t},
+                    {"role": "user", "content": usr_t},
+                ], label="summary.synthesis", task_key="summary_synthesis")
             answer = str(txt).strip()
         except Exception:
             answer = ""
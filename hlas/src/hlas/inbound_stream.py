@@ -0,0 +1,302 @@
+"""
+Durable inbound message queue on Redis Streams.
+
+Producer: `InboundStream.publish` appends a validated message to one of
+`partitions` streams (`{prefix}:{p}`, p = crc32(user) % partitions), so all
+messages of a user land in the same stream in arrival order.
+
+Consumers: `StreamConsumer` runs on any node (inside the app or as
+`python -m hlas.stream_worker`). Consumers heartbeat in a sorted set and lease
+partitions (`{prefix}:lease:{p}`, SET NX PX + renewal) up to a fair share of
+ceil(partitions / live consumers); a partition is read by one consumer at a time,
+one entry after another, so per-user ordering holds while partitions spread the
+load. Entries are read through the consumer group `group` and XACKed only after
+the handler returns (at-least-once). Entries left pending by a crashed consumer
+are reclaimed with XAUTOCLAIM once idle for `reclaim_idle_ms`; entries delivered
+more than `max_deliveries` times go to the `{prefix}:dead` stream. Reclaimed
+entries can run after newer entries of the same partition, so ordering is
+strict only while consumers stay healthy. Needs Redis >= 6.2 (XAUTOCLAIM).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import random
+import socket
+import time
+import zlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from .redis_utils import get_redis
+from .metrics import INBOUND_STREAM_EVENTS, INBOUND_STREAM_PARTITIONS_OWNED, INBOUND_STREAM_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = os.getenv("WA_STREAM_PREFIX", "wa:inbound")
+_GROUP = os.getenv("WA_STREAM_GROUP", "hlas-workers")
+_PARTITIONS = int(os.getenv("WA_STREAM_PARTITIONS", "16"))
+_MAXLEN = int(os.getenv("WA_STREAM_MAXLEN", "100000"))
+_LEASE_TTL_MS = int(os.getenv("WA_STREAM_LEASE_TTL_MS", "30000"))
+_RECLAIM_IDLE_MS = int(os.getenv("WA_STREAM_RECLAIM_IDLE_MS", "60000"))
+_MAX_DELIVERIES = int(os.getenv("WA_STREAM_MAX_DELIVERIES", "5"))
+_BLOCK_MS = int(os.getenv("WA_STREAM_BLOCK_MS", "2000"))
+
+_RENEW_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+)
+_RELEASE_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+Handler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def partition_for(user_key: str, partitions: int = _PARTITIONS) -> int:
+    """Stable across processes and nodes (unlike hash())."""
+    return zlib.crc32(str(user_key).encode("utf-8")) % max(1, partitions)
+
+
+class InboundStream:
+    """Producer side: append messages to the user's partition stream."""
+
+    def __init__(self, prefix: str = _PREFIX, partitions: int = _PARTITIONS, maxlen: int = _MAXLEN):
+        self._client = get_redis()
+        self.prefix = prefix
+        self.partitions = max(1, int(partitions))
+        self.maxlen = maxlen
+
+    def stream_key(self, partition: int) -> str:
+        return f"{self.prefix}:{partition}"
+
+    def publish(self, user_key: str, message: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        if not self._client:
+            raise RuntimeError("InboundStream requires Redis client")
+        fields = {
+            "user": user_key,
+            "message": message,
+            "metadata": orjson.dumps(metadata or {}, default=str).decode("utf-8"),
+            "enqueued_at": f"{time.time():.3f}",
+        }
+        try:
+            entry_id = self._client.xadd(self.stream_key(partition_for(user_key, self.partitions)), fields,
+                                         maxlen=self.maxlen, approximate=True)
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: InboundStream.publish error: %s", e)
+            raise
+        INBOUND_STREAM_EVENTS.labels(event="published").inc()
+        return entry_id
+
+
+class StreamConsumer:
+    """Leases partitions and runs `handler(entry_id, fields)` for each entry, in order per partition."""
+
+    def __init__(self, handler: Handler, prefix: str = _PREFIX, group: str = _GROUP,
+                 partitions: int = _PARTITIONS, name: Optional[str] = None,
+                 lease_ttl_ms: int = _LEASE_TTL_MS, reclaim_idle_ms: int = _RECLAIM_IDLE_MS,
+                 max_deliveries: int = _MAX_DELIVERIES, block_ms: int = _BLOCK_MS):
+        self._client = get_redis()
+        self.handler = handler
+        self.prefix = prefix
+        self.group = group
+        self.partitions = max(1, int(partitions))
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{random.randint(0, 0xFFFF):04x}"
+        self.lease_ttl_ms = int(lease_ttl_ms)
+        self.reclaim_idle_ms = int(reclaim_idle_ms)
+        self.max_deliveries = int(max_deliveries)
+        self.block_ms = int(block_ms)
+        self._readers: Dict[int, asyncio.Task] = {}
+        self._releasing: set = set()
+        self._stopping = False
+        self._lease_task: Optional[asyncio.Task] = None
+        # Blocking XREADGROUP calls run here so they never occupy the default executor
+        self._io = ThreadPoolExecutor(max_workers=self.partitions + 2, thread_name_prefix="inbound-io")
+
+    # Keys
+    def _stream(self, p: int) -> str:
+        return f"{self.prefix}:{p}"
+
+    def _lease(self, p: int) -> str:
+        return f"{self.prefix}:lease:{p}"
+
+    @property
+    def _members(self) -> str:
+        return f"{self.prefix}:consumers"
+
+    async def _io_call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, lambda: fn(*args, **kwargs))
+
+    def _ensure_groups(self) -> None:
+        for p in range(self.partitions):
+            try:
+                self._client.xgroup_create(self._stream(p), self.group, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    logger.critical("REDIS_FAILURE: InboundStream group create failed for %s: %s", self._stream(p), e)
+                    raise
+
+    async def start(self) -> None:
+        await self._io_call(self._ensure_groups)
+        self._lease_task = asyncio.create_task(self._lease_loop(), name=f"inbound-lease-{self.name}")
+        logger.info("StreamConsumer[%s]: started (partitions=%d group=%s)", self.name, self.partitions, self.group)
+
+    async def stop(self, timeout: float) -> None:
+        """Finish the current entry on each partition, release leases and leave the group membership set."""
+        self._stopping = True
+        if self._lease_task:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+        owned, readers = list(self._readers), list(self._readers.values())
+        if readers:
+            done, pending = await asyncio.wait(readers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+        for p in owned:
+            await self._io_call(self._client.eval, _RELEASE_SCRIPT, 1, self._lease(p), self.name)
+        self._readers.clear()
+        try:
+            await self._io_call(self._client.zrem, self._members, self.name)
+        except Exception:
+            pass
+        INBOUND_STREAM_PARTITIONS_OWNED.labels(consumer=self.name).set(0)
+        self._io.shutdown(wait=False)
+        logger.info("StreamConsumer[%s]: stopped", self.name)
+
+    # Leases and rebalancing (Redis calls on the IO pool, bookkeeping on the event loop)
+    async def _lease_loop(self) -> None:
+        interval = max(0.5, self.lease_ttl_ms / 3000.0)
+        while not self._stopping:
+            try:
+                await self._rebalance()
+            except Exception as e:
+                logger.error("StreamConsumer[%s]: lease maintenance failed - %s", self.name, e)
+            await asyncio.sleep(interval)
+
+    def _heartbeat(self) -> int:
+        now_ms = int(time.time() * 1000)
+        pipe = self._client.pipeline(True)
+        pipe.zadd(self._members, {self.name: now_ms})
+        pipe.zremrangebyscore(self._members, 0, now_ms - self.lease_ttl_ms)
+        pipe.zcard(self._members)
+        return max(1, int(pipe.execute()[2]))
+
+    async def _rebalance(self) -> None:
+        live = await self._io_call(self._heartbeat)
+        share = math.ceil(self.partitions / live)
+
+        for p in [p for p in self._readers if p not in self._releasing]:
+            if not await self._io_call(self._client.eval, _RENEW_SCRIPT, 1, self._lease(p), self.name, self.lease_ttl_ms):
+                logger.warning("StreamConsumer[%s]: lost lease on partition %d", self.name, p)
+                self._releasing.add(p)
+        owned = [p for p in self._readers if p not in self._releasing]
+
+        # Over the fair share (another consumer joined): hand back the extras after their current entry
+        for p in owned[share:]:
+            self._releasing.add(p)
+        wanted = share - min(len(owned), share)
+        start = random.randrange(self.partitions)
+        for i in range(self.partitions):
+            if wanted <= 0 or self._stopping:
+                break
+            p = (start + i) % self.partitions
+            if p in self._readers:
+                continue
+            if await self._io_call(self._client.set, self._lease(p), self.name, nx=True, px=self.lease_ttl_ms):
+                self._readers[p] = asyncio.create_task(self._read_partition(p), name=f"inbound-p{p}")
+                logger.info("StreamConsumer[%s]: acquired partition %d", self.name, p)
+                wanted -= 1
+        INBOUND_STREAM_PARTITIONS_OWNED.labels(consumer=self.name).set(len(self._readers) - len(self._releasing))
+
+    # Reading
+    async def _read_partition(self, p: int) -> None:
+        stream = self._stream(p)
+        next_reclaim = 0.0
+        try:
+            while not self._stopping and p not in self._releasing:
+                entries: List[Tuple[str, Dict[str, Any]]] = []
+                if time.monotonic() >= next_reclaim:
+                    entries = await self._io_call(self._reclaim, stream)
+                    next_reclaim = time.monotonic() + self.reclaim_idle_ms / 2000.0
+                if not entries:
+                    resp = await self._io_call(self._client.xreadgroup, self.group, self.name, {stream: ">"},
+                                               count=1, block=self.block_ms)
+                    for _, items in resp or []:
+                        entries.extend(items)
+                # Everything fetched is already delivered to this consumer: finish it before checking for stop
+                for entry_id, fields in entries:
+                    await self._handle(stream, entry_id, fields)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("StreamConsumer[%s]: partition %d reader failed - %s", self.name, p, e, exc_info=True)
+        finally:
+            self._readers.pop(p, None)
+            self._releasing.discard(p)
+            if not self._stopping:
+                try:
+                    await self._io_call(self._client.eval, _RELEASE_SCRIPT, 1, self._lease(p), self.name)
+                except Exception:
+                    pass
+                logger.info("StreamConsumer[%s]: released partition %d", self.name, p)
+
+    def _reclaim(self, stream: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Claim entries another (crashed) consumer left pending; dead-letter poison entries."""
+        resp = self._client.xautoclaim(stream, self.group, self.name, self.reclaim_idle_ms, start_id="0-0", count=10)
+        claimed = [(eid, fields) for eid, fields in (resp[1] if resp else []) if fields]
+        if not claimed:
+            return []
+        INBOUND_STREAM_EVENTS.labels(event="reclaimed").inc(len(claimed))
+        ready = []
+        for entry_id, fields in claimed:
+            info = self._client.xpending_range(stream, self.group, entry_id, entry_id, 1)
+            deliveries = int(info[0]["times_delivered"]) if info else 1
+            if deliveries > self.max_deliveries:
+                logger.error("StreamConsumer[%s]: dead-lettering %s after %d deliveries", self.name, entry_id, deliveries)
+                self._client.xadd(f"{self.prefix}:dead", {**fields, "source": stream, "entry_id": entry_id})
+                self._client.xack(stream, self.group, entry_id)
+                INBOUND_STREAM_EVENTS.labels(event="dead_lettered").inc()
+                continue
+            ready.append((entry_id, fields))
+        return ready
+
+    async def _handle(self, stream: str, entry_id: str, fields: Dict[str, Any]) -> None:
+        try:
+            INBOUND_STREAM_LAG_SECONDS.observe(max(0.0, time.time() - float(fields.get("enqueued_at") or time.time())))
+        except Exception:
+            pass
+        try:
+            await self.handler(entry_id, fields)
+        except Exception as e:
+            # Left pending: reclaimed and retried after reclaim_idle_ms
+            logger.error("StreamConsumer[%s]: handler failed for %s - %s", self.name, entry_id, e)
+            INBOUND_STREAM_EVENTS.labels(event="failed").inc()
+            return
+        await self._io_call(self._client.xack, stream, self.group, entry_id)
+        INBOUND_STREAM_EVENTS.labels(event="acked").inc()
+
+    async def run(self) -> None:
+        """Start and keep consuming until cancelled (standalone worker processes)."""
+        await self.start()
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            await self.stop(timeout=30.0)
+
+
+def decode_entry(fields: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """(user, message, metadata) from a published entry."""
+    try:
+        metadata = orjson.loads(fields.get("metadata") or "{}")
+    except Exception:
+        metadata = {}
+    return fields.get("user") or "", fields.get("message") or "", metadata
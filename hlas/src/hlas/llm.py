@@ -19,12 +19,16 @@ AZURE_OPENAI_TEMPERATURE_STR = os.environ.get("AZURE_OPENAI_TEMPERATURE", "0.2")
 # Response generation model configuration (can be set to different deployment)
 AZURE_OPENAI_RESPONSE_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_RESPONSE_DEPLOYMENT_NAME", "gpt-4o-mini")
 AZURE_OPENAI_RESPONSE_TEMPERATURE_STR = os.environ.get("AZURE_OPENAI_RESPONSE_TEMPERATURE", "0.3")
+# Optional small/fast deployment for classifier cascades (tasks.yaml `llm.cascade`); unset disables the cascade
+AZURE_OPENAI_CLASSIFIER_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_CLASSIFIER_DEPLOYMENT_NAME")
+AZURE_OPENAI_CLASSIFIER_TEMPERATURE_STR = os.environ.get("AZURE_OPENAI_CLASSIFIER_TEMPERATURE", "0.0")
 
 
 # Initialize as None at the module level
 azure_llm = None
 azure_embeddings = None
 azure_response_llm = None  # Separate LLM for response generation
+azure_classifier_llm = None  # Small deployment tried first by classifier cascades (optional)
 
 
 def initialize_models():
@@ -106,6 +110,22 @@ def initialize_models():
         except (ImportError, Exception):
             logger.info(f"Azure Response LLM ({AZURE_OPENAI_RESPONSE_DEPLOYMENT_NAME}) initialized successfully.")
 
+        # Create the optional classifier LLM (first stage of tasks.yaml cascades)
+        if AZURE_OPENAI_CLASSIFIER_DEPLOYMENT_NAME:
+            try:
+                _classifier_temperature = float(AZURE_OPENAI_CLASSIFIER_TEMPERATURE_STR)
+            except (ValueError, TypeError):
+                _classifier_temperature = 0.0
+                logger.warning("Invalid AZURE_OPENAI_CLASSIFIER_TEMPERATURE, defaulting to %.1f", _classifier_temperature)
+            globals()["azure_classifier_llm"] = LLM(
+                model=f"azure/{AZURE_OPENAI_CLASSIFIER_DEPLOYMENT_NAME}",
+                api_key=AZURE_OPENAI_API_KEY,
+                base_url=AZURE_OPENAI_ENDPOINT.rstrip("/"),
+                api_version=AZURE_OPENAI_API_VERSION,
+                temperature=_classifier_temperature,
+            )
+            logger.info(f"Azure Classifier LLM ({AZURE_OPENAI_CLASSIFIER_DEPLOYMENT_NAME}) initialized successfully.")
+
         # Create Embeddings instance
         globals()["azure_embeddings"] = AzureOpenAIEmbeddings(
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
@@ -125,4 +145,13 @@ def initialize_models():
         raise  # Re-raise the exception to halt application startup
 
 
-__all__ = ["azure_llm", "azure_embeddings", "azure_response_llm", "initialize_models"]
+def get_llm(name: str):
+    """LLM by role name as used in config: default, response or classifier (None if not configured)."""
+    return {
+        "default": azure_llm,
+        "response": azure_response_llm,
+        "classifier": azure_classifier_llm,
+    }.get(name)
+
+
+__all__ = ["azure_llm", "azure_embeddings", "azure_response_llm", "azure_classifier_llm", "initialize_models", "get_llm"]
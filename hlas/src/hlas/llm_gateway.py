@@ -0,0 +1,799 @@
+"""
+Gateway for all chat-completion traffic to Azure OpenAI.
+
+The CrewAI `LLM` objects created by `llm.initialize_models` stay the source of
+truth for deployment, endpoint, key and temperature; the gateway reads those
+settings and sends requests itself so that every call gets:
+
+- one shared HTTP connection pool (httpx) for all deployments
+- per-deployment request (RPM) and token (TPM) buckets and a concurrency ceiling,
+  shared by every LLM object on the same endpoint + deployment whatever its
+  temperature (temperature is sent per request)
+- jittered exponential retries on 429/408/5xx/connection errors, honouring
+  `Retry-After` / `retry-after-ms`
+- a per-call deadline (per-task `timeout_s`) covering queueing and retries
+- a per-deployment circuit breaker that fails fast while Azure is unhealthy
+- per-label telemetry: latency by label/agent/deployment, token and cost
+  counters from the API usage fields, retries by label
+- per-turn call counting (`count_llm_calls`) so callers can report LLM calls
+  per inbound message
+- a guard against blocking the application's event loop: calls are synchronous
+  (bucket waits, Retry-After backoff, the HTTP request itself), so they must run
+  on a thread (TurnExecutor runs flows on its flow threads); once the app has
+  called `mark_event_loop`, a call made on that loop raises instead of stalling it
+- opt-in hedging per task: when a call has not returned after the label's live
+  latency percentile, a duplicate is sent and the first valid response wins;
+  the primary runs on its own thread, only duplicates use the hedge pool (and
+  only when a worker is free), duplicates inherit the original deadline, and
+  hedges draw from a process-wide token budget
+
+Limits live in config/llm_gateway.yaml; per-task overrides in the `llm` block of
+a task in tasks.yaml (or the `tasks` section of llm_gateway.yaml for direct
+synthesis calls that have no task).
+
+Usage:
+    from .llm_gateway import gateway_for
+    text = gateway_for(agent_obj.llm).call(messages, label="InfoFlow.synthesis", task_key="info_synthesis")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import httpx
+
+from .config_loader import get_llm_gateway_spec, get_tasks_spec
+from .context_packer import count_tokens
+from .metrics import (
+    LLM_GATEWAY_RETRIES,
+    LLM_GATEWAY_REJECTIONS,
+    LLM_GATEWAY_THROTTLE_WAIT_SECONDS,
+    LLM_GATEWAY_CIRCUIT_OPEN,
+    LLM_RESPONSE_FORMAT_FALLBACKS,
+    LLM_REQUEST_SECONDS,
+    LLM_REQUESTS_TOTAL,
+    LLM_TOKENS_TOTAL,
+    LLM_COST_USD_TOTAL,
+    LLM_TASK_RETRIES,
+    LLM_HEDGES_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Built-in defaults; overridden by config/llm_gateway.yaml
+_DEFAULTS: Dict[str, Any] = {
+    "timeout_s": 30.0,
+    "max_retries": 2,
+    "backoff_base_s": 0.5,
+    "backoff_max_s": 8.0,
+    "rpm": 0,                       # 0 = unlimited
+    "tpm": 0,                       # 0 = unlimited
+    "max_concurrency": 16,
+    "completion_token_estimate": 400,
+    "breaker_failure_threshold": 5,
+    "breaker_reset_s": 30.0,
+    # USD per 1K tokens for hlas_llm_cost_usd_total; 0 = not tracked
+    "price_per_1k_prompt": 0.0,
+    "price_per_1k_cached_prompt": 0.0,
+    "price_per_1k_completion": 0.0,
+}
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_HEDGING_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "budget_ratio": 0.05,           # hedge tokens earned per token of hedge-eligible traffic
+    "budget_burst_tokens": 20000,
+    "window_size": 200,             # latency samples kept per label
+    "max_workers": 32,
+}
+
+
+class LLMGatewayError(Exception):
+    """Raised when a gateway call cannot be completed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(LLMGatewayError):
+    """The deployment's circuit breaker is open; the call was not attempted."""
+
+
+class GatewayTimeoutError(LLMGatewayError):
+    """The call's deadline expired while queued, throttled or retrying."""
+
+
+@dataclass
+class LLMResult:
+    text: str
+    deployment: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    attempts: int = 1
+    latency_s: float = 0.0
+    raw: Dict[str, Any] = field(default_factory=dict)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = float(rate_per_minute) / 60.0
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float, deadline: float) -> float:
+        """Block until `amount` is available or the deadline passes; returns seconds waited."""
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(float(amount), self.capacity)
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return time.monotonic() - start
+                wait = (amount - self.tokens) / self.rate if self.rate > 0 else 1.0
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    raise GatewayTimeoutError("rate limit wait exceeds deadline")
+                self._cond.wait(timeout=wait)
+
+    def adjust(self, delta: float) -> None:
+        """Debit (positive) or refund (negative) after the actual usage is known."""
+        if self.capacity <= 0 or not delta:
+            return
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after `reset_s` (one probe)."""
+
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_s = float(reset_s)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_s and not self.probe_in_flight:
+                self.probe_in_flight = True  # half-open: let one request through
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """Returns True when this success closed a previously open breaker."""
+        with self._lock:
+            was_open = self.opened_at is not None
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+            return was_open
+
+    def record_failure(self) -> bool:
+        """Returns True when this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.opened_at is not None:
+                self.opened_at = time.monotonic()  # failed probe: stay open
+                return False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+class LatencyWindow:
+    """Most recent successful call latencies per label; source of the hedge delay."""
+
+    def __init__(self, size: int):
+        self.size = max(10, int(size))
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, seconds: float) -> None:
+        with self._lock:
+            window = self._samples.get(label)
+            if window is None:
+                window = self._samples[label] = deque(maxlen=self.size)
+            window.append(float(seconds))
+
+    def percentile(self, label: str, pct: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(label) or ())
+        if not samples or len(samples) < max(1, int(min_samples)):
+            return None
+        idx = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+        return samples[idx]
+
+
+class HedgeBudget:
+    """Caps hedge spend at a fraction of hedge-eligible traffic.
+
+    Every hedge-eligible call deposits `ratio` x its token estimate (up to
+    `burst` tokens); firing a hedge withdraws the duplicate's full estimate.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = max(0.0, float(ratio))
+        self.burst = max(0.0, float(burst))
+        self.balance = self.burst
+        self._lock = threading.Lock()
+
+    def deposit(self, tokens: float) -> None:
+        with self._lock:
+            self.balance = min(self.burst, self.balance + tokens * self.ratio)
+
+    def try_spend(self, tokens: float) -> bool:
+        with self._lock:
+            if self.balance < tokens:
+                return False
+            self.balance -= tokens
+            return True
+
+
+class CallCounter:
+    """Thread-safe count of gateway calls made during one turn."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def add(self) -> None:
+        with self._lock:
+            self.value += 1
+
+
+_app_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def mark_event_loop() -> None:
+    """Record the running loop as the application's event loop; gateway calls made on it then raise."""
+    global _app_loop
+    _app_loop = asyncio.get_running_loop()
+
+
+def _assert_off_loop() -> None:
+    if _app_loop is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if loop is _app_loop:
+        raise RuntimeError("LLM gateway calls block; run them off the event loop (see turn_executor.run_flow)")
+
+
+_turn_calls: ContextVar[Optional[CallCounter]] = ContextVar("hlas_llm_turn_calls", default=None)
+
+
+@contextmanager
+def count_llm_calls() -> Iterator[CallCounter]:
+    """Count requests sent inside the block (one per `complete` call, plus hedge duplicates).
+    Worker threads see the counter only when started with a copied context (asyncio.to_thread,
+    or `copy_context().run`)."""
+    counter = CallCounter()
+    token = _turn_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _turn_calls.reset(token)
+
+
+def _retry_after_seconds(headers: Optional[httpx.Headers]) -> Optional[float]:
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return max(0.0, float(ms) / 1000.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _llm_setting(llm_obj: Any, name: str, default: Any = None) -> Any:
+    value = getattr(llm_obj, name, None)
+    return default if value is None else value
+
+
+class DeploymentGateway:
+    """Rate limiting, retries and circuit breaking for one Azure deployment."""
+
+    def __init__(self, llm_obj: Any, http_client: httpx.Client):
+        model = str(_llm_setting(llm_obj, "model", ""))
+        self.deployment = model.split("/", 1)[1] if model.startswith("azure/") else model
+        self.api_version = _llm_setting(llm_obj, "api_version", None)
+        base_url = str(_llm_setting(llm_obj, "base_url", "") or "").rstrip("/")
+        self._url = f"{base_url}/openai/deployments/{self.deployment}/chat/completions"
+        self._headers = {"api-key": str(_llm_setting(llm_obj, "api_key", "") or ""), "Content-Type": "application/json"}
+        self._http = http_client
+
+        self.settings = _deployment_settings(self.deployment)
+        self.requests = TokenBucket(self.settings["rpm"])
+        self.tokens = TokenBucket(self.settings["tpm"])
+        self._slots = threading.BoundedSemaphore(max(1, int(self.settings["max_concurrency"])))
+        self.breaker = CircuitBreaker(self.settings["breaker_failure_threshold"], self.settings["breaker_reset_s"])
+        # Tasks (or schema names) whose `response_format` this deployment rejected; only those
+        # fall back to prompt-only JSON, other tasks keep structured outputs
+        self._response_format_rejected: Set[str] = set()
+        LLM_GATEWAY_CIRCUIT_OPEN.labels(deployment=self.deployment).set(0)
+
+    @property
+    def max_concurrency(self) -> int:
+        return max(1, int(self.settings["max_concurrency"]))
+
+    def call(self, messages: List[Dict[str, str]], label: str = "llm", task_key: Optional[str] = None, **kwargs: Any) -> str:
+        """Drop-in replacement for `LLM.call(messages=...)`; returns the message text."""
+        return self.complete(messages, label=label, task_key=task_key, **kwargs).text
+
+    def complete(self, messages: List[Dict[str, str]], label: str = "llm", task_key: Optional[str] = None,
+                 timeout_s: Optional[float] = None, max_retries: Optional[int] = None,
+                 extra_body: Optional[Dict[str, Any]] = None,
+                 response_format: Optional[Dict[str, Any]] = None,
+                 agent: Optional[str] = None, temperature: Optional[float] = None) -> LLMResult:
+        _assert_off_loop()
+        agent = agent or "direct"
+        args = (messages, task_key, timeout_s, max_retries, extra_body, response_format, temperature)
+        hedge = _hedge_options(task_key)
+        if hedge:
+            return self._complete_hedged(args, label, agent, hedge)
+        return self._complete_recorded(args, label, agent)
+
+    def _complete_recorded(self, args: tuple, label: str, agent: str) -> LLMResult:
+        messages, task_key, timeout_s, max_retries, extra_body, response_format, temperature = args
+        counter = _turn_calls.get()  # hedge duplicates count too: they run with the caller's context
+        if counter is not None:
+            counter.add()
+        start = time.monotonic()
+        try:
+            result = self._complete(messages, label, task_key, timeout_s, max_retries, extra_body, response_format,
+                                    temperature)
+        except Exception as e:
+            outcome = ("circuit_open" if isinstance(e, CircuitOpenError)
+                       else "timeout" if isinstance(e, GatewayTimeoutError) else "error")
+            LLM_REQUESTS_TOTAL.labels(label=label, agent=agent, deployment=self.deployment, outcome=outcome).inc()
+            LLM_REQUEST_SECONDS.labels(label=label, agent=agent, deployment=self.deployment).observe(time.monotonic() - start)
+            raise
+        self._record_usage(result, label, agent)
+        _hedging().latencies.observe(label, result.latency_s)
+        return result
+
+    def _complete_hedged(self, args: tuple, label: str, agent: str, hedge: Dict[str, Any]) -> LLMResult:
+        """Send the call; if it is still running after the label's latency percentile, send a duplicate.
+
+        The primary starts at once on its own thread, so it never queues behind other work
+        in the hedge pool; the caller's thread only waits, so it can return whichever response
+        wins. Only the duplicate uses the pool. It is sent when a pool worker is free right
+        away, and it gets what is left of the original call's deadline. The first valid
+        response (non-empty; parseable JSON when a response_format was requested) is returned.
+        The slower request is left to finish in the background so its latency still feeds the
+        window; its result is discarded.
+        """
+        state = _hedging()
+        delay = state.latencies.percentile(label, float(hedge.get("percentile", 95)), int(hedge.get("min_samples", 20)))
+        estimate = self._estimate_tokens(args[0])
+        state.budget.deposit(estimate)
+        if delay is None:
+            return self._complete_recorded(args, label, agent)
+        delay = min(max(delay, float(hedge.get("min_delay_s", 0.0))), float(hedge.get("max_delay_s", 30.0)))
+        deadline = time.monotonic() + self._call_timeout(args[1], args[2])
+
+        primary = _start_thread(self._complete_recorded, args, label, agent)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            LLM_HEDGES_TOTAL.labels(label=label, outcome="deadline").inc()
+            return primary.result()
+        if self.breaker.is_open:
+            LLM_HEDGES_TOTAL.labels(label=label, outcome="breaker_open").inc()
+            return primary.result()
+        if not state.slots.acquire(blocking=False):
+            LLM_HEDGES_TOTAL.labels(label=label, outcome="pool_busy").inc()
+            return primary.result()
+        if not state.budget.try_spend(estimate):
+            state.slots.release()
+            LLM_HEDGES_TOTAL.labels(label=label, outcome="budget_exhausted").inc()
+            return primary.result()
+
+        LLM_HEDGES_TOTAL.labels(label=label, outcome="fired").inc()
+        logger.info("LLMGateway[%s]: %s still running after %.2fs; sending hedge", self.deployment, label, delay)
+        duplicate_args = args[:2] + (remaining,) + args[3:]
+        # Same context as the primary, so the hedge counts towards the turn's LLM calls and stages
+        duplicate = state.pool.submit(copy_context().run, self._complete_recorded, duplicate_args, f"{label}.hedge", agent)
+        duplicate.add_done_callback(lambda _: state.slots.release())
+        pending = {primary, duplicate}
+        fallback: Optional[LLMResult] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if _valid_response(result, args[5]):
+                    LLM_HEDGES_TOTAL.labels(label=label, outcome="hedge_won" if fut is duplicate else "primary_won").inc()
+                    return result
+                fallback = fallback or result
+        if fallback is not None:
+            return fallback
+        raise error  # both requests failed
+
+    def _call_timeout(self, task_key: Optional[str], timeout_s: Optional[float]) -> float:
+        """Per-call deadline in seconds: explicit value, then the task's `timeout_s`, then the deployment's."""
+        if timeout_s is not None:
+            return float(timeout_s)
+        return float(task_options(task_key).get("timeout_s", self.settings["timeout_s"]))
+
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        return sum(count_tokens(str(m.get("content", ""))) for m in messages) + int(self.settings["completion_token_estimate"])
+
+    def _record_usage(self, result: LLMResult, label: str, agent: str) -> None:
+        try:
+            dep = self.deployment
+            LLM_REQUESTS_TOTAL.labels(label=label, agent=agent, deployment=dep, outcome="ok").inc()
+            LLM_REQUEST_SECONDS.labels(label=label, agent=agent, deployment=dep).observe(result.latency_s)
+            uncached = max(0, result.prompt_tokens - result.cached_tokens)
+            LLM_TOKENS_TOTAL.labels(label=label, deployment=dep, kind="prompt").inc(result.prompt_tokens)
+            LLM_TOKENS_TOTAL.labels(label=label, deployment=dep, kind="cached_prompt").inc(result.cached_tokens)
+            LLM_TOKENS_TOTAL.labels(label=label, deployment=dep, kind="completion").inc(result.completion_tokens)
+            cost = (uncached * float(self.settings["price_per_1k_prompt"])
+                    + result.cached_tokens * float(self.settings["price_per_1k_cached_prompt"])
+                    + result.completion_tokens * float(self.settings["price_per_1k_completion"])) / 1000.0
+            if cost > 0:
+                LLM_COST_USD_TOTAL.labels(label=label, deployment=dep).inc(cost)
+        except Exception as e:
+            logger.debug("LLMGateway[%s]: telemetry failed - %s", self.deployment, e)
+
+    def _complete(self, messages: List[Dict[str, str]], label: str, task_key: Optional[str],
+                  timeout_s: Optional[float], max_retries: Optional[int],
+                  extra_body: Optional[Dict[str, Any]], response_format: Optional[Dict[str, Any]],
+                  temperature: Optional[float] = None) -> LLMResult:
+        format_key = _response_format_key(task_key, response_format, label) if response_format else None
+        if format_key and format_key not in self._response_format_rejected:
+            try:
+                return self._complete(messages, label, task_key, timeout_s, max_retries,
+                                      {**(extra_body or {}), "response_format": response_format}, None, temperature)
+            except LLMGatewayError as e:
+                if e.status_code != 400 or "response_format" not in str(e):
+                    raise
+                self._response_format_rejected.add(format_key)
+                LLM_RESPONSE_FORMAT_FALLBACKS.labels(deployment=self.deployment, task=format_key).inc()
+                logger.warning("LLMGateway[%s]: response_format rejected for %s; falling back to prompt-only JSON - %s",
+                               self.deployment, format_key, e)
+        opts = task_options(task_key)
+        timeout_s = self._call_timeout(task_key, timeout_s)
+        max_retries = int(max_retries if max_retries is not None else opts.get("max_retries", self.settings["max_retries"]))
+        start = time.monotonic()
+        deadline = start + timeout_s
+
+        if not self.breaker.allow():
+            LLM_GATEWAY_REJECTIONS.labels(deployment=self.deployment, reason="circuit_open").inc()
+            raise CircuitOpenError(f"circuit open for deployment {self.deployment}")
+
+        body: Dict[str, Any] = {"messages": messages}
+        if temperature is not None:
+            body["temperature"] = temperature
+        if extra_body:
+            body.update(extra_body)
+        estimate = self._estimate_tokens(messages)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                waited = self.requests.acquire(1, deadline) + self.tokens.acquire(estimate, deadline)
+                if waited > 0:
+                    LLM_GATEWAY_THROTTLE_WAIT_SECONDS.labels(deployment=self.deployment).observe(waited)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                    raise GatewayTimeoutError("no free concurrency slot before deadline")
+            except GatewayTimeoutError:
+                LLM_GATEWAY_REJECTIONS.labels(deployment=self.deployment, reason="deadline").inc()
+                self._release_probe()
+                raise
+
+            retry_after = None
+            reason = None
+            try:
+                resp = self._http.post(
+                    self._url,
+                    params={"api-version": self.api_version} if self.api_version else None,
+                    headers=self._headers,
+                    json=body,
+                    timeout=max(0.1, deadline - time.monotonic()),
+                )
+                if resp.status_code == 200:
+                    result = self._parse(resp, attempt, start)
+                    logger.info("LLMGateway.usage [%s]: deployment=%s prompt_tokens=%d cached_tokens=%d "
+                                "completion_tokens=%d attempts=%d latency=%.2fs",
+                                label, self.deployment, result.prompt_tokens, result.cached_tokens,
+                                result.completion_tokens, attempt, result.latency_s)
+                    self.tokens.adjust((result.prompt_tokens + result.completion_tokens) - estimate
+                                       if (result.prompt_tokens or result.completion_tokens) else 0)
+                    if self.breaker.record_success():
+                        LLM_GATEWAY_CIRCUIT_OPEN.labels(deployment=self.deployment).set(0)
+                        logger.info("LLMGateway[%s]: circuit closed", self.deployment)
+                    return result
+                reason = str(resp.status_code)
+                retry_after = _retry_after_seconds(resp.headers)
+                if resp.status_code not in _RETRYABLE_STATUS:
+                    self._release_probe()
+                    raise LLMGatewayError(f"{self.deployment} returned {resp.status_code}: {resp.text[:300]}",
+                                          status_code=resp.status_code)
+            except httpx.TimeoutException:
+                reason = "timeout"
+            except httpx.TransportError as e:
+                reason = "connection"
+                logger.debug("LLMGateway[%s]: transport error - %s", self.deployment, e)
+            finally:
+                self._slots.release()
+
+            # Throttling is back-pressure, not ill health: only other failures count towards the breaker
+            if reason != "429" and self.breaker.record_failure():
+                LLM_GATEWAY_CIRCUIT_OPEN.labels(deployment=self.deployment).set(1)
+                logger.error("LLMGateway[%s]: circuit opened after %d consecutive failures",
+                             self.deployment, self.breaker.failure_threshold)
+            if attempt > max_retries or (self.breaker.is_open and reason != "429"):
+                self._release_probe()
+                raise LLMGatewayError(f"{label}: {self.deployment} failed after {attempt} attempt(s) ({reason})")
+
+            backoff = random.uniform(0, min(self.settings["backoff_max_s"], self.settings["backoff_base_s"] * (2 ** (attempt - 1))))
+            delay = max(backoff, retry_after or 0.0) + (random.uniform(0, 0.25) if retry_after else 0.0)
+            if time.monotonic() + delay >= deadline:
+                LLM_GATEWAY_REJECTIONS.labels(deployment=self.deployment, reason="deadline").inc()
+                self._release_probe()
+                raise GatewayTimeoutError(f"{label}: retry delay {delay:.2f}s exceeds deadline ({reason})")
+            LLM_GATEWAY_RETRIES.labels(deployment=self.deployment, reason=reason).inc()
+            LLM_TASK_RETRIES.labels(label=label, reason=reason).inc()
+            logger.warning("LLMGateway[%s]: %s attempt %d failed (%s); retrying in %.2fs",
+                           self.deployment, label, attempt, reason, delay)
+            time.sleep(delay)
+
+    def _release_probe(self) -> None:
+        with self.breaker._lock:
+            self.breaker.probe_in_flight = False
+
+    def _parse(self, resp: httpx.Response, attempt: int, start: float) -> LLMResult:
+        data = resp.json()
+        choice = (data.get("choices") or [{}])[0]
+        text = ((choice.get("message") or {}).get("content") or "").strip()
+        usage = data.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return LLMResult(
+            text=text,
+            deployment=self.deployment,
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            completion_tokens=int(usage.get("completion_tokens") or 0),
+            cached_tokens=int(details.get("cached_tokens") or 0),
+            attempts=attempt,
+            latency_s=time.monotonic() - start,
+            raw=data,
+        )
+
+
+def _deployment_settings(deployment: str) -> Dict[str, Any]:
+    spec = get_llm_gateway_spec() or {}
+    merged = dict(_DEFAULTS)
+    merged.update(spec.get("defaults") or {})
+    merged.update((spec.get("deployments") or {}).get(deployment) or {})
+    return merged
+
+
+def task_options(task_key: Optional[str]) -> Dict[str, Any]:
+    """Per-task gateway options: tasks.yaml `<task>.llm`, then llm_gateway.yaml `tasks.<task>`."""
+    if not task_key:
+        return {}
+    opts: Dict[str, Any] = {}
+    opts.update(((get_llm_gateway_spec() or {}).get("tasks") or {}).get(task_key) or {})
+    opts.update((get_tasks_spec().get(task_key) or {}).get("llm") or {})
+    return opts
+
+
+def _response_format_key(task_key: Optional[str], response_format: Dict[str, Any], label: str) -> str:
+    """Key a response_format fallback is remembered under: the task, else the schema name, else the label."""
+    if task_key:
+        return task_key
+    return str((response_format.get("json_schema") or {}).get("name") or label)
+
+
+def _valid_response(result: LLMResult, response_format: Optional[Dict[str, Any]]) -> bool:
+    if not result.text:
+        return False
+    if not response_format:
+        return True
+    try:
+        json.loads(result.text)
+        return True
+    except ValueError:
+        return False
+
+
+class _HedgingState:
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.latencies = LatencyWindow(settings["window_size"])
+        self.budget = HedgeBudget(settings["budget_ratio"], settings["budget_burst_tokens"])
+        workers = max(2, int(settings["max_workers"]))
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-hedge")
+        # Free pool workers; a hedge is only sent when one is available immediately
+        self.slots = threading.BoundedSemaphore(workers)
+
+
+def _start_thread(fn: Any, *args: Any) -> Future:
+    """Run `fn(*args)` on a new daemon thread (with the caller's context) and return its future."""
+    future: Future = Future()
+    ctx = copy_context()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(ctx.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-primary", daemon=True).start()
+    return future
+
+
+def _hedging_settings() -> Dict[str, Any]:
+    merged = dict(_HEDGING_DEFAULTS)
+    merged.update((get_llm_gateway_spec() or {}).get("hedging") or {})
+    env = os.getenv("LLM_HEDGING_ENABLED")
+    if env is not None:
+        merged["enabled"] = env.lower() == "true"
+    return merged
+
+
+def _hedging() -> _HedgingState:
+    global _hedging_state
+    if _hedging_state is None:
+        with _registry_lock:
+            if _hedging_state is None:
+                _hedging_state = _HedgingState(_hedging_settings())
+    return _hedging_state
+
+
+def _hedge_options(task_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The task's `hedge` block when hedging is enabled globally and for the task."""
+    hedge = task_options(task_key).get("hedge")
+    if not isinstance(hedge, dict) or not hedge.get("enabled", True):
+        return None
+    return hedge if _hedging().settings.get("enabled") else None
+
+
+_http_client: Optional[httpx.Client] = None
+_gateways: Dict[str, DeploymentGateway] = {}
+_registry_lock = threading.Lock()
+_hedging_state: Optional[_HedgingState] = None
+
+
+def _shared_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        pool = (get_llm_gateway_spec() or {}).get("http_pool") or {}
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=int(pool.get("max_connections", 64)),
+                max_keepalive_connections=int(pool.get("max_keepalive_connections", 32)),
+                keepalive_expiry=float(pool.get("keepalive_expiry_s", 60.0)),
+            ),
+            timeout=httpx.Timeout(float(pool.get("connect_timeout_s", 5.0)), read=None),
+        )
+    return _http_client
+
+
+class BoundGateway:
+    """A DeploymentGateway bound to one LLM object's temperature.
+
+    Limits, concurrency and the circuit breaker belong to the shared deployment
+    gateway; only the temperature sent with each request differs per LLM object.
+    Other attributes (deployment, settings, breaker, ...) are the gateway's.
+    """
+
+    def __init__(self, gateway: DeploymentGateway, temperature: Optional[float]):
+        self.gateway = gateway
+        self.temperature = temperature
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.gateway, name)
+
+    def call(self, messages: List[Dict[str, str]], label: str = "llm", task_key: Optional[str] = None, **kwargs: Any) -> str:
+        return self.complete(messages, label=label, task_key=task_key, **kwargs).text
+
+    def complete(self, messages: List[Dict[str, str]], label: str = "llm", task_key: Optional[str] = None,
+                 **kwargs: Any) -> LLMResult:
+        kwargs.setdefault("temperature", self.temperature)
+        return self.gateway.complete(messages, label=label, task_key=task_key, **kwargs)
+
+
+def gateway_for(llm_obj: Any) -> BoundGateway:
+    """Return the shared gateway for a CrewAI LLM object created by `initialize_models`.
+
+    Gateways are keyed by endpoint + deployment, so LLM objects that differ only in
+    temperature share one set of RPM/TPM buckets, concurrency slots and circuit breaker.
+    """
+    model = str(_llm_setting(llm_obj, "model", ""))
+    base_url = str(_llm_setting(llm_obj, "base_url", "") or "").rstrip("/")
+    key = f"{base_url}|{model}"
+    gw = _gateways.get(key)
+    if gw is None:
+        with _registry_lock:
+            gw = _gateways.get(key)
+            if gw is None:
+                gw = DeploymentGateway(llm_obj, _shared_http_client())
+                _gateways[key] = gw
+                logger.info("LLMGateway: registered deployment=%s rpm=%s tpm=%s max_concurrency=%s timeout_s=%s",
+                            gw.deployment, gw.settings["rpm"], gw.settings["tpm"],
+                            gw.settings["max_concurrency"], gw.settings["timeout_s"])
+    return BoundGateway(gw, _llm_setting(llm_obj, "temperature", None))
+
+
+def close_gateway() -> None:
+    """Close the shared HTTP pool (application shutdown)."""
+    global _http_client, _hedging_state
+    with _registry_lock:
+        if _hedging_state is not None:
+            _hedging_state.pool.shutdown(wait=False)
+            _hedging_state = None
+        if _http_client is not None:
+            try:
+                _http_client.close()
+            except Exception:
+                pass
+            _http_client = None
+        _gateways.clear()
+
+
+__all__ = [
+    "LLMGatewayError", "CircuitOpenError", "GatewayTimeoutError", "LLMResult",
+    "DeploymentGateway", "BoundGateway", "gateway_for", "task_options", "close_gateway",
+    "mark_event_loop",
+]
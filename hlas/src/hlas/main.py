@@ -4,14 +4,12 @@ from pydantic import BaseModel
 from .session import MongoSessionManager
 from .logging_config import setup_logging
 from .llm import initialize_models
-from .utils.greeting import get_time_based_greeting
 import sys
 import uvicorn
 from dotenv import load_dotenv
 import logging
 import warnings
-from contextlib import redirect_stdout, redirect_stderr
-import io
+import time
 
 load_dotenv()
 setup_logging()
@@ -24,10 +22,11 @@ except Exception as e:
     sys.exit(1)
 
 # Import LLM components AFTER logging is configured
-from .flow import HlasFlow
+from .turn_executor import TurnExecutor
 from .llm import azure_llm, azure_embeddings
-from .redis_utils import RedisLock, session_lock_key, get_redis
-from .metrics import REQUESTS_TOTAL, REDIS_LOCK_TIMEOUTS
+from .llm_gateway import close_gateway, mark_event_loop
+from .redis_utils import get_redis
+from .metrics import REQUESTS_TOTAL, REDIS_LOCK_TIMEOUTS, TURN_LANE_SECONDS, FAST_LANE_REPLIES_TOTAL
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 # Suppress noisy pydantic serializer warnings from underlying LLM/tooling libs
@@ -39,13 +38,18 @@ warnings.filterwarnings(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: nothing special (models pre-initialized)
+    # Startup: models are pre-initialized; start the WhatsApp background workers
+    mark_event_loop()  # blocking LLM gateway calls on this loop now raise (flows run on threads)
+    await start_whatsapp_workers()
     yield
-    # Shutdown: close reusable HTTP clients
+    # Shutdown: let queued WhatsApp messages finish, then close reusable HTTP clients
+    await drain_whatsapp_workers()
     await close_whatsapp_handler_http_client()
+    close_gateway()
 
 app = FastAPI(lifespan=lifespan)
 mongo_session_manager = MongoSessionManager()
+turn_executor = TurnExecutor(mongo_session_manager)
 logger = logging.getLogger(__name__)
 # Log only once across workers to avoid duplicate startup logs
 try:
@@ -65,60 +69,19 @@ async def chat(payload: ChatInput):
     logger = logging.getLogger(__name__)
     logger.info("Chat.request: session_id=%s message='%s'", payload.session_id, payload.message)
     try:
-        # Placeholder for tracing
-        # with tracer.start_as_current_span("chat") as span:
-        #     span.set_attribute("session_id", payload.session_id)
-
-        # Check for "Hi" greeting BEFORE loading session to avoid using old state
-        if payload.message.strip().lower() == "hi":
-            logger.info("Chat.handler: Received 'hi' greeting - resetting session before processing")
-            try:
-                mongo_session_manager.reset_session(payload.session_id)
-            except Exception as e:
-                logger.error("Chat.handler: Failed to reset session for 'hi' greeting - %s", e)
-
-            greeting = get_time_based_greeting()
-            logger.info("Chat.handler: Responding with time-based greeting")
-            return {"response": greeting, "sources": ""}
-
-        # Execute HlasFlow for fully LLM-driven orchestration under a per-session lock
-        flow = HlasFlow()
-        lock_key = session_lock_key(payload.session_id)
-        with RedisLock(lock_key, ttl_seconds=15.0, wait_timeout=5.0):
-            session = mongo_session_manager.get_session(payload.session_id)
-            logger.info("Chat.session_loaded: pending_slot='%s' product='%s' keys=%s",
-                       session.get("pending_slot"), session.get("product"), list(session.keys()))
-            # Suppress third-party console UIs from libraries during flow execution
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-                result = await flow.kickoff_async(inputs={"message": payload.message, "session": session})
-            # The flow's final state contains the complete, updated session
-            final_session = flow.state.session
-
-            # Trim long assistant replies in history to 100 characters for all responses
-            assistant_reply_full = str(flow.state.reply)
-            assistant_reply_hist = assistant_reply_full
-            try:
-                if isinstance(assistant_reply_full, str) and len(assistant_reply_full) > 100:
-                    assistant_reply_hist = assistant_reply_full[:100]
-            except Exception:
-                assistant_reply_hist = assistant_reply_full
-            
-            # Add the current turn to the history via the session manager
-            mongo_session_manager.add_history_entry(payload.session_id, payload.message, assistant_reply_hist)
-            
-            # Log the final session state before persisting
-            logger.info("Chat.session_persist.final: rec_status='%s' cmp_status='%s' sum_status='%s' keys=%s",
-                       final_session.get("recommendation_status"),
-                       final_session.get("comparison_status"),
-                       final_session.get("summary_status"),
-                       list(final_session.keys()))
-            
-            # Persist the entire updated session state from the flow
-            mongo_session_manager.save_session(payload.session_id, final_session)
+        # Fast lane (greeting, capabilities), lock, load, flow, history and persist are shared with WhatsApp
+        started = time.perf_counter()
+        result = await turn_executor.run(payload.session_id, payload.message, channel="chat")
+        TURN_LANE_SECONDS.labels(channel="chat", lane=result.lane).observe(time.perf_counter() - started)
+        if result.lane == "fast":
+            logger.info("Chat.handler: Responding from the fast lane (greeting=%s)", result.greeting)
+            FAST_LANE_REPLIES_TOTAL.labels(channel="chat", kind="greeting" if result.greeting else "capabilities").inc()
+            REQUESTS_TOTAL.labels(endpoint="/chat", status="200").inc()
+            return {"response": result.reply, "sources": ""}
         logger.info("Chat.completed: product=%s reply_len=%d sources=%s",
-                   flow.state.product, len(str(flow.state.reply or "")), str(flow.state.sources))
+                   result.product, len(result.reply), str(result.sources))
         REQUESTS_TOTAL.labels(endpoint="/chat", status="200").inc()
-        return {"response": str(flow.state.reply), "sources": flow.state.sources}
+        return {"response": result.reply, "sources": result.sources}
     except TimeoutError as e:
         logger.error(f"Redis lock timeout: {e}", exc_info=True)
         REDIS_LOCK_TIMEOUTS.labels(scope="chat").inc()
@@ -130,7 +93,9 @@ async def chat(payload: ChatInput):
         raise HTTPException(status_code=500, detail=str(e))
 
 # WhatsApp Integration Endpoints
-from .utils.whatsapp_handler import whatsapp_handler, close_whatsapp_handler_http_client
+from .utils.whatsapp_handler import (
+    whatsapp_handler, close_whatsapp_handler_http_client, start_whatsapp_workers, drain_whatsapp_workers,
+)
 
 @app.get("/health")
 def health_check():
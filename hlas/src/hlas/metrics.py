@@ -1,21 +1,194 @@
 """
 Prometheus metrics for HLAS chatbot.
 """
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 # HTTP requests
 REQUESTS_TOTAL = Counter(
     'hlas_requests_total', 'Total HTTP requests', ['endpoint', 'status']
 )
 
+# Priority lanes: fast (no LLM, no session lock) vs standard (full flow)
+TURN_LANE_SECONDS = Histogram(
+    'hlas_turn_lane_seconds', 'Time from receiving a message to its reply being ready, by channel and lane (fast, standard)', ['channel', 'lane'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+FAST_LANE_REPLIES_TOTAL = Counter(
+    'hlas_fast_lane_replies_total', 'Replies served by the fast lane by channel and kind (greeting, capabilities, rate_limited)', ['channel', 'kind']
+)
+
+# Per-stage turn latency (stage: session_load, lock_wait, decide, embedding, weaviate_query,
+# llm_synthesis, history_append, session_save; detail: cache/db, directive, search method, flow)
+TURN_STAGE_SECONDS = Histogram(
+    'hlas_turn_stage_seconds', 'Latency of one stage of a conversational turn by channel, product, stage and detail',
+    ['channel', 'product', 'stage', 'detail'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30),
+)
+
 # WhatsApp processing outcomes
 WA_MESSAGES_PROCESSED_TOTAL = Counter(
     'hlas_wa_messages_processed_total', 'Total WhatsApp messages processed grouped by result', ['result']
 )
 
+WA_WEBHOOK_BATCH_SIZE = Histogram(
+    'hlas_wa_webhook_batch_size', 'User messages per webhook delivery',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+WA_INBOUND_MESSAGES_TOTAL = Counter(
+    'hlas_wa_inbound_messages_total', 'Messages extracted from webhooks by type (text, unsupported)', ['type']
+)
+
+# Background worker pools (WhatsApp processing)
+WORKER_QUEUE_DEPTH = Gauge('hlas_worker_queue_depth', 'Jobs waiting in the worker pool queue', ['pool'])
+WORKER_INFLIGHT = Gauge('hlas_worker_inflight', 'Jobs currently being processed by pool workers', ['pool'])
+WORKER_QUEUE_WAIT_SECONDS = Histogram(
+    'hlas_worker_queue_wait_seconds', 'Time jobs spend queued before a worker picks them up', ['pool'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+
+# Per-user burst coalescing (several messages answered by one flow run)
+WA_COALESCED_BATCH_SIZE = Histogram(
+    'hlas_wa_coalesced_batch_size', 'WhatsApp messages combined into one flow run',
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+WA_LLM_CALLS_PER_MESSAGE = Histogram(
+    'hlas_wa_llm_calls_per_message', 'LLM gateway calls per inbound WhatsApp message (flow calls / messages in the batch)',
+    buckets=(0, 0.25, 0.5, 1, 1.5, 2, 3, 4, 5, 6, 8, 10),
+)
+
+# Outbound delivery (per-recipient ordered send queue)
+WA_REPLY_PARTS = Histogram(
+    'hlas_wa_reply_parts', 'WhatsApp messages used to deliver one reply (long replies are split)',
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+)
+WA_SEND_QUEUE_DEPTH = Gauge('hlas_wa_send_queue_depth', 'Replies waiting for delivery', ['queue'])
+WA_SEND_RESULTS_TOTAL = Counter(
+    'hlas_wa_send_results_total', 'Outbound send attempts by outcome (sent, retried, failed, abandoned)', ['queue', 'outcome']
+)
+WA_SEND_DELAY_SECONDS = Histogram(
+    'hlas_wa_send_delay_seconds', 'Time from a reply being queued to the API accepting it (including retries)', ['queue'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60),
+)
+
+# Graph API sender (pacing, throttling, latency)
+WA_GRAPH_SEND_SECONDS = Histogram(
+    'hlas_wa_graph_send_seconds', 'Graph API send request latency by outcome', ['outcome'],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+WA_GRAPH_SENDS_TOTAL = Counter(
+    'hlas_wa_graph_sends_total', 'Graph API send requests by outcome (ok, throttled, rejected, server_error, timeout, connection_error)', ['outcome']
+)
+WA_GRAPH_THROTTLES_TOTAL = Counter(
+    'hlas_wa_graph_throttles_total', 'Graph API throttling responses by Meta error code (or HTTP status)', ['code']
+)
+WA_GRAPH_SEND_RATE = Gauge(
+    'hlas_wa_graph_send_rate', 'Current paced send rate per business phone number ID (messages/s)', ['phone_number_id']
+)
+WA_GRAPH_PACING_WAIT_SECONDS = Histogram(
+    'hlas_wa_graph_pacing_wait_seconds', 'Time a send waited for its phone number pacing slot', ['phone_number_id'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
+# Durable inbound queue (Redis Streams)
+INBOUND_STREAM_EVENTS = Counter(
+    'hlas_inbound_stream_events_total', 'Inbound stream entries by event (published, acked, failed, reclaimed, dead_lettered, duplicate)', ['event']
+)
+INBOUND_STREAM_PARTITIONS_OWNED = Gauge(
+    'hlas_inbound_stream_partitions_owned', 'Stream partitions currently leased by a consumer', ['consumer']
+)
+INBOUND_STREAM_LAG_SECONDS = Histogram(
+    'hlas_inbound_stream_lag_seconds', 'Time from publish to a consumer starting the entry',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+
 # Session cache metrics
 SESSION_CACHE_HITS = Counter('hlas_session_cache_hits_total', 'Session cache hits')
 SESSION_CACHE_MISSES = Counter('hlas_session_cache_misses_total', 'Session cache misses')
 
 # Redis locks
 REDIS_LOCK_TIMEOUTS = Counter('hlas_redis_lock_timeouts_total', 'Redis lock acquisition timeouts', ['scope'])
+REDIS_LOCK_WAIT_SECONDS = Histogram(
+    'hlas_redis_lock_wait_seconds', 'Time spent waiting to acquire a session lock', ['scope'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5),
+)
+REDIS_LOCK_HOLD_SECONDS = Histogram(
+    'hlas_redis_lock_hold_seconds', 'Time a session lock is held from acquisition to release', ['scope'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 10, 15, 20, 30),
+)
+REDIS_LOCK_CONTENDED_TOTAL = Counter(
+    'hlas_redis_lock_contended_total', 'Lock acquisitions that found the lock held at least once', ['scope']
+)
+
+# RAG context packing (InfoFlow)
+RAG_CONTEXT_TOKENS = Histogram(
+    'hlas_rag_context_tokens', 'Retrieved context size in tokens before and after packing', ['product', 'stage'],
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000),
+)
+RAG_CONTEXT_TOKENS_SAVED = Counter(
+    'hlas_rag_context_tokens_saved_total', 'Prompt tokens removed by context packing', ['product']
+)
+INFO_SYNTHESIS_SECONDS = Histogram(
+    'hlas_info_synthesis_seconds', 'InfoFlow answer synthesis latency in seconds', ['product']
+)
+BENEFITS_MATRIX_LOOKUPS = Counter(
+    'hlas_benefits_matrix_lookups_total', 'InfoFlow benefits-matrix lookups grouped by outcome (hit/miss)', ['product', 'outcome']
+)
+
+# LLM gateway (rate limiting, retries, circuit breaker)
+LLM_GATEWAY_RETRIES = Counter(
+    'hlas_llm_gateway_retries_total', 'LLM request retries by deployment and reason (status code, timeout, connection)', ['deployment', 'reason']
+)
+LLM_GATEWAY_REJECTIONS = Counter(
+    'hlas_llm_gateway_rejections_total', 'LLM calls failed fast by the gateway (circuit_open, deadline)', ['deployment', 'reason']
+)
+LLM_GATEWAY_THROTTLE_WAIT_SECONDS = Histogram(
+    'hlas_llm_gateway_throttle_wait_seconds', 'Time spent waiting for request/token buckets', ['deployment'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+LLM_GATEWAY_CIRCUIT_OPEN = Gauge(
+    'hlas_llm_gateway_circuit_open', '1 while the deployment circuit breaker is open', ['deployment']
+)
+
+# Structured LLM outputs
+LLM_JSON_PARSE_TOTAL = Counter(
+    'hlas_llm_json_parse_total', 'JSON parsing of LLM task outputs by label and outcome (ok, recovered, text_fallback, failed)', ['label', 'outcome']
+)
+LLM_RESPONSE_FORMAT_FALLBACKS = Counter(
+    'hlas_llm_response_format_fallbacks_total', 'Tasks switched to prompt-only JSON after the deployment rejected their response_format', ['deployment', 'task']
+)
+LLM_CACHE_LOOKUPS = Counter(
+    'hlas_llm_cache_lookups_total', 'Classifier result cache lookups by label and outcome (hit, miss, error)', ['label', 'outcome']
+)
+LLM_CASCADE_TOTAL = Counter(
+    'hlas_llm_cascade_total', 'Classifier cascade outcomes per task (accepted, escalated_invalid, escalated_low_confidence, escalated_error)', ['task', 'outcome']
+)
+LLM_CASCADE_SECONDS = Histogram(
+    'hlas_llm_cascade_seconds', 'Classifier cascade latency per task and path (small, escalated)', ['task', 'path'],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+
+# Per-label LLM telemetry (recorded by the gateway for every call site)
+LLM_REQUEST_SECONDS = Histogram(
+    'hlas_llm_request_seconds', 'LLM call latency including throttling and retries', ['label', 'agent', 'deployment'],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 8, 13, 20, 30),
+)
+LLM_REQUESTS_TOTAL = Counter(
+    'hlas_llm_requests_total', 'LLM calls by label, agent, deployment and outcome (ok, error, timeout, circuit_open)', ['label', 'agent', 'deployment', 'outcome']
+)
+LLM_TOKENS_TOTAL = Counter(
+    'hlas_llm_tokens_total', 'Tokens reported in API usage by label, deployment and kind (prompt, cached_prompt, completion)', ['label', 'deployment', 'kind']
+)
+LLM_COST_USD_TOTAL = Counter(
+    'hlas_llm_cost_usd_total', 'Estimated LLM spend in USD from usage and llm_gateway.yaml prices', ['label', 'deployment']
+)
+LLM_TASK_RETRIES = Counter(
+    'hlas_llm_task_retries_total', 'LLM request retries by label and reason', ['label', 'reason']
+)
+LLM_HEDGES_TOTAL = Counter(
+    'hlas_llm_hedges_total', 'Hedged LLM requests by label and outcome (fired, primary_won, hedge_won, budget_exhausted, pool_busy, deadline, breaker_open)', ['label', 'outcome']
+)
+
+# Slot validation path (local deterministic validator vs LLM validate_slot)
+SLOT_VALIDATIONS = Counter(
+    'hlas_slot_validations_total', 'Slot validations by product, slot and path (local_valid, local_invalid, llm)', ['product', 'slot', 'path']
+)
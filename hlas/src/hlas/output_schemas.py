@@ -0,0 +1,233 @@
+"""
+Compile the `expected_output` contracts in tasks.yaml into JSON Schemas for
+structured-output requests (`response_format: json_schema`).
+
+The contracts are written in a compact pseudo-JSON notation, e.g.
+
+    { "product": "Travel" | "Maid" | "", "confidence": 0.0-1.0, "question"?: string }
+    { "product": "<product>", "tiers": ["<tier>", ...], "question"?: "<short>" }
+    { "valid": true|false, "slot_name": string, "normalized_value"?: string }
+
+Supported value forms: string literal unions (enum), `"<placeholder>"` and
+`string` (string), `true|false` / `boolean`, `integer`, `number` or a numeric
+range `a-b`, `[ <value>, ... ]` (array of the first element's type), nested
+objects, and `|null`. Keys ending in `?` are optional; because strict mode
+requires every property, optional keys are made nullable and the nulls are
+dropped again after parsing (see `strip_nulls`).
+
+Contracts with placeholder keys (extract_slots uses "slot_name_1", ...) cannot
+be expressed as a fixed schema and fall back to `json_object` mode.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config_loader import get_tasks_spec
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER_KEY_RE = re.compile(r"^(?:<.*>|.*_\d+)$")
+_RANGE_RE = re.compile(r"^-?\d+(?:\.\d+)?\s*-\s*-?\d+(?:\.\d+)?$")
+
+_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+
+
+class SchemaCompileError(ValueError):
+    pass
+
+
+class _Parser:
+    """Recursive-descent parser for the expected_output notation."""
+
+    def __init__(self, text: str):
+        self.s = text
+        self.i = 0
+
+    def _ws(self) -> None:
+        while self.i < len(self.s) and self.s[self.i].isspace():
+            self.i += 1
+
+    def _peek(self) -> str:
+        self._ws()
+        return self.s[self.i] if self.i < len(self.s) else ""
+
+    def _expect(self, ch: str) -> None:
+        if self._peek() != ch:
+            raise SchemaCompileError(f"expected '{ch}' at {self.i}")
+        self.i += 1
+
+    def _string(self) -> str:
+        self._expect('"')
+        end = self.s.index('"', self.i)
+        value = self.s[self.i:end]
+        self.i = end + 1
+        return value
+
+    def _bare(self) -> str:
+        self._ws()
+        m = re.compile(r"[A-Za-z0-9_.\-]+").match(self.s, self.i)
+        if not m:
+            raise SchemaCompileError(f"unexpected token at {self.i}: {self.s[self.i:self.i + 20]!r}")
+        self.i = m.end()
+        return m.group(0)
+
+    def parse(self) -> Dict[str, Any]:
+        schema = self._value()
+        if self._peek():
+            raise SchemaCompileError("trailing content")
+        if schema.get("type") != "object":
+            raise SchemaCompileError("top-level contract must be an object")
+        return schema
+
+    def _value(self) -> Dict[str, Any]:
+        alternatives = [self._atom()]
+        while self._peek() == "|":
+            self.i += 1
+            alternatives.append(self._atom())
+        return _merge_alternatives(alternatives)
+
+    def _atom(self) -> Tuple[str, Any]:
+        ch = self._peek()
+        if ch == "{":
+            return ("schema", self._object())
+        if ch == "[":
+            return ("schema", self._array())
+        if ch == '"':
+            return ("literal", self._string())
+        word = self._bare()
+        if word in ("true", "false", "boolean", "bool"):
+            return ("schema", {"type": "boolean"})
+        if word in ("string", "str"):
+            return ("schema", {"type": "string"})
+        if word in ("integer", "int"):
+            return ("schema", {"type": "integer"})
+        if word in ("number", "float"):
+            return ("schema", {"type": "number"})
+        if word == "null":
+            return ("null", None)
+        if _RANGE_RE.match(word):
+            return ("schema", {"type": "number"})
+        raise SchemaCompileError(f"unknown type {word!r}")
+
+    def _array(self) -> Dict[str, Any]:
+        self._expect("[")
+        items: Optional[Dict[str, Any]] = None
+        while self._peek() not in ("]", ""):
+            if self.s.startswith("...", self.i):
+                self.i += 3
+            else:
+                item = self._value()
+                items = items or item
+            if self._peek() == ",":
+                self.i += 1
+        self._expect("]")
+        return {"type": "array", "items": items or {"type": "string"}}
+
+    def _object(self) -> Dict[str, Any]:
+        self._expect("{")
+        properties: Dict[str, Any] = {}
+        required: List[str] = []
+        optional: List[str] = []
+        while self._peek() not in ("}", ""):
+            key = self._string() if self._peek() == '"' else self._bare()
+            if _PLACEHOLDER_KEY_RE.match(key):
+                raise SchemaCompileError(f"placeholder key {key!r}")
+            is_optional = False
+            if self._peek() == "?":
+                self.i += 1
+                is_optional = True
+            self._expect(":")
+            properties[key] = self._value()
+            (optional if is_optional else required).append(key)
+            if self._peek() == ",":
+                self.i += 1
+        self._expect("}")
+        # Strict mode: every property is required; optional ones accept null instead
+        for key in optional:
+            properties[key] = _nullable(properties[key])
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": required + optional,
+            "additionalProperties": False,
+        }
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    schema = dict(schema)
+    t = schema.get("type")
+    if isinstance(t, list):
+        if "null" not in t:
+            schema["type"] = t + ["null"]
+    elif t:
+        schema["type"] = [t, "null"]
+    if "enum" in schema and None not in schema["enum"]:
+        schema["enum"] = schema["enum"] + [None]
+    return schema
+
+
+def _merge_alternatives(alts: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    literals = [v for kind, v in alts if kind == "literal"]
+    schemas = [v for kind, v in alts if kind == "schema"]
+    has_null = any(kind == "null" for kind, _ in alts)
+    if literals and not schemas:
+        # "<placeholder>" literals are free text; real literals form an enum
+        if all(lit.startswith("<") and lit.endswith(">") for lit in literals):
+            schema: Dict[str, Any] = {"type": "string"}
+        else:
+            schema = {"type": "string", "enum": [lit for lit in literals if not lit.startswith("<")]}
+    elif schemas:
+        schema = schemas[0]
+        # true|false and similar repeated atoms collapse into one
+        if any(s != schema for s in schemas[1:]) or literals:
+            schema = {"type": "string"} if literals else schema
+    else:
+        schema = {"type": "null"}
+    return _nullable(schema) if has_null else schema
+
+
+def compile_expected_output(text: str) -> Dict[str, Any]:
+    """Compile one expected_output contract; raises SchemaCompileError when unsupported."""
+    return _Parser((text or "").strip()).parse()
+
+
+def response_format_for(task_key: str) -> Dict[str, Any]:
+    """Response format for a tasks.yaml task: strict json_schema when compilable, else json_object."""
+    if task_key not in _cache:
+        schema: Optional[Dict[str, Any]] = None
+        expected = (get_tasks_spec().get(task_key) or {}).get("expected_output") or ""
+        try:
+            schema = compile_expected_output(expected)
+        except SchemaCompileError as e:
+            logger.info("OutputSchemas: %s uses json_object mode (%s)", task_key, e)
+        except Exception as e:
+            logger.warning("OutputSchemas: failed to compile %s - %s", task_key, e)
+        with _cache_lock:
+            _cache[task_key] = schema
+    schema = _cache[task_key]
+    if schema is None:
+        return {"type": "json_object"}
+    return {"type": "json_schema", "json_schema": {"name": task_key, "strict": True, "schema": schema}}
+
+
+def required_keys(task_key: str) -> List[str]:
+    """Top-level keys a task must always return (non-optional in its contract)."""
+    fmt = response_format_for(task_key)
+    schema = (fmt.get("json_schema") or {}).get("schema") or {}
+    props = schema.get("properties") or {}
+    return [k for k in schema.get("required") or []
+            if not (isinstance(props.get(k, {}).get("type"), list) and "null" in props[k]["type"])]
+
+
+def strip_nulls(obj: Any) -> Any:
+    """Drop null values produced for optional keys so callers see them as absent."""
+    if isinstance(obj, dict):
+        return {k: strip_nulls(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, list):
+        return [strip_nulls(v) for v in obj]
+    return obj
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict
-import json
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import orjson
 import re
 import yaml
 import logging
+import threading
+import time
 from datetime import datetime
 try:
     from zoneinfo import ZoneInfo  # Python 3.9+
@@ -14,13 +17,41 @@ except Exception:  # pragma: no cover - fallback if zoneinfo unavailable
 
 # Use cached configs from config_loader
 from .config_loader import get_agents_spec, get_tasks_spec
+from .llm_gateway import gateway_for, task_options
+from .metrics import LLM_JSON_PARSE_TOTAL, LLM_CACHE_LOOKUPS, LLM_CASCADE_TOTAL, LLM_CASCADE_SECONDS
+from .output_schemas import required_keys, response_format_for, strip_nulls
 
 # Get cached specs - these are loaded once at config_loader module import
 AGENTS_SPEC: Dict[str, Any] = get_agents_spec()
 TASKS_SPEC: Dict[str, Any] = get_tasks_spec()
 
 
-def build_prompts(agent_key: str, task_key: str, context_text: str, logger: logging.Logger) -> tuple[str, str]:
+# Default output contract for validate_slot when tasks.yaml omits the "reason" field
+_VALIDATE_SLOT_CONTRACT = '{ "valid": true|false, "slot_name": string, "normalized_value"?: string, "question"?: string, "reason"?: string }'
+
+# Free-text generation tasks are never served from the result cache, even if configured
+_UNCACHEABLE_TASKS = frozenset({"synthesize_response", "followup_clarification", "ask_question", "construct_follow_up_query"})
+
+_result_cache = None
+
+# Compiled static system prompts keyed by (agent_key, task_key)
+_COMPILED_SYSTEM_PROMPTS: Dict[Tuple[str, str], str] = {}
+_COMPILE_LOCK = threading.Lock()
+
+
+def compile_system_prompt(agent_key: str, task_key: str) -> str:
+    """Build the static system prompt for (agent_key, task_key) once.
+
+    The result depends only on agents.yaml/tasks.yaml, so it is byte-identical on
+    every call and can be served from the provider's prompt-prefix cache. Every
+    per-turn value (product, slot, validation rules, history) belongs in the
+    user message.
+    """
+    key = (agent_key, task_key)
+    cached = _COMPILED_SYSTEM_PROMPTS.get(key)
+    if cached is not None:
+        return cached
+
     agent_spec = AGENTS_SPEC.get(agent_key, {})
     task_spec = TASKS_SPEC.get(task_key, {})
     role = agent_spec.get("role", agent_key)
@@ -29,63 +60,169 @@ def build_prompts(agent_key: str, task_key: str, context_text: str, logger: logg
     description = (task_spec.get("description") or "").strip()
     expected = (task_spec.get("expected_output") or "").strip()
 
-    # Interpolate {product} in the description, if present.
-    if "{product}" in description:
-        product = "unknown"
-        try:
-            for line in context_text.splitlines():
-                if line.lower().startswith("product:"):
-                    product = line.split(":", 1)[1].strip()
-                    break
-        except Exception:
-            pass  # Keep product as 'unknown'
-        description = description.format(product=product)
-
-    # Separate rules from the rest of the context
-    rules_section = ""
-    data_section_lines = []
-    in_rules = False
-    for line in context_text.splitlines():
-        if line.strip().lower().startswith("validation rules:"):
-            in_rules = True
-        if in_rules:
-            rules_section += line + "\n"
-        else:
-            data_section_lines.append(line)
-    
-    data_section = "\n".join(data_section_lines).strip()
-    rules_section = rules_section.strip()
-
-    # The System Prompt contains all static instructions from the YAML files, plus any rules from the context.
+    # Product-specific wording would make the prefix vary per turn; the product is in [Context]
+    description = description.replace("{product}", "product")
+    if task_key == "validate_slot" and '"reason"' not in expected:
+        expected = _VALIDATE_SLOT_CONTRACT
+
     system_prompt = (
         f"You are {role}. {backstory}\n\n"
         f"Your goal is: {goal}\n\n"
         f"Task Description: {description}\n\n"
-        f"{rules_section}\n\n"  # Rules are now part of the system prompt
         f"Output contract (JSON):\n{expected}"
     ).strip()
 
-    # For validators, add a specific instruction to focus on the target slot.
+    # For validators, focus on the slot named in the user message
     if task_key == "validate_slot":
-        if '"reason"' not in expected:
-            expected = '{ "valid": true|false, "slot_name": string, "normalized_value"?: string, "question"?: string, "reason"?: string }'
-        try:
-            slot_name = None
-            for _line in data_section_lines: # Search in data lines, not the full context
-                if _line.lower().startswith("slot:"):
-                    slot_name = _line.split(":", 1)[1].strip()
-                    break
-            system_prompt += f"\n\nFocus only on validating {slot_name or 'the provided slot'}."
-        except Exception:
-            system_prompt += f"\n\nFocus only on validating the provided slot."
+        system_prompt += (
+            "\n\nFocus only on validating the slot named under \"Slot:\" in [Context], "
+            "using the rules listed under \"Validation rules:\" in [Context]."
+        )
 
-    # The User Prompt contains only the dynamic data for the current turn.
-    user_prompt = f"[Context]\n{data_section}".strip()
-            
+    with _COMPILE_LOCK:
+        _COMPILED_SYSTEM_PROMPTS.setdefault(key, system_prompt)
+    return _COMPILED_SYSTEM_PROMPTS[key]
+
+
+def build_prompts(agent_key: str, task_key: str, context_text: str, logger: logging.Logger) -> tuple[str, str]:
+    """Return (static system prompt, per-turn user prompt)."""
+    system_prompt = compile_system_prompt(agent_key, task_key)
+    # The User Prompt contains only the dynamic data for the current turn (including validation rules).
+    user_prompt = f"[Context]\n{(context_text or '').strip()}".strip()
     return system_prompt, user_prompt
 
 
-def call_direct_json(agent_obj: Any, system_prompt: str, user_prompt: str, logger: Any, label: str, allow_text_fallback: bool = False) -> Dict[str, Any]:
+def parse_json_output(txt: str, logger: Any, label: str, allow_text_fallback: bool = False) -> Dict[str, Any]:
+    """Parse an LLM task output into a dict, recording the outcome per label.
+
+    Structured outputs normally parse strictly; the regex recovery only matters
+    for deployments or tasks without schema enforcement.
+    """
+    outcome = "failed"
+    result: Dict[str, Any] = {}
+    try:
+        parsed = orjson.loads(txt)
+        if isinstance(parsed, dict):
+            outcome, result = "ok", strip_nulls(parsed)
+    except orjson.JSONDecodeError as e:
+        logger.warning("LLM Direct [%s]: JSON parsing failed. Error: %s. Raw text: '%s'", label, e, txt)
+        m = re.search(r"{[\s\S]*}", txt)
+        if m:
+            try:
+                parsed = orjson.loads(m.group(0))
+                if isinstance(parsed, dict):
+                    outcome, result = "recovered", strip_nulls(parsed)
+            except orjson.JSONDecodeError:
+                pass
+        elif allow_text_fallback and txt:
+            # Optional fallback: wrap raw text as JSON for text-only tasks
+            logger.info("LLM Direct [%s]: no JSON detected; using text fallback (len=%d)", label, len(txt))
+            outcome, result = "text_fallback", {"response": txt}
+    try:
+        LLM_JSON_PARSE_TOTAL.labels(label=label, outcome=outcome).inc()
+    except Exception:
+        pass
+    return result
+
+
+def structured_output_format(task_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """response_format for a task, or None when the task opts out (`llm.structured_output: false`)."""
+    if not task_key or task_key not in TASKS_SPEC:
+        return None
+    if not task_options(task_key).get("structured_output", True):
+        return None
+    return response_format_for(task_key)
+
+
+def _cache_ttl(task_key: Optional[str]) -> int:
+    """Result-cache TTL for a task (`llm.cache_ttl_s` in tasks.yaml); 0 when caching is off."""
+    if not task_key or task_key in _UNCACHEABLE_TASKS:
+        return 0
+    try:
+        return max(0, int(task_options(task_key).get("cache_ttl_s") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _prompt_digest(gateway: Any, system_prompt: str, user_prompt: str) -> str:
+    h = hashlib.sha256()
+    for part in (gateway.deployment, str(gateway.temperature), system_prompt, user_prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        from .redis_utils import LLMResultCache
+        _result_cache = LLMResultCache()
+    return _result_cache
+
+
+def _cascade_escalation(task_key: str, result: Dict[str, Any], cfg: Dict[str, Any]) -> Optional[str]:
+    """Why the small model's answer must be escalated, or None to accept it."""
+    if not result or any(k not in result for k in required_keys(task_key)):
+        return "escalated_invalid"
+    conf = result.get("confidence")
+    if conf is not None:
+        try:
+            if float(conf) < float(cfg.get("min_confidence", 0.7)):
+                return "escalated_low_confidence"
+        except (TypeError, ValueError):
+            return "escalated_invalid"
+    # e.g. identify_tiers: a clarification question means the small model could not decide
+    if any(result.get(k) for k in cfg.get("escalate_on_keys") or []):
+        return "escalated_low_confidence"
+    return None
+
+
+def _complete_json(llm_obj: Any, messages: list, logger: Any, label: str, task_key: Optional[str],
+                   allow_text_fallback: bool, agent_key: Optional[str] = None) -> Dict[str, Any]:
+    # All LLM traffic goes through the gateway (rate limits, retries, timeouts, circuit breaker, telemetry)
+    raw = gateway_for(llm_obj).call(messages, label=label, task_key=task_key,
+                                    response_format=structured_output_format(task_key), agent=agent_key)
+    return parse_json_output(str(raw).strip(), logger, label, allow_text_fallback=allow_text_fallback)
+
+
+def _cascade_model(task_key: Optional[str], allow_text_fallback: bool) -> Tuple[Any, Dict[str, Any]]:
+    """The task's small model and cascade settings (`llm.cascade` in tasks.yaml), or (None, {})."""
+    cfg = task_options(task_key).get("cascade") if task_key else None
+    if allow_text_fallback or not isinstance(cfg, dict) or not cfg.get("enabled", True):
+        return None, {}
+    from .llm import get_llm
+    return get_llm(cfg.get("model", "classifier")), cfg
+
+
+def _complete_with_cascade(agent_obj: Any, messages: list, logger: Any, label: str, task_key: Optional[str],
+                           allow_text_fallback: bool, agent_key: Optional[str] = None) -> Tuple[Any, Dict[str, Any]]:
+    """Try the task's small model first and escalate to the agent's model.
+
+    Returns (LLM object that produced the result, result) so the result is cached under that model.
+    """
+    small_llm, cfg = _cascade_model(task_key, allow_text_fallback)
+    if small_llm is None:
+        return agent_obj.llm, _complete_json(agent_obj.llm, messages, logger, label, task_key, allow_text_fallback, agent_key)
+
+    start = time.monotonic()
+    try:
+        result = _complete_json(small_llm, messages, logger, f"{label}.small", task_key, False, agent_key)
+        outcome = _cascade_escalation(task_key, result, cfg)
+    except Exception as e:
+        logger.warning("LLM Direct [%s]: small model failed - %s", label, e)
+        result, outcome = {}, "escalated_error"
+    if outcome is None:
+        LLM_CASCADE_TOTAL.labels(task=task_key, outcome="accepted").inc()
+        LLM_CASCADE_SECONDS.labels(task=task_key, path="small").observe(time.monotonic() - start)
+        return small_llm, result
+    logger.info("LLM Direct [%s]: escalating to %s (%s)", label, gateway_for(agent_obj.llm).deployment, outcome)
+    LLM_CASCADE_TOTAL.labels(task=task_key, outcome=outcome).inc()
+    result = _complete_json(agent_obj.llm, messages, logger, label, task_key, allow_text_fallback, agent_key)
+    LLM_CASCADE_SECONDS.labels(task=task_key, path="escalated").observe(time.monotonic() - start)
+    return agent_obj.llm, result
+
+
+def call_direct_json(agent_obj: Any, system_prompt: str, user_prompt: str, logger: Any, label: str, allow_text_fallback: bool = False, task_key: Optional[str] = None, agent_key: Optional[str] = None) -> Dict[str, Any]:
     try:
         # Log actual prompts
         logger.info("LLM Direct [%s]:\n[SYSTEM]\n%s\n\n[USER]\n%s", label, system_prompt, user_prompt)
@@ -93,31 +230,40 @@ def call_direct_json(agent_obj: Any, system_prompt: str, user_prompt: str, logge
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
-        raw = agent_obj.llm.call(messages=messages)
-        txt = str(raw).strip()
-        try:
-            return json.loads(txt)
-        except Exception as e:
-            logger.warning("LLM Direct [%s]: JSON parsing failed. Error: %s. Raw text: '%s'", label, e, txt)
-            m = re.search(r"{[\s\S]*}", txt)
-            if m:
-                try:
-                    return json.loads(m.group(0))
-                except Exception:
-                    return {}
-            # Optional fallback: wrap raw text as JSON for text-only tasks
-            if allow_text_fallback and txt:
+        # Cached results are keyed by the model that produced them: an accepted small-model answer is
+        # only served while the cascade would try that model first, and never as the agent model's answer
+        ttl = 0 if allow_text_fallback else _cache_ttl(task_key)
+        if ttl:
+            small_llm, _ = _cascade_model(task_key, allow_text_fallback)
+            for llm_obj in (small_llm, agent_obj.llm):
+                if llm_obj is None:
+                    continue
                 try:
-                    logger.info("LLM Direct [%s]: no JSON detected; using text fallback (len=%d)", label, len(txt))
-                except Exception:
-                    pass
-                return {"response": txt}
-            return {}
-    except Exception:
+                    cached = _get_result_cache().get(task_key, _prompt_digest(gateway_for(llm_obj), system_prompt, user_prompt))
+                except Exception as e:
+                    LLM_CACHE_LOOKUPS.labels(label=label, outcome="error").inc()
+                    logger.warning("LLM Direct [%s]: result cache lookup failed - %s", label, e)
+                    break
+                if cached is not None:
+                    LLM_CACHE_LOOKUPS.labels(label=label, outcome="hit").inc()
+                    logger.info("LLM Direct [%s]: served from result cache (%s)", label, gateway_for(llm_obj).deployment)
+                    return cached
+            else:
+                LLM_CACHE_LOOKUPS.labels(label=label, outcome="miss").inc()
+        producer, result = _complete_with_cascade(agent_obj, messages, logger, label, task_key, allow_text_fallback, agent_key)
+        if ttl and result:
+            try:
+                digest = _prompt_digest(gateway_for(producer), system_prompt, user_prompt)
+                _get_result_cache().set(task_key, digest, result, ttl)
+            except Exception as e:
+                logger.warning("LLM Direct [%s]: result cache store failed - %s", label, e)
+        return result
+    except Exception as e:
+        logger.error("LLM Direct [%s]: call failed - %s", label, e)
         return {}
 
 
 def run_direct_task(agent_obj: Any, agent_key: str, task_key: str, context_text: str, logger: Any, label: str) -> Dict[str, Any]:
     system_prompt, user_prompt = build_prompts(agent_key, task_key, context_text, logger)
     allow_text = task_key in ("synthesize_response", "followup_clarification")
-    return call_direct_json(agent_obj, system_prompt, user_prompt, logger, label, allow_text_fallback=allow_text)
\ No newline at end of file
+    return call_direct_json(agent_obj, system_prompt, user_prompt, logger, label, allow_text_fallback=allow_text, task_key=task_key, agent_key=agent_key)
\ No newline at end of file
@@ -6,9 +6,10 @@ from __future__ import annotations
 
 import os
 import time
+import asyncio
 import uuid
 import logging
-from typing import Any, Dict, Optional, ContextManager
+from typing import Any, Dict, List, Optional, ContextManager
 import orjson
 
 try:
@@ -16,6 +17,8 @@ try:
 except Exception as e:  # pragma: no cover
     raise ImportError("redis package is required. Install with 'pip install redis'.") from e
 
+from .metrics import REDIS_LOCK_WAIT_SECONDS, REDIS_LOCK_CONTENDED_TOTAL, REDIS_LOCK_HOLD_SECONDS
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +28,8 @@ _RL_WINDOW = int(os.getenv("RL_WINDOW_SECONDS", "60"))
 _RL_MAX = int(os.getenv("RL_MAX_MESSAGES", "10"))
 _DEDUPE_TTL = int(os.getenv("DEDUPE_TTL_SECONDS", "86400"))  # 24 hours
 _ORDER_TTL = int(os.getenv("ORDER_TTL_SECONDS", "86400"))
+_COALESCE_BUFFER_TTL = int(os.getenv("COALESCE_BUFFER_TTL_SECONDS", "600"))
+_PENDING_TURNS_TTL = int(os.getenv("PENDING_TURNS_TTL_SECONDS", "600"))
 
 
 _client: Optional["redis.Redis"] = None
@@ -53,29 +58,70 @@ def get_redis() -> "redis.Redis":
 
 
 class RedisLock(ContextManager["RedisLock"]):
-    """Simple Redis-based distributed lock with token verification."""
+    """Simple Redis-based distributed lock with token verification.
+
+    Use `with` from threads and `async with` from coroutines: the async form polls
+    with asyncio.sleep so waiting for a contended lock does not block the event loop.
+
+    With `scope` set, the wait for the lock, contended acquisitions and the hold time
+    are recorded (hlas_redis_lock_wait_seconds, hlas_redis_lock_contended_total,
+    hlas_redis_lock_hold_seconds).
+    """
 
-    def __init__(self, key: str, ttl_seconds: float = 10.0, wait_timeout: float = 5.0):
+    _POLL_SECONDS = 0.05
+
+    def __init__(self, key: str, ttl_seconds: float = 10.0, wait_timeout: float = 5.0, scope: Optional[str] = None):
         self._client = get_redis()
+        self._scope = scope
         self._key = f"lock:{key}"
         self._ttl_ms = int(ttl_seconds * 1000)
         self._wait_ms = int(wait_timeout * 1000)
         self._token = str(uuid.uuid4())
         self._acquired = False
+        self._acquired_at = 0.0
 
     def __enter__(self) -> "RedisLock":
+        started = time.monotonic()
+        deadline = started + self._wait_ms / 1000.0
+        attempts = 0
+        while True:
+            attempts += 1
+            if self._try_acquire() or time.monotonic() >= deadline:
+                break
+            time.sleep(self._POLL_SECONDS)
+        return self._finish_wait(started, attempts)
+
+    async def __aenter__(self) -> "RedisLock":
+        started = time.monotonic()
+        deadline = started + self._wait_ms / 1000.0
+        attempts = 0
+        while True:
+            attempts += 1
+            if self._try_acquire() or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(self._POLL_SECONDS)
+        return self._finish_wait(started, attempts)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+    def _try_acquire(self) -> bool:
         if not self._client:
             raise RuntimeError("RedisLock requires Redis client")
-        deadline = time.time() * 1000 + self._wait_ms
-        while time.time() * 1000 < deadline:
-            try:
-                if self._client.set(self._key, self._token, nx=True, px=self._ttl_ms):
-                    self._acquired = True
-                    break
-            except Exception as e:
-                logger.critical("REDIS_FAILURE: RedisLock set failed: %s", e)
-                raise
-            time.sleep(0.05)
+        try:
+            if self._client.set(self._key, self._token, nx=True, px=self._ttl_ms):
+                self._acquired = True
+                self._acquired_at = time.monotonic()
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: RedisLock set failed: %s", e)
+            raise
+        return self._acquired
+
+    def _finish_wait(self, started: float, attempts: int) -> "RedisLock":
+        if self._scope:
+            REDIS_LOCK_WAIT_SECONDS.labels(scope=self._scope).observe(time.monotonic() - started)
+            if attempts > 1 or not self._acquired:
+                REDIS_LOCK_CONTENDED_TOTAL.labels(scope=self._scope).inc()
         if not self._acquired:
             raise TimeoutError(f"Failed to acquire RedisLock for {self._key} within {self._wait_ms}ms")
         return self
@@ -83,6 +129,8 @@ class RedisLock(ContextManager["RedisLock"]):
     def __exit__(self, exc_type, exc, tb) -> None:
         if not self._client or not self._acquired:
             return
+        if self._scope:
+            REDIS_LOCK_HOLD_SECONDS.labels(scope=self._scope).observe(time.monotonic() - self._acquired_at)
         # Lua script to release only if token matches
         script = (
             "if redis.call('get', KEYS[1]) == ARGV[1] then "
@@ -184,6 +232,26 @@ class Deduplicator:
             logger.critical("REDIS_FAILURE: Deduplicator error: %s", e)
             raise
 
+    def seen(self, message_id: str) -> bool:
+        """True if the ID was already recorded (read-only counterpart of is_new)."""
+        if not self._client:
+            raise RuntimeError("Deduplicator requires Redis client")
+        try:
+            return bool(self._client.exists(f"dedupe:{self._scope}:{message_id}"))
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: Deduplicator error: %s", e)
+            raise
+
+    def forget(self, message_id: str) -> None:
+        """Drop a message ID so a redelivery is processed (e.g. the message was not accepted)."""
+        if not self._client:
+            raise RuntimeError("Deduplicator requires Redis client")
+        try:
+            self._client.delete(f"dedupe:{self._scope}:{message_id}")
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: Deduplicator error: %s", e)
+            raise
+
 
 class OrderGuard:
     """Ensure messages are processed in non-decreasing timestamp order per user."""
@@ -216,5 +284,159 @@ class OrderGuard:
             raise
 
 
+class MessageCoalescer:
+    """Per-user buffer that turns a burst of messages into one batch.
+
+    The first message of a burst opens a window and `add` returns True for it: that
+    caller owns the flush. Each further message pushes the deadline out by
+    `window_ms`, capped at `max_window_ms` after the first one. The owner sleeps
+    until `deadline` has passed and then calls `take`, which returns and clears the
+    buffer atomically; a message arriving after that opens a new window.
+
+    If the owner dies mid-window the buffer is kept (COALESCE_BUFFER_TTL_SECONDS) and
+    flushed with the user's next burst: a window older than max_window_ms plus
+    `grace_ms` is treated as abandoned and reopened by the next `add`.
+    """
+
+    _ADD = """
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[6])
+    local now = tonumber(ARGV[2])
+    local max_window = tonumber(ARGV[4])
+    local first = tonumber(redis.call('HGET', KEYS[2], 'first'))
+    local opened = 0
+    if (not first) or (now - first > max_window + tonumber(ARGV[5])) then
+        first = now
+        opened = 1
+        redis.call('HSET', KEYS[2], 'first', first)
+    end
+    redis.call('HSET', KEYS[2], 'deadline', math.min(now + tonumber(ARGV[3]), first + max_window))
+    redis.call('EXPIRE', KEYS[2], ARGV[6])
+    return opened
+    """
+
+    _TAKE = """
+    local items = redis.call('LRANGE', KEYS[1], 0, -1)
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return items
+    """
+
+    def __init__(self, scope: str = "wa", buffer_ttl_seconds: int = _COALESCE_BUFFER_TTL, grace_ms: int = 5000):
+        self._client = get_redis()
+        self._scope = scope
+        self._ttl = max(1, int(buffer_ttl_seconds))
+        self._grace_ms = int(grace_ms)
+        self._add = self._client.register_script(self._ADD)
+        self._take = self._client.register_script(self._TAKE)
+
+    def _keys(self, user_key: str) -> List[str]:
+        return [f"coalesce:{self._scope}:{user_key}", f"coalesce:{self._scope}:{user_key}:window"]
+
+    def add(self, user_key: str, item: Dict[str, Any], window_ms: int, max_window_ms: int) -> bool:
+        payload = orjson.dumps(item, default=str).decode("utf-8")
+        try:
+            opened = self._add(keys=self._keys(user_key),
+                               args=[payload, int(time.time() * 1000), int(window_ms), int(max_window_ms), self._grace_ms, self._ttl])
+            return bool(int(opened))
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: MessageCoalescer.add error: %s", e)
+            raise
+
+    def deadline(self, user_key: str) -> Optional[float]:
+        """Epoch seconds at which the open window closes (None if no window is open)."""
+        try:
+            raw = self._client.hget(self._keys(user_key)[1], "deadline")
+            return float(raw) / 1000.0 if raw is not None else None
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: MessageCoalescer.deadline error: %s", e)
+            raise
+
+    def take(self, user_key: str) -> List[Dict[str, Any]]:
+        try:
+            raw_items = self._take(keys=self._keys(user_key))
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: MessageCoalescer.take error: %s", e)
+            raise
+        items = []
+        for raw in raw_items or []:
+            try:
+                items.append(orjson.loads(raw))
+            except Exception as e:
+                logger.warning("MessageCoalescer: dropping undecodable buffer item: %s", e)
+        return items
+
+
+class PendingTurns:
+    """Per-user count of messages accepted for the standard lane and not answered yet.
+
+    `add` when a message is buffered or queued, `done` when its turn finishes or it is
+    refused. Kept in Redis so the count holds across nodes consuming the inbound stream;
+    the TTL (refreshed on every `add`) bounds a count leaked by a crashed worker.
+    """
+
+    _DONE = """
+    local left = redis.call('DECRBY', KEYS[1], ARGV[1])
+    if left <= 0 then
+        redis.call('DEL', KEYS[1])
+    end
+    return left
+    """
+
+    def __init__(self, scope: str = "wa", ttl_seconds: int = _PENDING_TURNS_TTL):
+        self._client = get_redis()
+        self._scope = scope
+        self._ttl = max(1, int(ttl_seconds))
+        self._done = self._client.register_script(self._DONE)
+
+    def _key(self, user_key: str) -> str:
+        return f"pending:{self._scope}:{user_key}"
+
+    def add(self, user_key: str, count: int = 1) -> None:
+        try:
+            pipe = self._client.pipeline(True)
+            pipe.incrby(self._key(user_key), int(count))
+            pipe.expire(self._key(user_key), self._ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: PendingTurns.add error: %s", e)
+            raise
+
+    def done(self, user_key: str, count: int = 1) -> None:
+        """Never raises: a missed decrement only keeps the user off the fast lane until the TTL."""
+        try:
+            self._done(keys=[self._key(user_key)], args=[int(count)])
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: PendingTurns.done error: %s", e)
+
+    def has_pending(self, user_key: str) -> bool:
+        try:
+            return int(self._client.get(self._key(user_key)) or 0) > 0
+        except Exception as e:
+            logger.critical("REDIS_FAILURE: PendingTurns.has_pending error: %s", e)
+            raise
+
+
+class LLMResultCache:
+    """Parsed JSON results of deterministic classifier tasks, keyed by prompt hash.
+
+    A cache outage must never fail a turn: errors are logged and treated as misses.
+    """
+
+    def __init__(self, scope: str = "llm"):
+        self._client = get_redis()
+        self._scope = scope
+
+    def _key(self, task_key: str, digest: str) -> str:
+        return f"llmcache:{self._scope}:{task_key}:{digest}"
+
+    def get(self, task_key: str, digest: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._key(task_key, digest))
+        return orjson.loads(raw) if raw else None
+
+    def set(self, task_key: str, digest: str, data: Dict[str, Any], ttl_seconds: int) -> None:
+        payload = orjson.dumps(data, default=str).decode("utf-8")
+        self._client.set(self._key(task_key, digest), payload, ex=max(1, int(ttl_seconds)))
+
+
 def session_lock_key(session_id: str) -> str:
     return f"session:{session_id}"
@@ -0,0 +1,97 @@
+"""
+Maximal marginal relevance (MMR) re-ranking for InfoFlow retrieval results.
+
+Hybrid search often returns near-identical chunks (overlapping benefit windows,
+the same benefit restated in the FAQ and the policy wording). MMR picks chunks
+that are relevant to the query but dissimilar to the chunks already picked, so
+fewer chunks cover more of the answer. Vectors come back with the hybrid query
+(`include_vector`), so no extra embedding calls are needed.
+
+Per-product settings live in the `rerank` block of ir_response.yaml:
+    enabled: bool         (default false)
+    lambda: float         relevance/diversity trade-off, 1.0 = pure relevance
+    top_n: int            chunks kept after re-ranking
+    fetch_limit: int      hybrid results requested before re-ranking
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - numpy unavailable
+    np = None
+
+DEFAULT_LAMBDA = 0.7
+DEFAULT_TOP_N = 6
+DEFAULT_FETCH_LIMIT = 10
+VECTOR_NAME = "content_vector"
+
+
+def is_enabled(settings: Optional[Dict[str, Any]]) -> bool:
+    return bool((settings or {}).get("enabled")) and np is not None
+
+
+def mmr_select(query_vec: Sequence[float], doc_vecs: Sequence[Sequence[float]],
+               lambda_mult: float = DEFAULT_LAMBDA, top_n: int = DEFAULT_TOP_N) -> List[int]:
+    """Return indices of `doc_vecs` in MMR order (at most `top_n`)."""
+    n = len(doc_vecs)
+    if n == 0 or top_n <= 0:
+        return []
+    docs = np.asarray(doc_vecs, dtype=np.float32)
+    query = np.asarray(query_vec, dtype=np.float32)
+    docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = docs @ query
+    similarity = docs @ docs.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to anything already selected
+    max_sim = similarity[selected[0]].copy()
+    remaining = np.ones(n, dtype=bool)
+    remaining[selected[0]] = False
+    while len(selected) < min(top_n, n):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        scores[~remaining] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        remaining[pick] = False
+        max_sim = np.maximum(max_sim, similarity[pick])
+    return selected
+
+
+def rerank_chunks(chunks: List[Dict[str, Any]], query_vec: Optional[Sequence[float]],
+                  settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Re-rank chunks carrying a `vector` key with MMR; returns chunks unchanged when not applicable.
+
+    The `vector` key is dropped from the returned chunks.
+    """
+    settings = settings or {}
+    stripped = [{k: v for k, v in c.items() if k != "vector"} for c in chunks]
+    if not is_enabled(settings) or not query_vec or not chunks:
+        return stripped
+    if any(not c.get("vector") for c in chunks):
+        logger.debug("Reranker: missing vectors, keeping hybrid order")
+        return stripped
+    try:
+        lambda_mult = float(settings.get("lambda", DEFAULT_LAMBDA))
+        top_n = int(settings.get("top_n", DEFAULT_TOP_N))
+        order = mmr_select(query_vec, [c["vector"] for c in chunks], lambda_mult, top_n)
+    except Exception as e:
+        logger.warning("Reranker: MMR failed, keeping hybrid order - %s", e)
+        return stripped
+    logger.debug("Reranker: MMR order=%s (lambda=%.2f, top_n=%d)", order, lambda_mult, top_n)
+    return [stripped[i] for i in order]
+
+
+def extract_vector(obj: Any) -> Optional[List[float]]:
+    """Pull the named content vector off a Weaviate result object."""
+    vec = getattr(obj, "vector", None)
+    if isinstance(vec, dict):
+        vec = vec.get(VECTOR_NAME)
+    return list(vec) if vec is not None else None
@@ -0,0 +1,62 @@
+"""
+Knowledge-base queries shared by InfoFlow and the offline retrieval benchmark
+(Admin/retrieval_benchmark.py), so both exercise exactly the same Weaviate calls.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence
+
+from weaviate.classes.query import TargetVectors, Filter, MetadataQuery
+
+KB_COLLECTION_NAME = "Insurance_Knowledge_Base"
+RETURN_PROPERTIES = ["content", "product_name", "doc_type", "source_file"]
+
+DEFAULT_HYBRID_LIMIT = 10
+DEFAULT_BM25_LIMIT = 5
+DEFAULT_ALPHA = 0.7
+
+# Named-vector combinations that can be targeted by hybrid search
+TARGET_VECTOR_MODES = {
+    "average": ["content_vector", "questions_vector"],
+    "content": ["content_vector"],
+    "questions": ["questions_vector"],
+}
+
+
+def _target_vector(mode: str):
+    names = TARGET_VECTOR_MODES.get(mode)
+    if not names:
+        raise ValueError(f"Unknown target vector mode: {mode}")
+    return TargetVectors.average(names) if len(names) > 1 else names[0]
+
+
+def hybrid_search(collection: Any, question: str, emb: Sequence[float], product: str,
+                  limit: int = DEFAULT_HYBRID_LIMIT, alpha: float = DEFAULT_ALPHA,
+                  target: str = "average", include_vector: Optional[List[str]] = None) -> List[Any]:
+    """Hybrid (BM25 + named-vector) search filtered by product; returns Weaviate objects."""
+    names = TARGET_VECTOR_MODES.get(target) or []
+    result = collection.query.hybrid(
+        query=question,
+        vector={name: emb for name in names},
+        target_vector=_target_vector(target),
+        filters=Filter.by_property("product_name").equal(product),
+        limit=limit,
+        alpha=alpha,
+        return_properties=RETURN_PROPERTIES,
+        return_metadata=MetadataQuery(score=True),
+        include_vector=include_vector or False,
+    )
+    return getattr(result, "objects", []) or []
+
+
+def bm25_search(collection: Any, question: str, product: str, limit: int = DEFAULT_BM25_LIMIT) -> List[Any]:
+    """Keyword-only fallback search filtered by product."""
+    result = collection.query.bm25(
+        query=question,
+        filters=Filter.by_property("product_name").equal(product),
+        limit=limit,
+        return_properties=RETURN_PROPERTIES,
+        return_metadata=MetadataQuery(score=True),
+    )
+    return getattr(result, "objects", []) or []
@@ -3,7 +3,7 @@ import logging
 from datetime import datetime, timezone, timedelta
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -18,6 +18,7 @@ except Exception:
 # Metrics and Redis-backed cache
 from .metrics import SESSION_CACHE_HITS, SESSION_CACHE_MISSES
 from .redis_utils import SessionCache
+from .turn_trace import stage_timer
 
 # Load environment variables for MongoDB connection
 MONGO_URI = os.getenv("MONGO_URI")
@@ -73,41 +74,44 @@ class MongoSessionManager:
             now = datetime.now(SGT_TZ)
 
             # Try cache first (do not return early; we may need to idle-reset)
-            cached = self._cache.get(session_id)
-            if cached:
-                logger.info("Loaded session %s from cache.", session_id)
-                SESSION_CACHE_HITS.inc()
-                session_data = cached
-            else:
-                # Cache miss -> load from DB
-                SESSION_CACHE_MISSES.inc()
-                session_data = self._db.sessions.find_one({"session_id": session_id})
+            with stage_timer("session_load", detail="cache") as stage:
+                cached = self._cache.get(session_id)
+                if cached:
+                    logger.info("Loaded session %s from cache.", session_id)
+                    SESSION_CACHE_HITS.inc()
+                    session_data = cached
+                else:
+                    # Cache miss -> load from DB
+                    stage.detail = "db"
+                    SESSION_CACHE_MISSES.inc()
+                    session_data = self._db.sessions.find_one({"session_id": session_id})
                 
-                history_cursor = self._db.conversation_history.find(
-                    {"session_id": session_id},
-                    {"_id": 0}
-                ).sort("timestamp", -1).limit(5)
+                    history_cursor = self._db.conversation_history.find(
+                        {"session_id": session_id},
+                        {"_id": 0}
+                    ).sort("timestamp", -1).limit(5)
 
-                history = list(history_cursor)
-                history.reverse()
+                    history = list(history_cursor)
+                    history.reverse()
 
-                if session_data:
-                    session_data.pop("_id", None)
-                    session_data['history'] = history
-                    logger.info("Loaded session %s from DB.", session_id)
-                else:
-                    logger.info("No session found for %s. Creating a new one.", session_id)
-                    session_data = {
-                        "session_id": session_id,
-                        "product": None,
-                        "slots": {},
-                        "recommended_tier": None,
-                        "history": history,
-                        "created_at": now,
-                        "last_active": now,
-                    }
-                # Store initial in cache
-                self._cache.set(session_id, session_data)
+                    if session_data:
+                        session_data.pop("_id", None)
+                        session_data['history'] = history
+                        logger.info("Loaded session %s from DB.", session_id)
+                    else:
+                        logger.info("No session found for %s. Creating a new one.", session_id)
+                        session_data = {
+                            "session_id": session_id,
+                            "product": None,
+                            "slots": {},
+                            "recommended_tier": None,
+                            "history": history,
+                            "created_at": now,
+                            "last_active": now,
+                        }
+                    # Store initial in cache
+                    self._cache.set(session_id, session_data)
+                stage.product = session_data.get("product")
 
             # Idle reset check
             try:
@@ -166,91 +170,98 @@ class MongoSessionManager:
             return
 
         try:
-            import time
-            start = time.time()
+            with stage_timer("session_save", product=session_data.get("product")):
+                import time
+                start = time.time()
             
-            # Keep history out of DB 'sessions' document, but preserve it for cache
-            history = session_data.pop("history", [])
+                # Keep history out of DB 'sessions' document, but preserve it for cache
+                history = session_data.pop("history", [])
             
-            session_state = session_data.copy()
-            session_state["last_active"] = datetime.now(SGT_TZ)
+                session_state = session_data.copy()
+                session_state["last_active"] = datetime.now(SGT_TZ)
 
-            # The 'created_at' field should only be set when the document is inserted.
-            # Remove it from the session_state to avoid a conflict with $setOnInsert.
-            session_state.pop('created_at', None)
+                # The 'created_at' field should only be set when the document is inserted.
+                # Remove it from the session_state to avoid a conflict with $setOnInsert.
+                session_state.pop('created_at', None)
 
-            self._db.sessions.update_one(
-                {"session_id": session_id},
-                {
-                    "$set": session_state,
-                    "$setOnInsert": {"created_at": datetime.now(SGT_TZ)}
-                },
-                upsert=True,
-                hint="session_id_1"  # Use index hint if available
-            )
+                self._db.sessions.update_one(
+                    {"session_id": session_id},
+                    {
+                        "$set": session_state,
+                        "$setOnInsert": {"created_at": datetime.now(SGT_TZ)}
+                    },
+                    upsert=True,
+                    hint="session_id_1"  # Use index hint if available
+                )
             
-            elapsed = time.time() - start
-            logger.info("Saved session state for %s in %.2fs.", session_id, elapsed)
+                elapsed = time.time() - start
+                logger.info("Saved session state for %s in %.2fs.", session_id, elapsed)
 
-            # Update cache copy
-            cached = self._cache.get(session_id) or {}
-            cached.update(session_state)
-            if history:
-                cached["history"] = history
-            else:
-                # Preserve existing cached history
-                cached.setdefault("history", [])
-            self._cache.set(session_id, cached)
+                # Update cache copy
+                cached = self._cache.get(session_id) or {}
+                cached.update(session_state)
+                if history:
+                    cached["history"] = history
+                else:
+                    # Preserve existing cached history
+                    cached.setdefault("history", [])
+                self._cache.set(session_id, cached)
         except OperationFailure as e:
             logger.error("Error saving session %s: %s", session_id, e)
             raise
 
-    def add_history_entry(self, session_id: str, user_message: str, bot_response: str):
+    def add_history_entry(self, session_id: str, user_message: str, bot_response: str,
+                          bot_response_parts: Optional[List[str]] = None):
         """
         Adds a new user-bot interaction to the conversation history and updates cached history.
+        `bot_response_parts` records a reply that was delivered as several messages (stored in
+        MongoDB only; the cached history keeps the short `assistant` text).
         """
         try:
-            import time
-            start = time.time()
-            ts = datetime.now(SGT_TZ)
-            history_entry = {
-                "session_id": session_id,
-                "timestamp": ts,
-                "user": user_message,
-                "assistant": bot_response
-            }
+            with stage_timer("history_append"):
+                import time
+                start = time.time()
+                ts = datetime.now(SGT_TZ)
+                history_entry = {
+                    "session_id": session_id,
+                    "timestamp": ts,
+                    "user": user_message,
+                    "assistant": bot_response
+                }
+                if bot_response_parts:
+                    history_entry["assistant_parts"] = list(bot_response_parts)
             
-            # Batch both operations to reduce round-trips
-            from pymongo import InsertOne, UpdateOne
-            operations = [
-                InsertOne(history_entry),
-            ]
-            self._db.conversation_history.bulk_write(operations, ordered=False)
+                # Batch both operations to reduce round-trips
+                from pymongo import InsertOne, UpdateOne
+                operations = [
+                    InsertOne(history_entry),
+                ]
+                self._db.conversation_history.bulk_write(operations, ordered=False)
             
-            # Update last_active separately (lighter operation)
-            self._db.sessions.update_one(
-                {"session_id": session_id},
-                {"$set": {"last_active": ts}},
-                hint="session_id_1"  # Use index hint if available
-            )
+                # Update last_active separately (lighter operation)
+                self._db.sessions.update_one(
+                    {"session_id": session_id},
+                    {"$set": {"last_active": ts}},
+                    hint="session_id_1"  # Use index hint if available
+                )
             
-            elapsed = time.time() - start
-            logger.info("Added history entry for session %s in %.2fs.", session_id, elapsed)
+                elapsed = time.time() - start
+                logger.info("Added history entry for session %s in %.2fs.", session_id, elapsed)
 
-            # Update cached history (keep last 5)
-            cached = self._cache.get(session_id)
-            if cached is not None:
-                hist = cached.get("history", [])
-                hist.append({
-                    "session_id": session_id,
-                    "timestamp": ts.isoformat(),
-                    "user": user_message,
-                    "assistant": bot_response,
-                })
-                if len(hist) > 5:
-                    hist = hist[-5:]
-                cached["history"] = hist
-                self._cache.set(session_id, cached)
+                # Update cached history (keep last 5)
+                cached = self._cache.get(session_id)
+                if cached is not None:
+                    hist = cached.get("history", [])
+                    hist.append({
+                        "session_id": session_id,
+                        "timestamp": ts.isoformat(),
+                        "user": user_message,
+                        "assistant": bot_response,
+                    })
+                    if len(hist) > 5:
+                        hist = hist[-5:]
+                    cached["history"] = hist
+                    self._cache.set(session_id, cached)
         except OperationFailure as e:
             logger.error("Error adding history for session %s: %s", session_id, e)
             raise
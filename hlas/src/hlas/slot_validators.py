@@ -0,0 +1,227 @@
+"""
+Local (deterministic) slot validation.
+
+Compiles typed rules from the `typed` section of config/slot_validation_rules.yaml
+and the slot specs in RecFlowHelper._slot_specs into per-product validators:
+
+- yesno: yes/no synonyms (optionally mapped, e.g. add_ons -> required/not_required)
+- enum: canonical value -> synonyms (choice slots default to their own options)
+- int_range: integers with optional units ("2 weeks" -> 14) or currency ("$1,500")
+- country: config/countries.yaml names and per-slot aliases; abbreviations are
+  rejected as the LLM rules require
+
+`validate_slot_locally` returns a validate_slot-shaped result when the value is
+decidable and None otherwise (cities, date ranges, occupations, free text), in
+which case RecFlow calls the LLM validator as before.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import yaml
+
+from .metrics import SLOT_VALIDATIONS
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_DIR = Path(__file__).resolve().parent / "config"
+_RULES_PATH = _CONFIG_DIR / "slot_validation_rules.yaml"
+_COUNTRIES_PATH = _CONFIG_DIR / "countries.yaml"
+
+_WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14, "fifteen": 15,
+    "twenty": 20, "thirty": 30,
+}
+_INT_RE = re.compile(r"^(?P<num>\d[\d,]*|[a-z]+)\s*(?P<unit>[a-z]+)?$")
+_MULTI_RE = re.compile(r"\b(and|or|&)\b|,|/")
+
+Validator = Callable[[str, str], Optional[Dict[str, Any]]]
+
+_compiled: Dict[str, Dict[str, Validator]] = {}
+_lock = threading.Lock()
+_typed: Optional[Dict[str, Any]] = None
+_countries: Optional[Dict[str, Any]] = None
+
+
+def _norm(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    text = re.sub(r"[.!?]+$", "", text)
+    return re.sub(r"\s+", " ", text)
+
+
+def _typed_rules() -> Dict[str, Any]:
+    global _typed
+    if _typed is None:
+        try:
+            with open(_RULES_PATH, "r", encoding="utf-8") as f:
+                _typed = (yaml.safe_load(f) or {}).get("typed") or {}
+        except Exception as e:
+            logger.error("SlotValidators: failed to load typed rules - %s", e)
+            _typed = {}
+    return _typed
+
+
+def _country_table() -> Dict[str, Any]:
+    global _countries
+    if _countries is None:
+        try:
+            with open(_COUNTRIES_PATH, "r", encoding="utf-8") as f:
+                _countries = yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.error("SlotValidators: failed to load countries - %s", e)
+            _countries = {}
+    return _countries
+
+
+def _ok(slot: str, value: str) -> Dict[str, Any]:
+    return {"valid": True, "slot_name": slot, "normalized_value": value}
+
+
+def _invalid(slot: str, reason: str, question: str) -> Dict[str, Any]:
+    return {"valid": False, "slot_name": slot, "reason": reason, "question": question}
+
+
+def _lookup_table(mapping: Dict[str, Any]) -> Dict[str, str]:
+    """{canonical: [synonyms]} -> {normalized synonym: canonical}."""
+    table: Dict[str, str] = {}
+    for canonical, synonyms in (mapping or {}).items():
+        table[_norm(canonical)] = str(canonical)
+        for syn in synonyms or []:
+            table[_norm(syn)] = str(canonical)
+    return table
+
+
+def _yesno(rule: Dict[str, Any]) -> Validator:
+    synonyms = _typed_rules().get("synonyms") or {}
+    merged = {k: list(synonyms.get(k) or []) + list((rule.get("extra") or {}).get(k) or []) for k in ("yes", "no")}
+    table = _lookup_table(merged)
+    mapped = {"yes": "yes", "no": "no", **(rule.get("map") or {})}
+
+    def validate(slot: str, value: str) -> Optional[Dict[str, Any]]:
+        answer = table.get(_norm(value))
+        return _ok(slot, str(mapped[answer])) if answer else None
+    return validate
+
+
+def _enum(rule: Dict[str, Any]) -> Validator:
+    table = _lookup_table(rule.get("values") or {})
+
+    def validate(slot: str, value: str) -> Optional[Dict[str, Any]]:
+        canonical = table.get(_norm(value))
+        return _ok(slot, canonical) if canonical else None
+    return validate
+
+
+def _int_range(rule: Dict[str, Any]) -> Validator:
+    lo, hi = int(rule.get("min", 0)), int(rule.get("max", 0))
+    units = {str(k).lower(): int(v) for k, v in (rule.get("units") or {}).items()}
+    currency = bool(rule.get("currency"))
+    question = rule.get("question") or f"Please provide a number between {lo} and {hi}."
+
+    def validate(slot: str, value: str) -> Optional[Dict[str, Any]]:
+        text = _norm(value)
+        if currency:
+            text = re.sub(r"^(s?\$|sgd)\s*", "", text)
+        m = _INT_RE.match(text)
+        if not m:
+            return None
+        raw, unit = m.group("num"), m.group("unit")
+        if raw.isalpha():
+            if raw not in _WORD_NUMBERS or not unit:
+                return None
+            number = _WORD_NUMBERS[raw]
+        else:
+            digits = raw.replace(",", "")
+            if not digits.isdigit():
+                return None
+            number = int(digits)
+        if unit:
+            if currency and unit in ("k",):
+                number *= 1000
+            elif unit in units:
+                number *= units[unit]
+            elif not (currency and unit in ("sgd", "dollars")):
+                return None
+        if lo <= number <= hi:
+            return _ok(slot, str(number))
+        return _invalid(slot, f"{number} is outside the allowed range of {lo}-{hi}", question)
+    return validate
+
+
+def _country(rule: Dict[str, Any]) -> Validator:
+    table = _country_table()
+    names = {_norm(k): v for k, v in (table.get("countries") or {}).items()}
+    names.update({_norm(k): v for k, v in (rule.get("aliases") or {}).items()})
+    abbreviations = {_norm(a) for a in table.get("abbreviations") or []}
+
+    def validate(slot: str, value: str) -> Optional[Dict[str, Any]]:
+        text = _norm(value)
+        if text in abbreviations:
+            return _invalid(slot, f"'{value}' is an abbreviation",
+                            "Please provide the full country name (e.g., 'United States').")
+        if _MULTI_RE.search(text):
+            return None  # several places: the LLM asks for the primary one
+        name = names.get(text)
+        return _ok(slot, name) if name else None
+    return validate
+
+
+_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Validator]] = {
+    "yesno": _yesno,
+    "enum": _enum,
+    "int_range": _int_range,
+    "country": _country,
+}
+
+
+def _rule_from_spec(spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Default rule for a slot without a typed entry, from its RecFlow slot spec."""
+    if spec.get("type") == "yesno":
+        return {"kind": "yesno"}
+    if spec.get("type") == "choice" and spec.get("options"):
+        return {"kind": "enum", "values": {str(o): [] for o in spec["options"]}}
+    return None
+
+
+def compile_validators(product: str, slot_specs: Dict[str, Dict[str, Any]]) -> Dict[str, Validator]:
+    key = (product or "").lower()
+    if key in _compiled:
+        return _compiled[key]
+    typed = ((_typed_rules().get("products") or {}).get(key)) or {}
+    validators: Dict[str, Validator] = {}
+    for slot, spec in (slot_specs or {}).items():
+        rule = typed.get(slot) or _rule_from_spec(spec or {})
+        builder = _BUILDERS.get((rule or {}).get("kind"))
+        if builder:
+            try:
+                validators[slot] = builder(rule)
+            except Exception as e:
+                logger.error("SlotValidators: failed to compile %s.%s - %s", key, slot, e)
+    with _lock:
+        _compiled[key] = validators
+    logger.info("SlotValidators: compiled %d local validators for %s: %s", len(validators), key, sorted(validators))
+    return validators
+
+
+def validate_slot_locally(product: str, slot_name: str, value: Any,
+                          slot_specs: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """validate_slot-shaped result when the value is decidable locally, else None (use the LLM)."""
+    validator = compile_validators(product, slot_specs).get(slot_name)
+    result = None
+    if validator is not None and str(value or "").strip():
+        try:
+            result = validator(slot_name, str(value))
+        except Exception as e:
+            logger.warning("SlotValidators: %s.%s raised - %s", product, slot_name, e)
+    path = "llm" if result is None else ("local_valid" if result["valid"] else "local_invalid")
+    try:
+        SLOT_VALIDATIONS.labels(product=(product or "").lower(), slot=slot_name, path=path).inc()
+    except Exception:
+        pass
+    return result
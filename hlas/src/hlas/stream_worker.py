@@ -0,0 +1,58 @@
+"""
+Standalone consumer for the durable WhatsApp inbound stream (WA_INBOUND_QUEUE=stream).
+
+Runs the same processing as the app (HlasFlow + reply) on messages published by
+any webhook node. Start as many as needed; partitions are rebalanced between
+live consumers automatically:
+
+    python -m hlas.stream_worker
+
+Set WA_STREAM_CONSUMER_IN_APP=false to keep the API pods from consuming.
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+from .logging_config import setup_logging
+from .llm import initialize_models
+
+load_dotenv()
+setup_logging()
+
+try:
+    initialize_models()
+except Exception:
+    logging.critical("Stream worker startup failed: Could not initialize LLM models.")
+    sys.exit(1)
+
+from .llm_gateway import close_gateway  # noqa: E402
+from .utils.whatsapp_handler import whatsapp_handler, close_whatsapp_handler_http_client  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    consumer = whatsapp_handler.start_consumer()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    await consumer.start()
+    logger.info("Stream worker running as consumer %s", consumer.name)
+    try:
+        await stop.wait()
+    finally:
+        await whatsapp_handler.drain()
+        await close_whatsapp_handler_http_client()
+        close_gateway()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,7 @@ from .agents import (
     follow_up_agent,
     tier_identifier,
     followup_clarification_agent,
+    turn_interpreter,
 )
 
 # Get the path to the YAML file
@@ -33,10 +34,13 @@ agent_map = {
     "follow_up_agent": follow_up_agent,
     "tier_identifier": tier_identifier,
     "followup_clarification_agent": followup_clarification_agent,
+    "turn_interpreter": turn_interpreter,
 }
 
 def build_task(config_key: str) -> Task:
     config = dict(tasks_config[config_key])
+    # Gateway options (timeouts, retries) are consumed by llm_gateway, not CrewAI
+    config.pop("llm", None)
     agent_name = config.get("agent")
     if isinstance(agent_name, str):
         agent_obj = agent_map.get(agent_name)
@@ -56,6 +60,7 @@ identify_tiers_task = build_task("identify_tiers")
 validate_slot_task = build_task("validate_slot")
 extract_slots_task = build_task("extract_slots")
 ask_question_task = build_task("ask_question")
+understand_turn_task = build_task("understand_turn")
 
 
 # Expose a name -> Task mapping for routing convenience
@@ -68,4 +73,5 @@ task_by_name = {
     "extract_slots": extract_slots_task,
     "ask_question": ask_question_task,
     "followup_clarification": build_task("followup_clarification"),
+    "understand_turn": understand_turn_task,
 }
@@ -1,23 +1,81 @@
 from crewai.tools import BaseTool, tool
 from pydantic import BaseModel, Field
-from typing import Optional, Type
+from typing import List, Optional, Type
+import logging
 from ..vector_store import get_weaviate_client
+from ..benefits_parser import canonical_tier, slice_benefits, tiers_for_product
 from weaviate.classes.query import Filter
 
+logger = logging.getLogger(__name__)
+
+# Per-tier benefit slices written by Admin/embedding_agent.py (no vectors; fetched by filter only)
+TIER_COLLECTION_NAME = "Insurance_Benefit_Tiers"
+# Tier value of the object holding the product's complete benefits text (whole lines, unchunked)
+FULL_BENEFITS_TIER = "all"
+
+
 class BenefitsToolInput(BaseModel):
     """Input for the Benefits Tool."""
     product: str = Field(..., description="The insurance product to retrieve benefits for.")
     tier: Optional[str] = Field(None, description="The specific tier of the product (e.g., 'Classic', 'Plus').")
+    tiers: Optional[List[str]] = Field(None, description="Several tiers to retrieve together (e.g., ['Gold', 'Platinum']).")
 
 class BenefitsTool(BaseTool):
     name: str = "Product Benefits Tool"
-    description: str = "Retrieves all benefits for a specific insurance product and optional tier."
+    description: str = "Retrieves benefits for a specific insurance product, limited to the requested tier(s) when given."
     args_schema: Type[BaseModel] = BenefitsToolInput
 
-    def _run(self, product: str, tier: Optional[str] = None) -> str:
+    def _run(self, product: str, tier: Optional[str] = None, tiers: Optional[List[str]] = None) -> str:
         """
-        Retrieves the benefits for a given product and optional tier.
+        Retrieves the benefits for a given product, sliced to the requested tier(s).
+        Products without tiers (Car) and requests without a valid tier return the full benefits text.
+
+        Slicing only ever runs on whole benefits lines from the tier collection. The knowledge
+        base chunks overlap and cut rows mid-sentence, so they are returned unsliced as a
+        last resort.
         """
+        requested = self._requested_tiers(product, tier, tiers)
+
+        # Single tier: use the pre-sliced ingestion output when available
+        if len(requested) == 1:
+            sliced = self._fetch_tier_slice(product, requested[0])
+            if sliced:
+                return sliced
+
+        full_text = self._fetch_tier_slice(product, FULL_BENEFITS_TIER)
+        if full_text:
+            if not requested:
+                return full_text
+            sliced = slice_benefits(full_text, product, requested)
+            logger.info("BenefitsTool: sliced %s benefits to tiers=%s (%d -> %d chars)",
+                        product, requested, len(full_text), len(sliced))
+            return sliced
+
+        if len(requested) > 1:
+            # Collection written before the full-text object existed: one section per tier slice
+            sections = []
+            for name in requested:
+                content = self._fetch_tier_slice(product, name)
+                if content:
+                    sections.append(f"[{name} plan]\n{content}")
+            if len(sections) == len(requested):
+                return "\n\n".join(sections)
+
+        logger.warning("BenefitsTool: no tier collection entries for %s; returning unsliced knowledge base chunks", product)
+        return self._fetch_full_benefits(product)
+
+    @staticmethod
+    def _requested_tiers(product: str, tier: Optional[str], tiers: Optional[List[str]]) -> List[str]:
+        valid = tiers_for_product(product)
+        names = list(tiers or [])
+        if tier:
+            names.append(tier)
+        wanted = {canonical_tier(n) for n in names if n}
+        return [t for t in valid if t in wanted]
+
+    @staticmethod
+    def _fetch_full_benefits(product: str) -> str:
+        """Benefit chunks from the knowledge base (overlapping, unordered; never sliced)."""
         client = get_weaviate_client()
         collection = client.collections.get("Insurance_Knowledge_Base")
 
@@ -34,4 +92,25 @@ class BenefitsTool(BaseTool):
         objects = getattr(response, "objects", []) or []
         return "\n".join([obj.properties.get("content", "") for obj in objects])
 
-benefits_tool = BenefitsTool()
\ No newline at end of file
+    @staticmethod
+    def _fetch_tier_slice(product: str, tier: str) -> str:
+        try:
+            client = get_weaviate_client()
+            if not client.collections.exists(TIER_COLLECTION_NAME):
+                return ""
+            collection = client.collections.get(TIER_COLLECTION_NAME)
+            response = collection.query.fetch_objects(
+                filters=Filter.all_of([
+                    Filter.by_property("product_name").equal(product),
+                    Filter.by_property("tier").equal(tier),
+                ]),
+                limit=1,
+                return_properties=["content", "product_name", "tier"],
+            )
+            objects = getattr(response, "objects", []) or []
+            return (objects[0].properties.get("content", "") or "") if objects else ""
+        except Exception as e:
+            logger.warning("BenefitsTool: tier slice lookup failed for %s/%s - %s", product, tier, e)
+            return ""
+
+benefits_tool = BenefitsTool()
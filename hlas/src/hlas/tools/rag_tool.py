@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from typing import Type, Optional, Any
 from ..vector_store import get_weaviate_client
 from ..llm import azure_embeddings
+from ..turn_trace import stage_timer
 from weaviate.classes.query import Filter
 import os
 
@@ -52,19 +53,21 @@ class RAGTool(BaseTool):
 
         # Embed the query once; reuse for multi-vector target
         try:
-            embedding = azure_embeddings.embed_query(query)
+            with stage_timer("embedding", product=product):
+                embedding = azure_embeddings.embed_query(query)
         except Exception:
             embedding = None
 
-        response = collection.query.hybrid(
-            query=query,
-            vector=embedding,
-            alpha=float(os.environ.get("RAG_ALPHA", 0.7)),
-            target_vector="average(['content_vector', 'questions_vector'])",
-            limit=limit or 15,
-            filters=filters,
-            properties=["content", "product_name", "doc_type", "source_file"],
-        )
+        with stage_timer("weaviate_query", detail="hybrid", product=product):
+            response = collection.query.hybrid(
+                query=query,
+                vector=embedding,
+                alpha=float(os.environ.get("RAG_ALPHA", 0.7)),
+                target_vector="average(['content_vector', 'questions_vector'])",
+                limit=limit or 15,
+                filters=filters,
+                properties=["content", "product_name", "doc_type", "source_file"],
+            )
 
         objects = getattr(response, "objects", []) or []
         if not objects and isinstance(response, dict):
@@ -0,0 +1,244 @@
+"""
+One conversational turn, shared by the /chat endpoint and the WhatsApp handler.
+
+TurnExecutor owns everything around the flow so both channels behave the same:
+  - fast lane for replies that need no LLM: "hi" (resets the session under the
+    session lock, so an earlier turn that is still running saves first, and
+    returns a greeting) and capability questions ("help", "what can you do";
+    no lock)
+  - per-session RedisLock
+  - session load, HlasFlow run, history append; the flow (blocking LLM, Weaviate
+    and embedding calls) runs on a bounded thread pool (TURN_FLOW_THREADS) with
+    the caller's context, so the event loop keeps serving other turns
+  - persisting the flow's complete final session (comparison/summary slots and
+    statuses included)
+  - per-stage timings (lock_wait, session_load, decide, flow, history_append,
+    session_save, total) returned on the TurnResult, logged as one
+    "Turn.trace" line and, when OpenTelemetry is installed, set as attributes
+    on the current span; the trace is current while the turn runs so stage
+    timers below (see turn_trace.py) also feed hlas_turn_stage_seconds
+
+Channel specifics (reply formatting, delivery) stay with the caller.
+"""
+
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from .flow import HlasFlow
+from .redis_utils import RedisLock, session_lock_key
+from .turn_trace import TurnTrace, record_stage
+from .utils.greeting import get_time_based_greeting
+
+logger = logging.getLogger(__name__)
+
+# Threads that run flows; at most this many turns execute at once per process
+FLOW_THREADS = max(1, int(os.getenv("TURN_FLOW_THREADS", "16")))
+_flow_pool: Optional[ThreadPoolExecutor] = None
+_flow_pool_lock = threading.Lock()
+# Console capture is process-wide (sys.stdout/stderr), so it is shared by concurrent flows
+_console_lock = threading.Lock()
+_console_users = 0
+_console_saved: Optional[tuple] = None
+
+GREETING_MESSAGE = "hi"
+# Whole-message capability questions answered without routing through the LLM
+_CAPABILITY_MESSAGES = {
+    "help", "menu", "options", "what can you do", "what can u do", "what do you do",
+    "how can you help", "how can you help me", "what can you help with", "what can you help me with",
+}
+CAPABILITIES_REPLY = (
+    "I'm HLAS Assistant. I can help you:\n"
+    "- Recommend a plan\n"
+    "- Answer questions about coverage\n"
+    "- Compare plans\n"
+    "- Summarize a product\n\n"
+    "Which insurance are you interested in: Travel, Maid, Car or Personal Accident?"
+)
+
+
+def _flow_executor() -> ThreadPoolExecutor:
+    global _flow_pool
+    if _flow_pool is None:
+        with _flow_pool_lock:
+            if _flow_pool is None:
+                _flow_pool = ThreadPoolExecutor(max_workers=FLOW_THREADS, thread_name_prefix="hlas-flow")
+    return _flow_pool
+
+
+@contextmanager
+def _quiet_console() -> Iterator[None]:
+    """Suppress third-party console UIs while any flow runs (redirect_stdout per thread would race)."""
+    global _console_users, _console_saved
+    with _console_lock:
+        if _console_users == 0:
+            _console_saved = (sys.stdout, sys.stderr)
+            sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        _console_users += 1
+    try:
+        yield
+    finally:
+        with _console_lock:
+            _console_users -= 1
+            if _console_users == 0 and _console_saved is not None:
+                sys.stdout, sys.stderr = _console_saved
+                _console_saved = None
+
+
+def _kickoff(flow: HlasFlow, inputs: Dict[str, Any]) -> None:
+    with _quiet_console():
+        flow.kickoff(inputs=inputs)
+
+
+async def run_flow(flow: HlasFlow, inputs: Dict[str, Any]) -> None:
+    """Run the flow on a flow thread. The caller's context is copied, so the turn trace and
+    the LLM-call counter (ContextVars) still see the flow's stages and calls."""
+    ctx = contextvars.copy_context()
+    await asyncio.get_running_loop().run_in_executor(_flow_executor(), ctx.run, _kickoff, flow, inputs)
+
+
+def is_greeting(message: str) -> bool:
+    return (message or "").strip().lower() == GREETING_MESSAGE
+
+
+def fast_lane_kind(message: str) -> Optional[str]:
+    """'greeting' or 'capabilities' when the message can be answered without the flow, else None."""
+    if is_greeting(message):
+        return "greeting"
+    normalized = re.sub(r"[^a-z ]+", "", (message or "").lower())
+    if " ".join(normalized.split()) in _CAPABILITY_MESSAGES:
+        return "capabilities"
+    return None
+
+
+@dataclass
+class TurnResult:
+    reply: str
+    sources: Any = ""
+    product: Optional[str] = None
+    greeting: bool = False
+    lane: str = "standard"  # fast: answered without the flow or lock
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class TurnExecutor:
+    """Runs a turn for a session ID under its lock and persists the result."""
+
+    def __init__(self, session_manager: Any, lock_ttl_seconds: float = 15.0, lock_wait_seconds: float = 5.0):
+        self._sessions = session_manager
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.lock_wait_seconds = lock_wait_seconds
+
+    async def greet(self, session_id: str, channel: str, lock_wait_seconds: Optional[float] = None,
+                    before_unlock: Optional[Callable[[TurnResult], Awaitable[Any]]] = None) -> TurnResult:
+        """
+        Greeting fast path: reset the session state (history is kept) and return a greeting.
+
+        The reset runs under the session lock so it cannot be overwritten by the save of an
+        earlier turn that is still in flight. Raises TimeoutError when the lock is not acquired
+        within `lock_wait_seconds` (default: the executor's lock wait).
+        """
+        trace = TurnTrace(channel, session_id)
+        started = time.perf_counter()
+        wait = self.lock_wait_seconds if lock_wait_seconds is None else lock_wait_seconds
+        async with RedisLock(session_lock_key(session_id), ttl_seconds=self.lock_ttl_seconds,
+                             wait_timeout=wait, scope=channel):
+            trace.add("lock_wait", time.perf_counter() - started)
+            logger.info("Turn.greeting: channel=%s session_id=%s - resetting session", channel, session_id)
+            with trace.stage("session_reset"):
+                try:
+                    self._sessions.reset_session(session_id)
+                except Exception as e:
+                    logger.error("Turn.greeting: Failed to reset session for 'hi' greeting - %s", e)
+            result = TurnResult(reply=get_time_based_greeting(), greeting=True, lane="fast", timings=trace.timings)
+            if before_unlock is not None:
+                await before_unlock(result)
+        trace.timings["total"] = time.perf_counter() - started
+        trace.emit()
+        return result
+
+    async def fast_path(self, session_id: str, message: str, channel: str, lock_wait_seconds: Optional[float] = None,
+                        before_unlock: Optional[Callable[[TurnResult], Awaitable[Any]]] = None) -> Optional[TurnResult]:
+        """
+        Answer zero-LLM messages without the flow or a session load; None if the flow is needed.
+        Only the greeting takes the session lock (see `greet`); `before_unlock` is awaited for it.
+        """
+        kind = fast_lane_kind(message)
+        if kind == "greeting":
+            return await self.greet(session_id, channel, lock_wait_seconds=lock_wait_seconds,
+                                    before_unlock=before_unlock)
+        if kind == "capabilities":
+            logger.info("Turn.fast_lane: channel=%s session_id=%s - capabilities", channel, session_id)
+            return TurnResult(reply=CAPABILITIES_REPLY, lane="fast")
+        return None
+
+    async def run(self, session_id: str, message: str, channel: str,
+                  reply_parts: Optional[Callable[[str], List[str]]] = None,
+                  before_unlock: Optional[Callable[[TurnResult], Awaitable[Any]]] = None) -> TurnResult:
+        """
+        Execute one turn. Raises TimeoutError when the session lock is not acquired in time.
+
+        reply_parts: splits the reply as the channel will deliver it; recorded in history when
+            there is more than one part.
+        before_unlock: awaited with the result while the lock is still held.
+        """
+        fast = await self.fast_path(session_id, message, channel, before_unlock=before_unlock)
+        if fast is not None:
+            return fast
+
+        trace = TurnTrace(channel, session_id)
+        started = time.perf_counter()
+
+        flow = HlasFlow()
+        with trace.activate():
+            lock_start = time.perf_counter()
+            # async with: waiting on a contended session lock must not block the event loop
+            async with RedisLock(session_lock_key(session_id), ttl_seconds=self.lock_ttl_seconds,
+                                 wait_timeout=self.lock_wait_seconds, scope=channel):
+                lock_wait = time.perf_counter() - lock_start
+                session = self._sessions.get_session(session_id)  # timed as session_load by the session manager
+                trace.product = session.get("product")
+                record_stage("lock_wait", lock_wait)
+                logger.info("Turn.session_loaded: channel=%s pending_slot='%s' product='%s' keys=%s", channel,
+                            session.get("pending_slot"), session.get("product"), list(session.keys()))
+
+                with trace.stage("flow"):
+                    # Off the event loop: every LLM/Weaviate call in the flow blocks its thread
+                    await run_flow(flow, {"message": message, "session": session})
+
+                # The flow's final state contains the complete, updated session
+                final_session = flow.state.session
+                if flow.state.product and not final_session.get("product"):
+                    final_session["product"] = flow.state.product
+                reply = str(flow.state.reply or "")
+                trace.product = final_session.get("product") or flow.state.product
+
+                parts = reply_parts(reply) if reply_parts and reply else None
+                self._sessions.add_history_entry(session_id, message, reply[:100],
+                                                 bot_response_parts=parts if parts and len(parts) > 1 else None)
+
+                logger.info("Turn.session_persist: rec_status='%s' cmp_status='%s' sum_status='%s' keys=%s",
+                            final_session.get("recommendation_status"),
+                            final_session.get("comparison_status"),
+                            final_session.get("summary_status"),
+                            list(final_session.keys()))
+                self._sessions.save_session(session_id, final_session)
+
+                result = TurnResult(reply=reply, sources=flow.state.sources, product=trace.product, timings=trace.timings)
+                if before_unlock is not None:
+                    with trace.stage("before_unlock"):
+                        await before_unlock(result)
+
+        trace.timings["total"] = time.perf_counter() - started
+        trace.emit()
+        return result
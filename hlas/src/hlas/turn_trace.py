@@ -0,0 +1,115 @@
+"""
+Per-stage timing of a conversational turn.
+
+TurnExecutor makes a TurnTrace current for the duration of a turn; code anywhere
+below it (session manager, flow router, flow helpers) times its stage with
+
+    with stage_timer("embedding", product=product):
+        ...
+
+which observes hlas_turn_stage_seconds{channel, product, stage, detail} and adds
+the time to the trace's timings. Outside a turn (admin endpoints, scripts) the
+channel label is "none". The stage object yielded by stage_timer can have its
+`detail` or `product` set inside the block when they are only known there.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from .metrics import TURN_STAGE_SECONDS
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # tracing is optional
+    _otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["TurnTrace"]] = ContextVar("hlas_turn_trace", default=None)
+
+
+class TurnTrace:
+    """Stage timings of one turn (seconds)."""
+
+    def __init__(self, channel: str, session_id: str):
+        self.channel = channel
+        self.session_id = session_id
+        self.product: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def activate(self) -> Iterator["TurnTrace"]:
+        """Make this the current trace for stage_timer calls in this context."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def emit(self) -> None:
+        timings_ms = {k: round(v * 1000, 1) for k, v in self.timings.items()}
+        logger.info("Turn.trace: channel=%s session_id=%s product=%s timings_ms=%s",
+                    self.channel, self.session_id, self.product, timings_ms)
+        if _otel_trace is not None:
+            try:
+                span = _otel_trace.get_current_span()
+                span.set_attribute("hlas.channel", self.channel)
+                if self.product:
+                    span.set_attribute("hlas.product", self.product)
+                for name, ms in timings_ms.items():
+                    span.set_attribute(f"hlas.turn.{name}_ms", ms)
+            except Exception as e:
+                logger.debug("Turn.trace: could not annotate span - %s", e)
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _current.get()
+
+
+class Stage:
+    """Labels of a stage being timed; `detail` and `product` may be set inside the block."""
+
+    __slots__ = ("name", "detail", "product")
+
+    def __init__(self, name: str, detail: str = "", product: Optional[str] = None):
+        self.name = name
+        self.detail = detail
+        self.product = product
+
+
+def record_stage(stage: str, seconds: float, detail: str = "", product: Optional[str] = None) -> None:
+    """Observe a stage duration against the current trace (if any)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+    channel = trace.channel if trace is not None else "none"
+    product = product or (trace.product if trace is not None else None) or "none"
+    try:
+        TURN_STAGE_SECONDS.labels(channel=channel, product=str(product).lower(), stage=stage,
+                                  detail=detail or "none").observe(seconds)
+    except Exception as e:
+        logger.debug("Turn.stage: could not record %s - %s", stage, e)
+
+
+@contextmanager
+def stage_timer(stage: str, detail: str = "", product: Optional[str] = None) -> Iterator[Stage]:
+    labels = Stage(stage, detail, product)
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        record_stage(stage, time.perf_counter() - start, labels.detail, labels.product)
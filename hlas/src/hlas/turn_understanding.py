@@ -0,0 +1,184 @@
+"""
+Unified turn understanding (opt-in).
+
+One structured LLM call returns the directive, product, tiers and extracted slot
+values for the current turn, replacing the serial classifier chain
+(route_decision -> identify_product -> identify_tiers/extract_slots). HlasFlow
+runs it once in `decide` and stores the normalized result on `state.nlu`; the
+flow helpers read it through `nlu_product`, `nlu_tiers` and `nlu_slots` and only
+fall back to their own classifier calls when it is absent.
+
+Enable with UNIFIED_NLU_ENABLED=true. Admin/nlu_benchmark.py compares LLM calls
+per turn and latency against the legacy chain.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from .benefits_parser import canonical_tier, tiers_for_product
+from .prompt_runner import run_direct_task
+
+logger = logging.getLogger(__name__)
+
+DIRECTIVES = (
+    "greet",
+    "handle_recommendation",
+    "handle_information",
+    "handle_follow_up",
+    "plan_only_comparison",
+    "handle_summary",
+    "handle_capabilities",
+    "handle_other",
+)
+PRODUCTS = ("Travel", "Maid", "Car", "PersonalAccident")
+
+
+def is_enabled() -> bool:
+    return os.getenv("UNIFIED_NLU_ENABLED", "false").lower() == "true"
+
+
+def _canonical_product(value: Any) -> str:
+    raw = str(value or "").strip().replace(" ", "").lower()
+    for p in PRODUCTS:
+        if p.lower() == raw:
+            return p
+    return ""
+
+
+def _active_flow(session: Dict[str, Any]) -> Optional[str]:
+    for key, name in (("recommendation_status", "recommendation"),
+                      ("comparison_status", "comparison"),
+                      ("summary_status", "summary")):
+        if session.get(key) == "in_progress":
+            return name
+    return None
+
+
+def build_context(state: Any, route_context: Dict[str, Any]) -> str:
+    """Route-decision fields plus what the flow helpers would otherwise ask their own classifiers."""
+    from .flows.rec_flow import RecFlowHelper
+
+    session = state.session or {}
+    session_product = session.get("product") or state.product
+    products = [session_product] if _canonical_product(session_product) else list(PRODUCTS)
+    catalogue = {p: RecFlowHelper._slot_specs(p) for p in products if RecFlowHelper._slot_specs(p)}
+    filled = {}
+    for name, data in (session.get("slots") or {}).items():
+        value = data.get("value") if isinstance(data, dict) else data
+        if value not in (None, ""):
+            filled[name] = value
+    ctx = dict(route_context)
+    ctx.update({
+        "active_flow": _active_flow(session),
+        "last_bot_question": session.get("last_question"),
+        "valid_tiers": {p: tiers_for_product(p) for p in products if tiers_for_product(p)},
+        "slot_catalogue": catalogue,
+        "filled_slots": filled,
+    })
+    return json.dumps(ctx, ensure_ascii=False)
+
+
+def normalize(result: Dict[str, Any], message: str) -> Dict[str, Any]:
+    """Coerce the raw task output into the shape the flow helpers consume."""
+    from .flows.rec_flow import RecFlowHelper
+
+    directive = result.get("directive")
+    product = _canonical_product(result.get("product"))
+    valid_tiers = tiers_for_product(product)
+    tiers: List[str] = []
+    for t in result.get("tiers") or []:
+        tier = canonical_tier(str(t))
+        if tier in valid_tiers and tier not in tiers:
+            tiers.append(tier)
+    required = RecFlowHelper._required_slots_for_product(product)
+    slots: Dict[str, str] = {}
+    for item in result.get("slots") or []:
+        if not isinstance(item, dict):
+            continue
+        name, value = item.get("name"), str(item.get("value") or "").strip()
+        if name in required and value:
+            slots[name] = value
+    try:
+        confidence = float(result.get("confidence") or 0.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return {
+        "message": message,
+        "directive": directive if directive in DIRECTIVES else None,
+        "product": product,
+        "confidence": confidence,
+        "tiers": tiers,
+        "slots": slots,
+        "explain_slot": result.get("explain_slot") or "",
+        "explanation": result.get("explanation") or "",
+        "question": result.get("question") or "",
+    }
+
+
+def understand_turn(state: Any, route_context: Dict[str, Any], log: Optional[logging.Logger] = None) -> Optional[Dict[str, Any]]:
+    """Run the unified task; returns None when the call fails so callers use the legacy chain."""
+    from .tasks import understand_turn_task
+
+    log = log or logger
+    raw = run_direct_task(
+        agent_obj=understand_turn_task.agent,
+        agent_key="turn_interpreter",
+        task_key="understand_turn",
+        context_text=build_context(state, route_context),
+        logger=log,
+        label="turn_interpreter.understand_turn",
+    )
+    if not raw or not raw.get("directive"):
+        log.warning("TurnUnderstanding: empty or invalid result; falling back to the classifier chain")
+        return None
+    nlu = normalize(raw, state.message)
+    log.info("TurnUnderstanding: directive=%s product=%s confidence=%.2f tiers=%s slots=%s",
+             nlu["directive"], nlu["product"], nlu["confidence"], nlu["tiers"], list(nlu["slots"].keys()))
+    return nlu
+
+
+def _current(state: Any) -> Optional[Dict[str, Any]]:
+    # Helpers may rewrite state.message (e.g. replaying the original question); the result is then stale
+    nlu = getattr(state, "nlu", None)
+    if not nlu or nlu.get("message") != state.message:
+        return None
+    return nlu
+
+
+def nlu_product(state: Any) -> Optional[Dict[str, Any]]:
+    """identify_product-shaped result from the unified call, if available."""
+    nlu = _current(state)
+    if nlu is None:
+        return None
+    out: Dict[str, Any] = {"product": nlu["product"], "confidence": nlu["confidence"]}
+    if not nlu["product"] and nlu["question"]:
+        out["question"] = nlu["question"]
+    return out
+
+
+def nlu_tiers(state: Any) -> Optional[Dict[str, Any]]:
+    """identify_tiers-shaped result from the unified call, if it found any tiers.
+
+    With no tiers in the message the tier identifier still runs: it sees a longer
+    history window and may resolve "those two" style references.
+    """
+    nlu = _current(state)
+    if nlu is None or not nlu["tiers"]:
+        return None
+    return {"product": nlu["product"], "tiers": list(nlu["tiers"])}
+
+
+def nlu_slots(state: Any, product: str) -> Optional[Dict[str, Any]]:
+    """extract_slots-shaped result for `product`, if the unified call resolved the same product."""
+    nlu = _current(state)
+    if nlu is None or (nlu["product"] or "").lower() != (product or "").lower():
+        return None
+    out: Dict[str, Any] = dict(nlu["slots"])
+    if nlu["explain_slot"] and nlu["explanation"]:
+        out["user_needs_explanation"] = nlu["explain_slot"]
+        out["explanation"] = nlu["explanation"]
+    return out
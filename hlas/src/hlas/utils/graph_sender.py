@@ -0,0 +1,209 @@
+"""
+Outbound sender for the WhatsApp Cloud (Graph) API.
+
+- one shared AsyncClient over HTTP/2 (HTTP/1.1 if the `h2` package is missing)
+  with pool limits sized for sustained sending
+- per-phone-number-ID pacing: sends from one business number are spaced at its
+  current rate (WA_SEND_RATE_PER_SECOND)
+- adaptive backoff on Meta throttling: HTTP 429 or a throttling error code
+  halves that number's rate and pauses it for Retry-After (or a default); every
+  success restores part of the rate. The pair rate limit (131056) only delays
+  the affected recipient, via the caller's retry
+- every failure is raised as GraphSendError with `retryable` and `retry_after`,
+  which OrderedSendQueue uses to decide whether and when to try again
+- latency, outcome, throttle and pacing metrics
+
+Base URL and API version are configurable (META_GRAPH_BASE_URL,
+META_GRAPH_API_VERSION) so the sender can be pointed at Admin/graph_stub_server.py.
+"""
+
+import logging
+import os
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..metrics import (
+    WA_GRAPH_SEND_SECONDS,
+    WA_GRAPH_SENDS_TOTAL,
+    WA_GRAPH_THROTTLES_TOTAL,
+    WA_GRAPH_SEND_RATE,
+    WA_GRAPH_PACING_WAIT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_GRAPH_BASE_URL = os.getenv("META_GRAPH_BASE_URL", "https://graph.facebook.com")
+_GRAPH_API_VERSION = os.getenv("META_GRAPH_API_VERSION", "v18.0")
+_SEND_RATE = float(os.getenv("WA_SEND_RATE_PER_SECOND", "80"))
+_SEND_MIN_RATE = float(os.getenv("WA_SEND_MIN_RATE_PER_SECOND", "5"))
+_THROTTLE_PAUSE_S = float(os.getenv("WA_SEND_THROTTLE_PAUSE_SECONDS", "2"))
+_MAX_CONNECTIONS = int(os.getenv("WA_SEND_MAX_CONNECTIONS", "100"))
+_MAX_KEEPALIVE = int(os.getenv("WA_SEND_MAX_KEEPALIVE", "50"))
+
+# Meta error codes that mean "slow down" (app, WABA, Cloud API throughput, spam rate limits)
+_THROTTLE_CODES = {4, 613, 80007, 130429, 131048}
+# Too many messages to one recipient in a short time: back off that user only
+_PAIR_RATE_LIMIT_CODE = 131056
+_PAIR_RATE_LIMIT_PAUSE_S = 6.0
+_RETRYABLE_STATUS = {408, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+class GraphSendError(Exception):
+    """A send that did not succeed; `retryable` and `retry_after` guide the caller's retry."""
+
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None,
+                 status: Optional[int] = None, code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status = status
+        self.code = code
+
+
+class _NumberPacer:
+    """Spaces sends from one phone number ID at `rate`/s; multiplicative decrease on throttling,
+    additive recovery on success."""
+
+    def __init__(self, phone_number_id: str, rate: float, min_rate: float):
+        self.phone_number_id = phone_number_id
+        self.max_rate = max(0.1, rate)
+        self.min_rate = max(0.1, min(min_rate, self.max_rate))
+        self.rate = self.max_rate
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        WA_GRAPH_SEND_RATE.labels(phone_number_id=phone_number_id).set(self.rate)
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        start = max(now, self._next_slot, self._paused_until)
+        self._next_slot = start + 1.0 / self.rate
+        if start > now:
+            WA_GRAPH_PACING_WAIT_SECONDS.labels(phone_number_id=self.phone_number_id).observe(start - now)
+            await asyncio.sleep(start - now)
+
+    def on_success(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20.0)
+            WA_GRAPH_SEND_RATE.labels(phone_number_id=self.phone_number_id).set(self.rate)
+
+    def on_throttle(self, pause_s: float) -> None:
+        self.rate = max(self.min_rate, self.rate / 2.0)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause_s)
+        WA_GRAPH_SEND_RATE.labels(phone_number_id=self.phone_number_id).set(self.rate)
+        logger.warning("GraphSender: throttled on %s; rate now %.1f/s, paused %.1fs",
+                       self.phone_number_id, self.rate, pause_s)
+
+
+def _retry_after(headers: httpx.Headers) -> Optional[float]:
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception:
+            return None
+
+
+def _error_code(response: httpx.Response) -> Optional[int]:
+    try:
+        code = (response.json().get("error") or {}).get("code")
+        return int(code) if code is not None else None
+    except Exception:
+        return None
+
+
+class GraphAPISender:
+    """Paced, throttle-aware sender of WhatsApp text messages."""
+
+    def __init__(self, access_token: Optional[str], base_url: str = _GRAPH_BASE_URL, api_version: str = _GRAPH_API_VERSION,
+                 rate_per_s: float = _SEND_RATE, min_rate_per_s: float = _SEND_MIN_RATE,
+                 max_connections: int = _MAX_CONNECTIONS, max_keepalive: int = _MAX_KEEPALIVE):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip("/")
+        self.api_version = api_version
+        self.rate_per_s = rate_per_s
+        self.min_rate_per_s = min_rate_per_s
+        self._pacers: Dict[str, _NumberPacer] = {}
+        if not _HTTP2_AVAILABLE:
+            logger.warning("GraphSender: 'h2' not installed; using HTTP/1.1 (pip install 'httpx[http2]')")
+        self._client: Optional[httpx.AsyncClient] = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=10.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                keepalive_expiry=60.0),
+        )
+
+    def _pacer(self, phone_number_id: str) -> _NumberPacer:
+        pacer = self._pacers.get(phone_number_id)
+        if pacer is None:
+            pacer = self._pacers[phone_number_id] = _NumberPacer(phone_number_id, self.rate_per_s, self.min_rate_per_s)
+        return pacer
+
+    async def send_text(self, phone_number_id: str, recipient: str, body: str) -> Dict[str, Any]:
+        """POST one text message; returns the API response body or raises GraphSendError."""
+        if not self._client:
+            raise RuntimeError("GraphAPISender is closed")
+        pacer = self._pacer(phone_number_id)
+        await pacer.wait()
+
+        url = f"{self.base_url}/{self.api_version}/{phone_number_id}/messages"
+        headers = {"Authorization": f"Bearer {self.access_token}", "Content-Type": "application/json"}
+        payload = {"messaging_product": "whatsapp", "to": recipient, "type": "text", "text": {"body": body}}
+
+        start = time.monotonic()
+        try:
+            response = await self._client.post(url, headers=headers, json=payload)
+        except httpx.TimeoutException as e:
+            self._record("timeout", start)
+            raise GraphSendError(f"timeout: {e}", retryable=True) from e
+        except httpx.HTTPError as e:
+            self._record("connection_error", start)
+            raise GraphSendError(f"connection error: {e}", retryable=True) from e
+
+        status = response.status_code
+        if status < 300:
+            pacer.on_success()
+            self._record("ok", start)
+            try:
+                return response.json()
+            except Exception:
+                return {}
+
+        code = _error_code(response)
+        detail = f"HTTP {status} code={code}: {response.text[:300]}"
+        if code == _PAIR_RATE_LIMIT_CODE:
+            WA_GRAPH_THROTTLES_TOTAL.labels(code=str(code)).inc()
+            self._record("throttled", start)
+            raise GraphSendError(detail, retryable=True, retry_after=_retry_after(response.headers) or _PAIR_RATE_LIMIT_PAUSE_S,
+                                 status=status, code=code)
+        if status == 429 or code in _THROTTLE_CODES:
+            pause = _retry_after(response.headers) or _THROTTLE_PAUSE_S
+            pacer.on_throttle(pause)
+            WA_GRAPH_THROTTLES_TOTAL.labels(code=str(code or status)).inc()
+            self._record("throttled", start)
+            raise GraphSendError(detail, retryable=True, retry_after=pause, status=status, code=code)
+        retryable = status in _RETRYABLE_STATUS
+        self._record("server_error" if retryable else "rejected", start)
+        raise GraphSendError(detail, retryable=retryable, retry_after=_retry_after(response.headers), status=status, code=code)
+
+    def _record(self, outcome: str, start: float) -> None:
+        WA_GRAPH_SENDS_TOTAL.labels(outcome=outcome).inc()
+        WA_GRAPH_SEND_SECONDS.labels(outcome=outcome).observe(time.monotonic() - start)
+
+    async def aclose(self) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,65 @@
+"""Split long replies into WhatsApp-sized messages at natural boundaries.
+
+A reply over the limit is cut at the coarsest boundary that fits, in this order:
+paragraphs (blank lines), list items (lines starting with a bullet or number),
+lines, sentences, words; only a single word longer than the limit is hard-cut.
+Pieces are packed greedily so parts stay as full as the boundaries allow, and
+each part gets a "(i/n)" marker so the user knows more is coming.
+"""
+
+import re
+from typing import List
+
+WHATSAPP_TEXT_LIMIT = 4096
+_MARKER_RESERVE = 12  # room for "\n\n(99/99)"
+
+# (joiner used when packing, pattern that separates pieces at this level)
+_LEVELS = [
+    ("\n\n", re.compile(r"\n\s*\n")),
+    ("\n", re.compile(r"\n(?=[ \t]*(?:[-*•▪◦]|\d+[.)])\s)")),
+    ("\n", re.compile(r"\n")),
+    (" ", re.compile(r"(?<=[.!?])\s+")),
+    (" ", re.compile(r"\s+")),
+]
+
+
+def _pieces(text: str, budget: int, level: int = 0) -> List[str]:
+    if len(text) <= budget:
+        return [text]
+    if level >= len(_LEVELS):
+        return [text[i:i + budget] for i in range(0, len(text), budget)]
+    joiner, pattern = _LEVELS[level]
+    chunks = [c.strip("\n") for c in pattern.split(text) if c.strip()]
+    if len(chunks) <= 1:
+        return _pieces(text, budget, level + 1)
+
+    out: List[str] = []
+    current = ""
+    for chunk in chunks:
+        if len(chunk) > budget:
+            if current:
+                out.append(current)
+                current = ""
+            out.extend(_pieces(chunk, budget, level + 1))
+            continue
+        candidate = f"{current}{joiner}{chunk}" if current else chunk
+        if len(candidate) <= budget:
+            current = candidate
+        else:
+            out.append(current)
+            current = chunk
+    if current:
+        out.append(current)
+    return out
+
+
+def split_message(text: str, limit: int = WHATSAPP_TEXT_LIMIT, markers: bool = True) -> List[str]:
+    """Ordered parts of `text`, each at most `limit` characters (a single part if it already fits)."""
+    text = (text or "").strip()
+    if len(text) <= limit:
+        return [text]
+    budget = max(1, limit - _MARKER_RESERVE) if markers else limit
+    parts = [p.strip() for p in _pieces(text, budget) if p.strip()]
+    if markers and len(parts) > 1:
+        parts = [f"{p}\n\n({i}/{len(parts)})" for i, p in enumerate(parts, 1)]
+    return parts
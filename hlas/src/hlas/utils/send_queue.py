@@ -0,0 +1,121 @@
+"""Per-recipient ordered outbound delivery.
+
+Replies are handed over here once the session has been persisted, so the session
+lock is not held while the Graph API is slow. Each recipient has its own FIFO and
+at most one sender task: replies to one user go out in the order they were
+produced, different users are sent concurrently (bounded by `max_concurrency`).
+A failed send is retried with exponential backoff before the next reply to the
+same user is attempted. Exceptions may carry `retryable` (False stops retrying)
+and `retry_after` (seconds; used when longer than the backoff), as
+GraphSendError does.
+
+`enqueue` returns a future that resolves to True once the message was accepted
+by the API, or False after the last attempt failed.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from ..metrics import WA_SEND_QUEUE_DEPTH, WA_SEND_RESULTS_TOTAL, WA_SEND_DELAY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class OrderedSendQueue:
+    """FIFO per recipient with a retrying sender task per non-empty FIFO."""
+
+    def __init__(self, name: str, send_fn: Callable[[str, str], Awaitable[Any]], max_attempts: int = 3,
+                 backoff_s: float = 0.5, max_backoff_s: float = 8.0, max_concurrency: int = 32):
+        self.name = name
+        self._send = send_fn
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_s = float(backoff_s)
+        self.max_backoff_s = float(max_backoff_s)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._queues: Dict[str, Deque[Tuple[str, float, asyncio.Future]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._depth = 0
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def enqueue(self, recipient: str, body: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        future = loop.create_future()
+        self._queues.setdefault(recipient, deque()).append((body, time.monotonic(), future))
+        self._set_depth(1)
+        if recipient not in self._workers:
+            self._workers[recipient] = asyncio.create_task(self._run(recipient), name=f"{self.name}-send-{recipient}")
+        return future
+
+    def _set_depth(self, delta: int) -> None:
+        self._depth += delta
+        WA_SEND_QUEUE_DEPTH.labels(queue=self.name).set(self._depth)
+
+    async def _run(self, recipient: str) -> None:
+        queue = self._queues[recipient]
+        try:
+            while queue:
+                body, enqueued_at, future = queue[0]
+                delivered = await self._deliver(recipient, body, enqueued_at)
+                queue.popleft()
+                self._set_depth(-1)
+                if not future.done():
+                    future.set_result(delivered)
+        finally:
+            self._workers.pop(recipient, None)
+            # Only non-empty here when the task was cancelled (drain timeout)
+            while queue:
+                _, _, future = queue.popleft()
+                self._set_depth(-1)
+                WA_SEND_RESULTS_TOTAL.labels(queue=self.name, outcome="abandoned").inc()
+                if not future.done():
+                    future.set_result(False)
+            self._queues.pop(recipient, None)
+
+    async def _deliver(self, recipient: str, body: str, enqueued_at: float) -> bool:
+        backoff = self.backoff_s
+        for attempt in range(1, self.max_attempts + 1):
+            retry_after = None
+            async with self._slots:
+                try:
+                    await self._send(recipient, body)
+                    WA_SEND_RESULTS_TOTAL.labels(queue=self.name, outcome="sent").inc()
+                    WA_SEND_DELAY_SECONDS.labels(queue=self.name).observe(time.monotonic() - enqueued_at)
+                    return True
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("SendQueue[%s]: attempt %d/%d failed for %s: %s",
+                                   self.name, attempt, self.max_attempts, recipient, e)
+                    if not getattr(e, "retryable", True):
+                        break
+                    retry_after = getattr(e, "retry_after", None)
+            if attempt < self.max_attempts:
+                WA_SEND_RESULTS_TOTAL.labels(queue=self.name, outcome="retried").inc()
+                await asyncio.sleep(max(backoff, retry_after or 0.0))
+                backoff = min(backoff * 2, self.max_backoff_s)
+        logger.error("SendQueue[%s]: giving up on message to %s", self.name, recipient)
+        WA_SEND_RESULTS_TOTAL.labels(queue=self.name, outcome="failed").inc()
+        return False
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to `timeout` for every queued reply, then abandon the rest."""
+        deadline = time.monotonic() + timeout
+        while self._workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error("SendQueue[%s]: drain timed out; abandoning %d queued message(s)", self.name, self._depth)
+                tasks = list(self._workers.values())
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                break
+            await asyncio.wait(list(self._workers.values()), timeout=remaining)
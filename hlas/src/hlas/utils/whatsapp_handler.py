@@ -9,36 +9,78 @@ error recovery, validation, and production-grade features.
 import os
 import re
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import asyncio
 from fastapi import Request, Response
-import httpx
-from contextlib import redirect_stdout, redirect_stderr
-import io
 import time
 import hmac
 import hashlib
 from zoneinfo import ZoneInfo
 
-from ..redis_utils import RateLimiter, Deduplicator, OrderGuard, RedisLock, session_lock_key
-from ..metrics import WA_MESSAGES_PROCESSED_TOTAL, REDIS_LOCK_TIMEOUTS
+from ..redis_utils import RateLimiter, Deduplicator, OrderGuard, MessageCoalescer, PendingTurns
+from ..metrics import WA_MESSAGES_PROCESSED_TOTAL, REDIS_LOCK_TIMEOUTS, WA_COALESCED_BATCH_SIZE, WA_LLM_CALLS_PER_MESSAGE
+from ..metrics import WA_WEBHOOK_BATCH_SIZE, WA_INBOUND_MESSAGES_TOTAL, WA_REPLY_PARTS
+from ..metrics import TURN_LANE_SECONDS, FAST_LANE_REPLIES_TOTAL
+from ..llm_gateway import count_llm_calls
+from .worker_pool import BoundedWorkerPool
+from .send_queue import OrderedSendQueue
+from .graph_sender import GraphAPISender
+from .message_splitter import split_message, WHATSAPP_TEXT_LIMIT
+from ..inbound_stream import InboundStream, StreamConsumer, decode_entry
+from ..metrics import INBOUND_STREAM_EVENTS
 
 # Import HLAS components at module level to avoid circular imports and runtime overhead
 try:
     from ..session import MongoSessionManager
-    from ..flow import HlasFlow
-    from ..utils.greeting import get_time_based_greeting
+    from ..turn_executor import FLOW_THREADS, TurnExecutor, fast_lane_kind
     HLAS_IMPORTS_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"HLAS imports not available: {e}")
     MongoSessionManager = None
-    HlasFlow = None
-    get_time_based_greeting = None
+    TurnExecutor = None
+    fast_lane_kind = None
+    FLOW_THREADS = None
     HLAS_IMPORTS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Background processing pool: workers, pending-message bound and what to do when it is full.
+# Turns run on TurnExecutor's flow threads, so workers default to (and are capped at) TURN_FLOW_THREADS.
+_WA_WORKERS = int(os.getenv("WA_WORKERS", "0"))
+_WA_QUEUE_SIZE = int(os.getenv("WA_QUEUE_SIZE", "200"))
+_WA_OVERFLOW_POLICY = os.getenv("WA_QUEUE_OVERFLOW", "busy").lower()  # busy | defer
+_WA_DEFER_WAIT_S = float(os.getenv("WA_QUEUE_DEFER_WAIT_SECONDS", "5"))
+_WA_DRAIN_TIMEOUT_S = float(os.getenv("WA_DRAIN_TIMEOUT_SECONDS", "25"))
+# memory: in-process worker pool; stream: durable Redis Streams queue consumed by any node
+_WA_INBOUND_QUEUE = os.getenv("WA_INBOUND_QUEUE", "memory").lower()
+_WA_STREAM_CONSUMER_IN_APP = os.getenv("WA_STREAM_CONSUMER_IN_APP", "true").lower() == "true"
+# Burst coalescing: messages from one user within the window are answered by a single flow run.
+# The window restarts with every message (debounce) but never exceeds the max after the first one; 0 disables.
+_WA_COALESCE_WINDOW_MS = int(os.getenv("WA_COALESCE_WINDOW_MS", "0"))
+_WA_COALESCE_MAX_WINDOW_MS = int(os.getenv("WA_COALESCE_MAX_WINDOW_MS", "3000"))
+# Outbound delivery: replies are queued per user after the session lock is released
+# (WA_SEND_AFTER_UNLOCK=false sends inside the lock, as before, for comparison)
+_WA_SEND_AFTER_UNLOCK = os.getenv("WA_SEND_AFTER_UNLOCK", "true").lower() == "true"
+_WA_SEND_MAX_ATTEMPTS = int(os.getenv("WA_SEND_MAX_ATTEMPTS", "3"))
+_WA_SEND_CONCURRENCY = int(os.getenv("WA_SEND_CONCURRENCY", "32"))
+# Fast-lane "hi": how long to wait for an in-flight turn's session lock before the reset
+# and greeting are handed to the standard lane (which then waits behind that turn)
+_WA_GREETING_LOCK_WAIT_S = float(os.getenv("WA_GREETING_LOCK_WAIT_SECONDS", "0.5"))
+def _pool_workers() -> int:
+    """Workers beyond the flow threads add no concurrency: they would only hold a session
+    lock while their turn waits for a thread."""
+    threads = FLOW_THREADS or _WA_WORKERS or 8
+    if _WA_WORKERS <= 0:
+        return threads
+    if _WA_WORKERS > threads:
+        logger.warning("WA_WORKERS=%d exceeds TURN_FLOW_THREADS=%d; using %d workers", _WA_WORKERS, threads, threads)
+        return threads
+    return _WA_WORKERS
+
+_RATE_LIMIT_MESSAGE = "You're sending messages too quickly! 😅 Please wait a moment and try again."
+_BUSY_MESSAGE = "We're handling a lot of messages right now. 🙏 Please send your message again in a minute."
+
 class WhatsAppMessageHandler:
     """
     Enhanced WhatsApp message handler with production features.
@@ -48,24 +90,38 @@ class WhatsAppMessageHandler:
         self.verify_token = os.environ.get("META_VERIFY_TOKEN")
         self.access_token = os.environ.get("META_ACCESS_TOKEN")
         self.phone_number_id = os.environ.get("META_PHONE_NUMBER_ID")
-        self.max_message_length = 4096  # WhatsApp limit
+        self.max_message_length = WHATSAPP_TEXT_LIMIT
 
-        # Reusable async HTTP client for outbound WhatsApp messages
-        # Set sane timeouts and allow re-use of connections to reduce latency.
-        self._http: Optional[httpx.AsyncClient] = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=10.0)
-        )
+        # Paced HTTP/2 sender for outbound WhatsApp messages (shared connection pool)
+        self.graph: Optional[GraphAPISender] = GraphAPISender(self.access_token)
 
         # Redis-backed controls
         self.rate_limiter = RateLimiter()
         self.deduper = Deduplicator()
         self.order_guard = OrderGuard()
+        self.coalescer: Optional[MessageCoalescer] = MessageCoalescer() if _WA_COALESCE_WINDOW_MS > 0 else None
+        # Standard-lane messages not answered yet, per user; while any are pending the fast lane is skipped
+        self.pending = PendingTurns()
+
+        # Bounded background processing (started in the FastAPI lifespan, or lazily on first message)
+        self.pool = BoundedWorkerPool("whatsapp", workers=_pool_workers(), queue_size=_WA_QUEUE_SIZE)
+        self._side_tasks: set = set()
+        self.sender = OrderedSendQueue("whatsapp", self._send_message_async, max_attempts=_WA_SEND_MAX_ATTEMPTS,
+                                       max_concurrency=_WA_SEND_CONCURRENCY)
+
+        # Durable queue mode: publish here, consume wherever a StreamConsumer runs
+        self.inbound: Optional[InboundStream] = InboundStream() if _WA_INBOUND_QUEUE == "stream" else None
+        self.processed = Deduplicator(scope="wa_done")
+        self.consumer: Optional[StreamConsumer] = None
         
         # Initialize shared MongoDB session manager (reuse connection pool)
         self._mongo_session_manager = None
+        self._turns = None
         if HLAS_IMPORTS_AVAILABLE and MongoSessionManager:
             try:
                 self._mongo_session_manager = MongoSessionManager()
+                # Same turn pipeline as /chat (greeting, lock, load, flow, history, full-session persist)
+                self._turns = TurnExecutor(self._mongo_session_manager)
                 try:
                     from ..redis_utils import get_redis
                     r = get_redis()
@@ -189,6 +245,57 @@ class WhatsAppMessageHandler:
             logger.error(f"Error extracting message data: {str(e)}")
             return None, None, {}
     
+    def extract_messages(self, data: Dict[str, Any]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Extract every user message in a webhook payload (all entry[].changes[].value.messages[]).
+        Meta batches several messages, possibly from several senders, into one delivery under load.
+
+        Returns:
+            List of (message, user_phone_number, metadata) in payload order; status updates and
+            non-text messages are skipped. Payloads without the standard structure fall back
+            to `extract_message_data`.
+        """
+        results: List[Tuple[str, str, Dict[str, Any]]] = []
+        entries = data.get('entry') if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            message, user_phone, metadata = self.extract_message_data(data)
+            return [(message, user_phone, metadata)] if message and user_phone else []
+
+        for entry in entries:
+            for change in (entry or {}).get('changes') or []:
+                value = (change or {}).get('value') or {}
+                if value.get('statuses'):
+                    logger.info(f"Received {len(value['statuses'])} status update(s). Ignoring.")
+                names = {}
+                for contact in value.get('contacts') or []:
+                    try:
+                        names[contact.get('wa_id')] = contact.get('profile', {}).get('name', 'Unknown')
+                    except Exception:
+                        continue
+                for msg_data in value.get('messages') or []:
+                    try:
+                        msg_type = msg_data.get('type', 'text')
+                        body = (msg_data.get('text') or {}).get('body')
+                        if not body:
+                            logger.info(f"Ignoring unsupported '{msg_type}' message {msg_data.get('id')}")
+                            WA_INBOUND_MESSAGES_TOTAL.labels(type="unsupported").inc()
+                            continue
+                        message = self.validate_and_clean_message(body)
+                        user_phone = self.validate_phone_number(msg_data.get('from'))
+                        if not message or not user_phone:
+                            continue
+                        metadata = {
+                            'message_id': msg_data.get('id'),
+                            'timestamp': msg_data.get('timestamp'),
+                            'type': msg_type,
+                            'from_name': names.get(msg_data.get('from'), 'Unknown')
+                        }
+                        WA_INBOUND_MESSAGES_TOTAL.labels(type="text").inc()
+                        results.append((message, user_phone, metadata))
+                    except Exception as e:
+                        logger.warning(f"Could not extract message from webhook: {str(e)}")
+        return results
+
     def validate_and_clean_message(self, message: str) -> Optional[str]:
         """
         Validate and clean incoming message.
@@ -234,166 +341,282 @@ class WhatsAppMessageHandler:
         # Any Redis issue will raise and be logged by the limiter.
         return self.rate_limiter.allow(user_phone)
     
-    async def handle_message(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> str:
+    async def handle_message(self, message: str, user_phone: str, metadata: Dict[str, Any],
+                             before_unlock=None) -> str:
         """
-        Process the message through the HLAS chat system with error handling.
+        Process the message through the shared TurnExecutor with error handling.
+        Lock timeouts are re-raised so the caller can count them (and retry stream entries).
         """
         try:
             logger.info(f"Processing message from {user_phone}: {message[:100]}...")
             
             # Check if HLAS components are available
-            if not HLAS_IMPORTS_AVAILABLE or not self._mongo_session_manager:
+            if not HLAS_IMPORTS_AVAILABLE or not self._turns:
                 logger.error("HLAS components not available for message processing")
                 return "I'm sorry, the service is temporarily unavailable. Please try again later."
             
             # Use phone number as session ID (could be enhanced with user mapping)
             session_id = f"whatsapp_{user_phone}"
             
-            # Check for "Hi" greeting BEFORE loading session to avoid using old state
-            if message.lower().strip() == "hi":
-                logger.info("WhatsApp handler: Received 'hi' greeting - resetting session before processing")
-
-                try:
-                    self._mongo_session_manager.reset_session(session_id)
-                except Exception as e:
-                    logger.error(f"WhatsApp handler: Failed to reset session for 'hi' greeting - {e}")
-
-                greeting = get_time_based_greeting()
+            result = await self._turns.run(
+                session_id, message, channel="whatsapp",
+                reply_parts=lambda reply: split_message(reply, self.max_message_length),
+                before_unlock=before_unlock,
+            )
+            if result.greeting:
                 logger.info("WhatsApp handler: Responding with time-based greeting")
-                return greeting
-            
-            # Get session from MongoDB (reuse connection pool)
-            session = self._mongo_session_manager.get_session(session_id)
-            
-            # Process through HLAS Flow
-            flow = HlasFlow()
-            
-            # Suppress third-party console UIs during flow execution
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-                result = await flow.kickoff_async(inputs={"message": message, "session": session})
-            
-            # Get the response
-            response = str(flow.state.reply or "")
-            
-            # Trim assistant reply for history storage
-            assistant_reply_hist = response
-            if len(response) > 100:
-                assistant_reply_hist = response[:100]
-
-            # Add to history and save session (reuse connection pool)
-            self._mongo_session_manager.add_history_entry(session_id, message, assistant_reply_hist)
-            
-            # Update session state
-            new_session = dict(session)
-            new_session.update({
-                "product": flow.state.product or session.get("product"),
-            })
-            
-            # Persist session state (similar to main.py logic)
-            if "slots" in flow.state.session:
-                new_session["slots"] = flow.state.session["slots"]
-            if flow.state.session.get("recommendation_status"):
-                new_session["recommendation_status"] = flow.state.session.get("recommendation_status")
-            if flow.state.session.get("last_question"):
-                new_session["last_question"] = flow.state.session.get("last_question")
-            if flow.state.session.get("_last_info_prod_q"):
-                new_session["_last_info_prod_q"] = flow.state.session.get("_last_info_prod_q")
-            if flow.state.session.get("_last_info_user_msg"):
-                new_session["_last_info_user_msg"] = flow.state.session.get("_last_info_user_msg")
-            
-            # Save session (reuse connection pool)
-            self._mongo_session_manager.save_session(session_id, new_session)
-            
-            # Validate response
-            if not response:
-                response = "I'm sorry, I couldn't process your request. Please try again or ask for help."
-            
-            # Ensure response fits WhatsApp limits
-            if len(response) > self.max_message_length:
-                response = response[:self.max_message_length-50] + "...\n\nMessage was truncated. Please ask for specific details!"
             
+            response = self._reply_or_fallback(result.reply)
             logger.info(f"Generated response for {user_phone}: {len(response)} characters")
             return response
             
+        except TimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error processing message from {user_phone}: {str(e)}")
             return "I'm sorry, there was an error processing your message. Please try again later."
+
+    @staticmethod
+    def _reply_or_fallback(reply: str) -> str:
+        return reply or "I'm sorry, I couldn't process your request. Please try again or ask for help."
     
     async def _send_message_async(self, recipient_number: str, message_body: str):
         """
-        Sends a WhatsApp message asynchronously using the Meta API with retries/backoff.
+        Sends one WhatsApp message through the Graph API sender. Raises GraphSendError on
+        failure; retries and per-user ordering are handled by the send queue (`self.sender`).
         """
         if not self.phone_number_id or not self.access_token:
             logger.error("Environment variables META_PHONE_NUMBER_ID and/or META_ACCESS_TOKEN are not set.")
             return
 
-        if not self._http:
-            raise RuntimeError("HTTP client not initialized")
+        if not self.graph:
+            raise RuntimeError("Graph API sender not initialized")
 
-        url = f"https://graph.facebook.com/v18.0/{self.phone_number_id}/messages"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
-        
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": recipient_number,
-            "type": "text",
-            "text": {
-                "body": message_body
-            }
-        }
+        result = await self.graph.send_text(self.phone_number_id, recipient_number, message_body)
+        logger.info(f"Message sent successfully to {recipient_number}. Response: {result}")
 
-        # Retry with exponential backoff (non-blocking)
-        attempts = 0
-        max_attempts = 3
-        backoff = 0.5
-        while True:
-            try:
-                response = await self._http.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                try:
-                    logger.info(f"Message sent successfully to {recipient_number}. Response: {response.json()}")
-                except Exception:
-                    logger.info(f"Message sent successfully to {recipient_number}.")
-                break
-            except httpx.HTTPError as e:
-                attempts += 1
-                logger.warning(f"Send attempt {attempts}/{max_attempts} failed for {recipient_number}: {e}")
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        logger.warning(f"Response status code: {e.response.status_code}")
-                        logger.warning(f"Response content: {e.response.text}")
-                    except Exception:
-                        pass
-                if attempts >= max_attempts:
-                    logger.error(f"Exhausted retries sending message to {recipient_number}")
-                    break
-                await asyncio.sleep(backoff)
-                backoff *= 2
-    
-    async def _process_and_respond(self, message: str, user_phone: str, metadata: Dict[str, Any]):
+    async def _process_and_respond(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> "asyncio.Future":
         """
-        Handles the actual processing and sending of the response asynchronously.
+        Runs the turn under the session lock and queues the reply once the session is saved.
+        Returns the delivery future (resolves to True when Meta accepted the reply).
+        Rate limiting and zero-LLM replies are handled before queueing (see `_accept`).
         """
-        # Rate limiting check
-        if not self.check_rate_limit(user_phone):
-            rate_limit_msg = "You're sending messages too quickly! 😅 Please wait a moment and try again."
-            await self._send_message_async(user_phone, rate_limit_msg)
-            WA_MESSAGES_PROCESSED_TOTAL.labels(result="rate_limited").inc()
-            return
+        # TurnExecutor takes the per-session lock; by default the reply is queued after it is released
+        delivery = None
 
-        # Acquire per-session lock to avoid concurrent processing for same user
-        session_id = f"whatsapp_{user_phone}"
-        with RedisLock(session_lock_key(session_id), ttl_seconds=15.0, wait_timeout=5.0):
-            # Process message
-            response = await self.handle_message(message, user_phone, metadata)
-            
-            # Send response
-            await self._send_message_async(user_phone, response)
+        async def send_under_lock(result):
+            nonlocal delivery
+            delivery = self._deliver_reply(user_phone, self._reply_or_fallback(result.reply))
+            await delivery
+
+        with count_llm_calls() as llm_calls:
+            response = await self.handle_message(message, user_phone, metadata,
+                                                 before_unlock=None if _WA_SEND_AFTER_UNLOCK else send_under_lock)
+        WA_LLM_CALLS_PER_MESSAGE.observe(llm_calls.value / max(1, int(metadata.get("coalesced") or 1)))
+
+        if delivery is None:
+            delivery = self._deliver_reply(user_phone, response)
+        self._observe_lane("standard", metadata)
+        WA_MESSAGES_PROCESSED_TOTAL.labels(result="ok").inc()
+        return delivery
+
+    @staticmethod
+    def _observe_lane(lane: str, metadata: Dict[str, Any]) -> None:
+        received_at = metadata.get("received_at")
+        if received_at:
+            TURN_LANE_SECONDS.labels(channel="whatsapp", lane=lane).observe(max(0.0, time.time() - float(received_at)))
+
+    async def _run_fast_lane(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> None:
+        """
+        Zero-LLM replies without the worker queue, only used when the user has no pending
+        standard-lane messages (see `_accept`). Capability answers take no lock. "hi" resets
+        the session under the session lock (short wait) and queues the greeting before releasing
+        it. If a turn that started meanwhile holds the lock longer, the greeting moves to the
+        standard lane behind it.
+        """
+        delivered = False
+
+        async def send_under_lock(result):
+            nonlocal delivered
+            self._deliver_reply(user_phone, result.reply)
+            delivered = True
+
+        try:
+            try:
+                result = await self._turns.fast_path(f"whatsapp_{user_phone}", message, channel="whatsapp",
+                                                     lock_wait_seconds=_WA_GREETING_LOCK_WAIT_S,
+                                                     before_unlock=send_under_lock)
+            except TimeoutError:
+                logger.info("Fast lane: session of %s is busy; greeting queued on the standard lane", user_phone)
+                self.pending.add(user_phone)
+                await self._enqueue(message, user_phone, metadata)
+                return
+            if result is None:
+                self.pending.add(user_phone)
+                await self._enqueue(message, user_phone, metadata)
+                return
+            if not delivered:
+                self._deliver_reply(user_phone, result.reply)
+            self._observe_lane("fast", metadata)
+            FAST_LANE_REPLIES_TOTAL.labels(channel="whatsapp", kind="greeting" if result.greeting else "capabilities").inc()
             WA_MESSAGES_PROCESSED_TOTAL.labels(result="ok").inc()
+        except Exception as e:
+            logger.error(f"Fast lane processing failed for {user_phone}: {e}", exc_info=True)
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="error").inc()
+
+    def _deliver_reply(self, user_phone: str, text: str) -> "asyncio.Future":
+        """Queue the reply as one or more WhatsApp messages. All parts are queued at once and the
+        user's FIFO sends them back to back in order; the future resolves True if every part was sent."""
+        parts = split_message(text, self.max_message_length)
+        WA_REPLY_PARTS.observe(len(parts))
+        futures = [self.sender.enqueue(user_phone, part) for part in parts]
+        if len(futures) == 1:
+            return futures[0]
+        return asyncio.ensure_future(self._all_delivered(futures))
+
+    @staticmethod
+    async def _all_delivered(futures) -> bool:
+        return all(await asyncio.gather(*futures))
+
+    async def _run_job(self, message: str, user_phone: str, metadata: Dict[str, Any]):
+        """Worker entry point: lock timeouts and errors are counted here instead of being lost with the task."""
+        try:
+            await self._process_and_respond(message, user_phone, metadata)
+        except TimeoutError as e:
+            logger.error(f"Redis lock timeout for WhatsApp session: {e}")
+            REDIS_LOCK_TIMEOUTS.labels(scope="whatsapp").inc()
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="error").inc()
+        except Exception as e:
+            logger.error(f"Background processing failed for {user_phone}: {e}", exc_info=True)
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="error").inc()
+        finally:
+            self.pending.done(user_phone, self._batch_size(metadata))
+
+    @staticmethod
+    def _batch_size(metadata: Dict[str, Any]) -> int:
+        """Inbound messages answered by this job (more than one when a burst was coalesced)."""
+        return max(1, int(metadata.get("coalesced") or 1))
+
+    def _spawn(self, coro) -> None:
+        """Fire-and-forget task that is still awaited on shutdown."""
+        task = asyncio.create_task(coro)
+        self._side_tasks.add(task)
+        task.add_done_callback(self._side_tasks.discard)
+
+    async def _enqueue(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> bool:
+        """Queue the message for a worker; returns False only when the webhook should be redelivered.
+        The caller has counted the message as pending; it is released here when no job will run it."""
+        if self.inbound is not None:
+            try:
+                self.inbound.publish(user_phone, message, metadata)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to publish message from {user_phone} to the inbound stream: {e}")
+                WA_MESSAGES_PROCESSED_TOTAL.labels(result="deferred").inc()
+                self.pending.done(user_phone, self._batch_size(metadata))
+                return False
+        if self.pool.try_submit(self._run_job, message, user_phone, metadata):
+            return True
+        if self.pool.closed:
+            # Shutting down: have Meta redeliver to an instance that is still running
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="deferred").inc()
+            self.pending.done(user_phone, self._batch_size(metadata))
+            return False
+        if _WA_OVERFLOW_POLICY == "defer":
+            # Hold the webhook briefly for a free slot; if none frees up, let Meta redeliver it later
+            if await self.pool.submit(self._run_job, message, user_phone, metadata, timeout=_WA_DEFER_WAIT_S):
+                return True
+            logger.warning("WhatsApp queue full (depth=%d); deferring message from %s to redelivery", self.pool.depth, user_phone)
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="deferred").inc()
+            self.pending.done(user_phone, self._batch_size(metadata))
+            return False
+        logger.warning("WhatsApp queue full (depth=%d); replying busy to %s", self.pool.depth, user_phone)
+        WA_MESSAGES_PROCESSED_TOTAL.labels(result="busy").inc()
+        self.pending.done(user_phone, self._batch_size(metadata))
+        self.sender.enqueue(user_phone, _BUSY_MESSAGE)
+        return True
+
+    async def _coalesce(self, message: str, user_phone: str, metadata: Dict[str, Any]) -> None:
+        """Buffer the message; the call that opens the user's window schedules the flush."""
+        item = {"message": message, "metadata": metadata}
+        if self.coalescer.add(user_phone, item, _WA_COALESCE_WINDOW_MS, _WA_COALESCE_MAX_WINDOW_MS):
+            self._spawn(self._flush_burst(user_phone))
+
+    async def _flush_burst(self, user_phone: str) -> None:
+        """Wait until the user's window closes, then queue the buffered messages as one job."""
+        try:
+            while True:
+                deadline = self.coalescer.deadline(user_phone)
+                wait = (deadline - time.time()) if deadline else 0.0
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            items = self.coalescer.take(user_phone)
+        except Exception as e:
+            logger.error(f"Failed to flush coalesced messages for {user_phone}: {e}")
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="error").inc()
+            return
+        if not items:
+            return
+        message, metadata = self._combine_burst(items)
+        WA_COALESCED_BATCH_SIZE.observe(len(items))
+        if len(items) > 1:
+            logger.info("Coalesced %d messages from %s into one turn", len(items), user_phone)
+        if not await self._enqueue(message, user_phone, metadata):
+            # The webhooks were already acknowledged, so there is no redelivery to fall back on
+            logger.error(f"Dropped coalesced burst of {len(items)} message(s) from {user_phone}: queue unavailable")
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="dropped").inc()
+
+    @staticmethod
+    def _combine_burst(items: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """One message per line, in arrival order; metadata of the last message plus the batch details."""
+        texts = [str(i.get("message") or "") for i in items]
+        metadata = dict(items[-1].get("metadata") or {})
+        metadata["coalesced"] = len(items)
+        metadata["message_ids"] = [(i.get("metadata") or {}).get("message_id") for i in items]
+        return "\n".join(t for t in texts if t), metadata
+
+    async def handle_stream_entry(self, entry_id: str, fields: Dict[str, Any]):
+        """StreamConsumer handler. Raising leaves the entry pending so it is retried (at-least-once);
+        the `wa_done` dedupe scope skips entries whose reply was already sent before a crash."""
+        user_phone, message, metadata = decode_entry(fields)
+        done_key = metadata.get("message_id") or entry_id
+        if self.processed.seen(done_key):
+            logger.info("Inbound entry %s already processed (message_id=%s). Skipping.", entry_id, done_key)
+            INBOUND_STREAM_EVENTS.labels(event="duplicate").inc()
+            return
+        try:
+            delivery = await self._process_and_respond(message, user_phone, metadata)
+        except TimeoutError as e:
+            logger.error(f"Redis lock timeout for WhatsApp session: {e}")
+            REDIS_LOCK_TIMEOUTS.labels(scope="whatsapp").inc()
+            raise
+        # Ack only after delivery was attempted, so a crash before sending redelivers the entry
+        await delivery
+        self.processed.is_new(done_key)
+        self.pending.done(user_phone, self._batch_size(metadata))
+
+    def start_consumer(self) -> StreamConsumer:
+        self.consumer = StreamConsumer(self.handle_stream_entry)
+        return self.consumer
+
+    async def start_workers(self):
+        if self.inbound is None:
+            self.pool.start()
+        elif _WA_STREAM_CONSUMER_IN_APP:
+            await self.start_consumer().start()
+
+    async def drain(self):
+        """Flush open coalescing windows, then finish queued messages and deliver queued replies
+        before the HTTP client is closed."""
+        if self._side_tasks:
+            await asyncio.gather(*list(self._side_tasks), return_exceptions=True)
+        await self.pool.drain(_WA_DRAIN_TIMEOUT_S)
+        if self.consumer is not None:
+            await self.consumer.stop(_WA_DRAIN_TIMEOUT_S)
+        await self.sender.drain(_WA_DRAIN_TIMEOUT_S)
+        if self._side_tasks:
+            await asyncio.gather(*list(self._side_tasks), return_exceptions=True)
 
     async def process_webhook(self, request: Request) -> Response:
         """
@@ -418,32 +641,19 @@ class WhatsAppMessageHandler:
             data = await request.json()
             logger.debug(f"Received webhook data: {data}")
             
-            message, user_phone, metadata = self.extract_message_data(data)
-            
-            if message and user_phone:
-                # De-duplication using WhatsApp message_id when available
-                message_id = (metadata.get('message_id') if isinstance(metadata, dict) else None) or ""
-                if message_id:
-                    try:
-                        if not self.deduper.is_new(message_id):
-                            logger.info("Duplicate message detected (message_id=%s). Ignoring.", message_id)
-                            WA_MESSAGES_PROCESSED_TOTAL.labels(result="duplicate").inc()
-                            return Response(status_code=200)
-                    except Exception:
-                        pass
-                
-                # Basic ordering: drop messages older than last processed
-                try:
-                    ts = int(metadata.get('timestamp')) if metadata.get('timestamp') else int(time.time())
-                except Exception:
-                    ts = int(time.time())
-                if not self.order_guard.allow(user_phone, ts):
-                    logger.info("Out-of-order message dropped for %s (ts=%s)", user_phone, ts)
-                    WA_MESSAGES_PROCESSED_TOTAL.labels(result="out_of_order").inc()
-                    return Response(status_code=200)
-
-                # Acknowledge immediately and process in the background
-                asyncio.create_task(self._process_and_respond(message, user_phone, metadata))
+            messages = self.extract_messages(data)
+            if messages:
+                WA_WEBHOOK_BATCH_SIZE.observe(len(messages))
+
+                # Group by sender, oldest first within a sender; senders are accepted concurrently
+                by_sender: Dict[str, List[Tuple[int, str, Dict[str, Any]]]] = {}
+                for message, user_phone, metadata in messages:
+                    by_sender.setdefault(user_phone, []).append((self._message_ts(metadata), message, metadata))
+                results = await asyncio.gather(
+                    *(self._accept_sender(user_phone, sorted(batch, key=lambda m: m[0])) for user_phone, batch in by_sender.items())
+                )
+                if not all(results):
+                    return Response(status_code=503)
             
             # Always return 200 to acknowledge receipt of the event
             return Response(status_code=200)
@@ -459,6 +669,77 @@ class WhatsAppMessageHandler:
             # Still return 200 to avoid webhook disabling, but log the error
             return Response(status_code=200)
     
+    @staticmethod
+    def _message_ts(metadata: Dict[str, Any]) -> int:
+        try:
+            return int(metadata.get('timestamp')) if metadata.get('timestamp') else int(time.time())
+        except Exception:
+            return int(time.time())
+
+    async def _accept_sender(self, user_phone: str, batch: List[Tuple[int, str, Dict[str, Any]]]) -> bool:
+        """Accept one sender's messages in timestamp order. On a queue refusal the remaining
+        messages are released too and False asks Meta to redeliver the payload."""
+        for i, (ts, message, metadata) in enumerate(batch):
+            if not await self._accept(message, user_phone, metadata, ts):
+                for _, _, later in batch[i + 1:]:
+                    self._forget(later.get('message_id'))
+                return False
+        return True
+
+    def _forget(self, message_id: Optional[str]) -> None:
+        if message_id:
+            try:
+                self.deduper.forget(message_id)
+            except Exception:
+                pass
+
+    async def _accept(self, message: str, user_phone: str, metadata: Dict[str, Any], ts: int) -> bool:
+        """Dedupe, order-check and queue one message; False only when it should be redelivered."""
+        # De-duplication using WhatsApp message_id when available
+        message_id = metadata.get('message_id') or ""
+        if message_id:
+            try:
+                if not self.deduper.is_new(message_id):
+                    logger.info("Duplicate message detected (message_id=%s). Ignoring.", message_id)
+                    WA_MESSAGES_PROCESSED_TOTAL.labels(result="duplicate").inc()
+                    return True
+            except Exception:
+                pass
+
+        # Basic ordering: drop messages older than last processed
+        if not self.order_guard.allow(user_phone, ts):
+            logger.info("Out-of-order message dropped for %s (ts=%s)", user_phone, ts)
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="out_of_order").inc()
+            return True
+
+        metadata["received_at"] = round(time.time(), 3)
+
+        # Fast lane: replies that need no LLM skip the worker queue ("hi" briefly takes the session lock),
+        # but only when nothing from this user is still waiting in the standard lane. Otherwise the reply
+        # would overtake the earlier messages' replies (or "hi" would reset the session under them).
+        if not self.check_rate_limit(user_phone):
+            self._deliver_reply(user_phone, _RATE_LIMIT_MESSAGE)
+            self._observe_lane("fast", metadata)
+            FAST_LANE_REPLIES_TOTAL.labels(channel="whatsapp", kind="rate_limited").inc()
+            WA_MESSAGES_PROCESSED_TOTAL.labels(result="rate_limited").inc()
+            return True
+        if self._turns is not None and fast_lane_kind(message):
+            if not self.pending.has_pending(user_phone):
+                self._spawn(self._run_fast_lane(message, user_phone, metadata))
+                return True
+            logger.info("Fast lane skipped for %s: earlier messages are still pending", user_phone)
+
+        self.pending.add(user_phone)
+        if self.coalescer is not None:
+            await self._coalesce(message, user_phone, metadata)
+            return True
+
+        # Acknowledge immediately and process on the bounded worker pool
+        if not await self._enqueue(message, user_phone, metadata):
+            self._forget(message_id)
+            return False
+        return True
+
     def get_health_status(self) -> Dict[str, Any]:
         """
         Get health status for monitoring.
@@ -482,12 +763,22 @@ class WhatsAppMessageHandler:
 # Global handler instance
 whatsapp_handler = WhatsAppMessageHandler()
 
+# Worker pool lifecycle for the FastAPI lifespan
+async def start_whatsapp_workers():
+    await whatsapp_handler.start_workers()
+
+async def drain_whatsapp_workers():
+    try:
+        await whatsapp_handler.drain()
+    except Exception as e:
+        logger.error(f"Failed to drain WhatsApp workers: {e}")
+
 # Expose a close method for FastAPI shutdown
 async def close_whatsapp_handler_http_client():
     try:
-        if whatsapp_handler._http:
-            await whatsapp_handler._http.aclose()
-            whatsapp_handler._http = None
+        if whatsapp_handler.graph:
+            await whatsapp_handler.graph.aclose()
+            whatsapp_handler.graph = None
             logger.info("Closed WhatsApp AsyncClient")
     except Exception as e:
         logger.error(f"Failed to close WhatsApp AsyncClient: {e}")
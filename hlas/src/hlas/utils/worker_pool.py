@@ -0,0 +1,124 @@
+"""Bounded asyncio worker pool for background message processing.
+
+A fixed number of worker tasks consume jobs from a bounded queue, so a burst of
+webhooks cannot start an unbounded number of concurrent flows. Callers choose what
+happens when the queue is full (`try_submit` fails immediately, `submit` waits up
+to a timeout). `drain` stops intake and lets queued jobs finish on shutdown.
+
+Queue depth and in-flight jobs are exported per pool (hlas_worker_queue_depth,
+hlas_worker_inflight) for autoscaling.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from ..metrics import WORKER_QUEUE_DEPTH, WORKER_INFLIGHT, WORKER_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class BoundedWorkerPool:
+    """`workers` consumers over an asyncio.Queue of at most `queue_size` pending jobs."""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight = 0
+        self._accepting = False
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def start(self) -> None:
+        """Create the queue and worker tasks on the running loop (idempotent; no-op after drain)."""
+        if self._tasks or self._closed:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i), name=f"{self.name}-worker-{i}") for i in range(self.workers)]
+        self._accepting = True
+        WORKER_QUEUE_DEPTH.labels(pool=self.name).set(0)
+        WORKER_INFLIGHT.labels(pool=self.name).set(0)
+        logger.info("WorkerPool[%s]: started workers=%d queue_size=%d", self.name, self.workers, self.queue_size)
+
+    def try_submit(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """Enqueue without waiting; False when the queue is full or the pool is draining."""
+        if not self._tasks:
+            self.start()
+        if not self._accepting or self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((fn, args, time.monotonic()))
+        except asyncio.QueueFull:
+            return False
+        WORKER_QUEUE_DEPTH.labels(pool=self.name).set(self._queue.qsize())
+        return True
+
+    async def submit(self, fn: Callable[..., Awaitable[Any]], *args: Any, timeout: float = 0.0) -> bool:
+        """Enqueue, waiting up to `timeout` seconds for space; False if it never frees up."""
+        if self.try_submit(fn, *args):
+            return True
+        if timeout <= 0 or not self._accepting:
+            return False
+        try:
+            await asyncio.wait_for(self._queue.put((fn, args, time.monotonic())), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        WORKER_QUEUE_DEPTH.labels(pool=self.name).set(self._queue.qsize())
+        return True
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            fn, args, enqueued_at = await self._queue.get()
+            WORKER_QUEUE_DEPTH.labels(pool=self.name).set(self._queue.qsize())
+            WORKER_QUEUE_WAIT_SECONDS.labels(pool=self.name).observe(time.monotonic() - enqueued_at)
+            self._inflight += 1
+            WORKER_INFLIGHT.labels(pool=self.name).set(self._inflight)
+            try:
+                await fn(*args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("WorkerPool[%s]: job failed in worker %d - %s", self.name, index, e, exc_info=True)
+            finally:
+                self._inflight -= 1
+                WORKER_INFLIGHT.labels(pool=self.name).set(self._inflight)
+                self._queue.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        """Stop accepting jobs, wait up to `timeout` for queued and running jobs, then stop the workers."""
+        self._closed = True
+        if not self._tasks:
+            return
+        self._accepting = False
+        pending = self.depth + self._inflight
+        logger.info("WorkerPool[%s]: draining %d job(s) (timeout=%.1fs)", self.name, pending, timeout)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("WorkerPool[%s]: drain timed out; abandoning queued=%d in_flight=%d",
+                         self.name, self.depth, self._inflight)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        WORKER_QUEUE_DEPTH.labels(pool=self.name).set(0)
+        WORKER_INFLIGHT.labels(pool=self.name).set(0)
+        logger.info("WorkerPool[%s]: stopped", self.name)